@@ -0,0 +1,140 @@
+"""
+Read-through cache for assembled article and thread responses.
+
+Entries live in process (TTL + LRU) or, with CACHE_BACKEND=redis, in a shared
+Redis-compatible server so every worker sees the same invalidations. Writers
+call `response_cache.invalidate(...)` with `article_key`/`thread_key`.
+"""
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from bson import json_util
+
+from app.config import CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, REDIS_URL
+from app.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def article_key(article_id) -> str:
+    return f"article:{article_id}"
+
+
+def thread_key(thread_id) -> str:
+    return f"thread:{thread_id}"
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int = CACHE_MAX_ENTRIES):
+        self._entries = LRUCache(maxsize)
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            self._entries.pop(key)
+            return None
+        return value
+
+    async def set(self, key: str, value: dict, ttl: float):
+        self._entries.put(key, (time.monotonic() + ttl, value))
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key)
+
+
+class RedisBackend:
+    """Values are stored as extended JSON so ObjectIds and datetimes survive."""
+
+    def __init__(self, url: str = REDIS_URL):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self._client.get(key)
+        return json_util.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: dict, ttl: float):
+        await self._client.set(key, json_util.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self._client.delete(*keys)
+
+
+CACHE_BACKENDS = {
+    "memory": MemoryBackend,
+    "redis": RedisBackend,
+}
+
+
+class ResponseCache:
+    """Cached values are shared between requests and must not be mutated;
+    copy before adding per-request fields."""
+
+    def __init__(self, backend=None, ttl: float = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "errors": 0}
+
+    async def get(self, key: str) -> Optional[dict]:
+        if self.backend is None:
+            return None
+        try:
+            value = await self.backend.get(key)
+        except Exception:
+            # a cache outage degrades to plain Mongo reads
+            self.stats["errors"] += 1
+            logger.exception("cache get failed for %s", key)
+            return None
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    async def set(self, key: str, value: dict):
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception:
+            self.stats["errors"] += 1
+            logger.exception("cache set failed for %s", key)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        value = await self.get(key)
+        if value is None:
+            value = await loader()
+            if value is not None:
+                await self.set(key, value)
+        return value
+
+    async def invalidate(self, *keys: str):
+        if self.backend is None or not keys:
+            return
+        try:
+            await self.backend.delete(*keys)
+            self.stats["invalidations"] += len(keys)
+        except Exception:
+            self.stats["errors"] += 1
+            logger.exception("cache invalidation failed for %s", ", ".join(keys))
+
+    def info(self) -> Dict[str, object]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "backend": CACHE_BACKEND if self.backend is not None else "off",
+            "ttl": self.ttl,
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+def _make_backend(name: str):
+    if name == "off":
+        return None
+    return CACHE_BACKENDS[name]()
+
+
+response_cache = ResponseCache(_make_backend(CACHE_BACKEND))
@@ -0,0 +1,165 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from app.config import THREAD_INDEX, THREAD_ANN_TABLES, THREAD_ANN_BITS, THREAD_ANN_MIN_SIZE
+
+
+def l2_normalize(vec: np.ndarray) -> np.ndarray:
+    vec = np.asarray(vec, dtype=np.float32)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else vec
+
+
+class LSHIndex:
+    """Random-projection LSH for cosine similarity.
+
+    Each of `n_tables` tables hashes a vector to the sign pattern of `n_bits`
+    random hyperplanes. A query probes its own bucket and every bucket one bit
+    away in each table; the union of those buckets is the candidate set.
+    """
+
+    def __init__(self, dim: int, n_tables: int = THREAD_ANN_TABLES, n_bits: int = THREAD_ANN_BITS,
+                 seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self._planes = rng.standard_normal((n_tables * n_bits, dim)).astype(np.float32)
+        self._weights = (1 << np.arange(n_bits)).astype(np.int64)
+        self._tables: List[Dict[int, Set[ObjectId]]] = [defaultdict(set) for _ in range(n_tables)]
+        self._keys: Dict[ObjectId, np.ndarray] = {}
+
+    def _hash(self, vec: np.ndarray) -> np.ndarray:
+        bits = (self._planes @ vec > 0).reshape(self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self._weights
+
+    def insert(self, tid: ObjectId, vec: np.ndarray):
+        keys = self._hash(vec)
+        self._keys[tid] = keys
+        for table, key in zip(self._tables, keys):
+            table[int(key)].add(tid)
+
+    def remove(self, tid: ObjectId):
+        keys = self._keys.pop(tid, None)
+        if keys is None:
+            return
+        for table, key in zip(self._tables, keys):
+            bucket = table.get(int(key))
+            if bucket is not None:
+                bucket.discard(tid)
+                if not bucket:
+                    del table[int(key)]
+
+    def update(self, tid: ObjectId, vec: np.ndarray):
+        keys = self._hash(vec)
+        old = self._keys.get(tid)
+        if old is not None and np.array_equal(old, keys):
+            return
+        self.remove(tid)
+        self.insert(tid, vec)
+
+    def candidates(self, vec: np.ndarray) -> Set[ObjectId]:
+        found: Set[ObjectId] = set()
+        for table, key in zip(self._tables, self._hash(vec)):
+            key = int(key)
+            found.update(table.get(key, ()))
+            for b in range(self.n_bits):
+                found.update(table.get(key ^ (1 << b), ()))
+        return found
+
+
+class TopicCentroids:
+    """L2-normalized centroids of the threads of one topic, stored as the rows
+    of a single matrix so the best match is one matrix-vector product.
+
+    With `ann=True` an LSH index is kept alongside the matrix and, once the
+    topic holds `ann_min_size` threads, only its candidates are scored.
+    """
+
+    def __init__(self, dim: int, capacity: int = 64, ann: bool = THREAD_INDEX == "lsh",
+                 ann_min_size: int = THREAD_ANN_MIN_SIZE):
+        self.dim = dim
+        self.ids: List[ObjectId] = []
+        self.rows: Dict[ObjectId, int] = {}
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.ann = LSHIndex(dim) if ann else None
+        self.ann_min_size = ann_min_size
+
+    @classmethod
+    def from_rows(cls, ids: List[ObjectId], rows: np.ndarray, **kwargs) -> "TopicCentroids":
+        """Bulk-loads rows that are already L2-normalized (e.g. from a snapshot)."""
+        index = cls(rows.shape[1], capacity=max(len(ids) * 2, 64), **kwargs)
+        index.matrix[:len(ids)] = rows
+        index.ids = list(ids)
+        index.rows = {tid: i for i, tid in enumerate(index.ids)}
+        if index.ann is not None:
+            for i, tid in enumerate(index.ids):
+                index.ann.insert(tid, index.matrix[i])
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, tid: ObjectId) -> bool:
+        return tid in self.rows
+
+    def add(self, tid: ObjectId, vec: np.ndarray):
+        if tid in self.rows:
+            self.update(tid, vec)
+            return
+        if len(self.ids) == self.matrix.shape[0]:
+            grown = np.zeros((self.matrix.shape[0] * 2, self.dim), dtype=np.float32)
+            grown[:len(self.ids)] = self.matrix[:len(self.ids)]
+            self.matrix = grown
+        self.rows[tid] = len(self.ids)
+        self.ids.append(tid)
+        self.matrix[self.rows[tid]] = l2_normalize(vec)
+        if self.ann is not None:
+            self.ann.insert(tid, self.matrix[self.rows[tid]])
+
+    def update(self, tid: ObjectId, vec: np.ndarray):
+        self.matrix[self.rows[tid]] = l2_normalize(vec)
+        if self.ann is not None:
+            self.ann.update(tid, self.matrix[self.rows[tid]])
+
+    def remove(self, tid: ObjectId):
+        row = self.rows.pop(tid, None)
+        if row is None:
+            return
+        if self.ann is not None:
+            self.ann.remove(tid)
+        # move the last row into the gap to keep the matrix dense
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = moved
+            self.rows[moved] = row
+        self.ids.pop()
+        self.matrix[last] = 0
+
+    def vector(self, tid: ObjectId) -> np.ndarray:
+        return self.matrix[self.rows[tid]]
+
+    def similarities(self, vec: np.ndarray) -> np.ndarray:
+        return self.matrix[:len(self.ids)] @ l2_normalize(vec)
+
+    def best_match(self, vec: np.ndarray) -> Tuple[Optional[ObjectId], float]:
+        if not self.ids:
+            return None, -1.0
+        if self.ann is not None and len(self.ids) >= self.ann_min_size:
+            return self.best_match_approx(vec)
+        sims = self.similarities(vec)
+        i = int(np.argmax(sims))
+        return self.ids[i], float(sims[i])
+
+    def best_match_approx(self, vec: np.ndarray) -> Tuple[Optional[ObjectId], float]:
+        vec = l2_normalize(vec)
+        candidates = [self.rows[tid] for tid in self.ann.candidates(vec)]
+        if not candidates:
+            return None, -1.0
+        sims = self.matrix[candidates] @ vec
+        i = int(np.argmax(sims))
+        return self.ids[candidates[i]], float(sims[i])
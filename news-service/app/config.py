@@ -8,6 +8,125 @@ HF_MODEL = os.getenv("HUGGINGFACE_MODEL")
 MAX_PAGES = int(os.getenv("MAX_PAGES_PER_SOURCE", "5"))
 MAX_ARTICLES_PER_SOURCE = 8
 DELAY = float(os.getenv("CRAWL_DELAY", "1.0"))
+FEED_SEEN_GUIDS = int(os.getenv("FEED_SEEN_GUIDS", "200"))
+# polls that may fail on an entry before it is given up on and marked seen
+FEED_MAX_ATTEMPTS = int(os.getenv("FEED_MAX_ATTEMPTS", "3"))
+# Adaptive feed polling, off by default (enable it in one process only). Each feed is
+# polled about every FEED_TARGET_NEW_PER_POLL / its learned publishing rate, clamped to
+# [FEED_POLL_MIN_SECONDS, FEED_POLL_MAX_SECONDS], with +-FEED_POLL_JITTER and a doubling
+# backoff after errors. Due feeds are collected every FEED_SCHEDULER_TICK seconds.
+FEED_SCHEDULER_ENABLED = os.getenv("FEED_SCHEDULER_ENABLED", "false").lower() == "true"
+FEED_SCHEDULER_TICK = float(os.getenv("FEED_SCHEDULER_TICK", "60"))
+FEED_POLL_MIN_SECONDS = float(os.getenv("FEED_POLL_MIN_SECONDS", "300"))
+FEED_POLL_MAX_SECONDS = float(os.getenv("FEED_POLL_MAX_SECONDS", "86400"))
+FEED_TARGET_NEW_PER_POLL = float(os.getenv("FEED_TARGET_NEW_PER_POLL", "1"))
+FEED_RATE_SMOOTHING = float(os.getenv("FEED_RATE_SMOOTHING", "0.3"))
+FEED_POLL_JITTER = float(os.getenv("FEED_POLL_JITTER", "0.1"))
+# Crawl jobs (POST /crawl): the last CRAWL_JOB_HISTORY finished jobs stay queryable;
+# their event streams send progress at most every CRAWL_PROGRESS_INTERVAL seconds and
+# a keep-alive comment after CRAWL_KEEPALIVE_SECONDS of silence.
+CRAWL_JOB_HISTORY = int(os.getenv("CRAWL_JOB_HISTORY", "50"))
+CRAWL_PROGRESS_INTERVAL = float(os.getenv("CRAWL_PROGRESS_INTERVAL", "0.5"))
+CRAWL_KEEPALIVE_SECONDS = float(os.getenv("CRAWL_KEEPALIVE_SECONDS", "15"))
+# A running job holds a lease on each of its feeds in feed_state, renewed every third of
+# CRAWL_LEASE_SECONDS, so API workers and the scheduler never crawl the same feed at once.
+CRAWL_LEASE_SECONDS = float(os.getenv("CRAWL_LEASE_SECONDS", "120"))
+RECENT_URLS_CACHE_SIZE = int(os.getenv("RECENT_URLS_CACHE_SIZE", "50000"))
+
+# Crawl pipeline: concurrency per stage and size of the queue feeding each stage.
+FETCH_CONCURRENCY = int(os.getenv("CRAWL_FETCH_CONCURRENCY", "16"))
+DOWNLOAD_CONCURRENCY = int(os.getenv("CRAWL_DOWNLOAD_CONCURRENCY", "16"))
+LLM_CONCURRENCY = int(os.getenv("CRAWL_LLM_CONCURRENCY", "8"))
+ASSIGN_CONCURRENCY = int(os.getenv("CRAWL_ASSIGN_CONCURRENCY", "1"))
+PERSIST_CONCURRENCY = int(os.getenv("CRAWL_PERSIST_CONCURRENCY", "4"))
+STAGE_QUEUE_SIZE = int(os.getenv("CRAWL_STAGE_QUEUE_SIZE", "64"))
+# Processed articles are written in batches of up to PERSIST_BATCH_SIZE, or after
+# PERSIST_FLUSH_SECONDS, whichever comes first.
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "50"))
+PERSIST_FLUSH_SECONDS = float(os.getenv("PERSIST_FLUSH_SECONDS", "5"))
+# Near-duplicate copies (SimHash within NEAR_DUP_MAX_DISTANCE bits of an article fetched
+# in the last NEAR_DUP_WINDOW_DAYS) reuse that article's LLM output and thread. Texts
+# under NEAR_DUP_MIN_WORDS words are never treated as copies.
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "6"))
+NEAR_DUP_MIN_WORDS = int(os.getenv("NEAR_DUP_MIN_WORDS", "100"))
+NEAR_DUP_WINDOW_DAYS = float(os.getenv("NEAR_DUP_WINDOW_DAYS", "7"))
+# Indexes declared in app/indexes.py: "create" them at startup, only "check" and log
+# what is missing, or "off".
+INDEX_BOOTSTRAP = os.getenv("INDEX_BOOTSTRAP", "create")
+
+# Cache for assembled article/thread responses: "memory" (per process), "redis"
+# (shared, needs the redis package and REDIS_URL) or "off".
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# View and report counters are buffered in memory and written every COUNTER_FLUSH_SECONDS,
+# or once COUNTER_MAX_PENDING increments are waiting (the most a crash can lose).
+COUNTER_FLUSH_SECONDS = float(os.getenv("COUNTER_FLUSH_SECONDS", "5"))
+COUNTER_MAX_PENDING = int(os.getenv("COUNTER_MAX_PENDING", "1000"))
+
+# In-process BM25 index behind /search, synced from Mongo every SEARCH_SYNC_SECONDS and
+# snapshotted to SEARCH_INDEX_PATH every SEARCH_SNAPSHOT_SECONDS and on shutdown.
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "data/search_index.json.gz")
+SEARCH_SYNC_SECONDS = float(os.getenv("SEARCH_SYNC_SECONDS", "30"))
+SEARCH_SNAPSHOT_SECONDS = float(os.getenv("SEARCH_SNAPSHOT_SECONDS", "300"))
+# articles deleted by other workers are dropped by an id reconcile every SEARCH_RECONCILE_SECONDS;
+# queries touching more than SEARCH_OFFLOAD_POSTINGS postings are scored in a thread.
+SEARCH_RECONCILE_SECONDS = float(os.getenv("SEARCH_RECONCILE_SECONDS", "600"))
+SEARCH_OFFLOAD_POSTINGS = int(os.getenv("SEARCH_OFFLOAD_POSTINGS", "20000"))
+
+# Worker pools for blocking crawl work: threads for network calls, processes for parsing.
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "32"))
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", str(max((os.cpu_count() or 2) - 1, 1))))
+
+# LLM gateway. OPENAI_BASE_URL can point at a local stub (scripts/openai_stub.py).
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+# cached answers expire through a TTL index on llm_cache.created_at (see app.indexes)
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+
+# Thread vectors: hashed features (stable across restarts and workers) weighted by
+# IDF statistics shared through Mongo; centroids are snapshotted to THREAD_STATE_DIR.
+THREAD_VECTOR_DIM = int(os.getenv("THREAD_VECTOR_DIM", "2048"))
+THREAD_STATE_DIR = os.getenv("THREAD_STATE_DIR", "data/thread_state")
+THREAD_STATE_SYNC_SECONDS = float(os.getenv("THREAD_STATE_SYNC_SECONDS", "30"))
+THREAD_SNAPSHOT_SECONDS = float(os.getenv("THREAD_SNAPSHOT_SECONDS", "300"))
+# document frequencies are counted in memory and added to Mongo this often
+THREAD_IDF_FLUSH_SECONDS = float(os.getenv("THREAD_IDF_FLUSH_SECONDS", "5"))
+# Threads deleted or merged in Mongo are dropped from the in-memory centroids by a full
+# id reconcile every THREAD_RECONCILE_SECONDS.
+THREAD_RECONCILE_SECONDS = float(os.getenv("THREAD_RECONCILE_SECONDS", "600"))
+
+# Thread titles are regenerated in the background: updates to a thread are coalesced
+# for TITLE_REFRESH_WINDOW seconds and only acted on when its centroid moved by more
+# than TITLE_MIN_CENTROID_SHIFT (1 - cosine) since the last title.
+TITLE_REFRESH_WINDOW = float(os.getenv("TITLE_REFRESH_WINDOW", "60"))
+TITLE_MAX_EXAMPLES = int(os.getenv("TITLE_MAX_EXAMPLES", "8"))
+TITLE_MIN_CENTROID_SHIFT = float(os.getenv("TITLE_MIN_CENTROID_SHIFT", "0.05"))
+
+# Related threads are the RELATED_THREADS_K nearest centroids, stored on each thread
+# and recomputed RELATED_REFRESH_WINDOW seconds after its centroid last moved.
+RELATED_THREADS_K = int(os.getenv("RELATED_THREADS_K", "10"))
+RELATED_REFRESH_WINDOW = float(os.getenv("RELATED_REFRESH_WINDOW", "30"))
+
+# Thread matching: "exact" cosine search or "lsh" (random-projection ANN, used once a
+# topic holds at least THREAD_ANN_MIN_SIZE threads).
+THREAD_INDEX = os.getenv("THREAD_INDEX", "exact")
+THREAD_ANN_TABLES = int(os.getenv("THREAD_ANN_TABLES", "16"))
+THREAD_ANN_BITS = int(os.getenv("THREAD_ANN_BITS", "14"))
+THREAD_ANN_MIN_SIZE = int(os.getenv("THREAD_ANN_MIN_SIZE", "2000"))
+
+# Grammar scoring for credibility: "heuristic" (default) or "languagetool".
+GRAMMAR_BACKEND = os.getenv("GRAMMAR_BACKEND", "heuristic")
+GRAMMAR_SAMPLE_SENTENCES = int(os.getenv("GRAMMAR_SAMPLE_SENTENCES", "20"))
+GRAMMAR_CACHE_SIZE = int(os.getenv("GRAMMAR_CACHE_SIZE", "10000"))
 
 RSS_SOURCES = [
 
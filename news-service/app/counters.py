@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.cache import article_key, response_cache
+from app.config import COUNTER_FLUSH_SECONDS, COUNTER_MAX_PENDING
+from app.database import articles_col
+from app.search_index import search_index
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """Write-behind `$inc` counters.
+
+    Increments are summed per document in memory and written as one unordered
+    bulk_write every `interval` seconds, or as soon as `max_pending` increments
+    are buffered, which bounds what a crash can lose. `deltas()` exposes the
+    unwritten part so reads can add it to what Mongo returns. `on_written` is
+    called with the increments of every batch once they are in Mongo.
+    """
+
+    def __init__(self, collection, interval: float = COUNTER_FLUSH_SECONDS,
+                 max_pending: int = COUNTER_MAX_PENDING,
+                 on_written: Optional[Callable[[Dict[ObjectId, Dict[str, int]]], None]] = None):
+        self.collection = collection
+        self.on_written = on_written
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[ObjectId, Dict[str, int]] = {}
+        self._pending_hits = 0
+        # batch being written; still counted by deltas() until the write lands
+        self._flushing: Dict[ObjectId, Dict[str, int]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+
+    def _add(self, oid: ObjectId, field: str, amount: int):
+        fields = self._pending.setdefault(oid, {})
+        fields[field] = fields.get(field, 0) + amount
+        self._pending_hits += 1
+
+    def incr(self, oid: ObjectId, field: str, amount: int = 1):
+        self._add(oid, field, amount)
+        if self._pending_hits >= self.max_pending and self._early_flush is None:
+            self._early_flush = asyncio.create_task(self._flush_now())
+
+    def deltas(self, oid: ObjectId) -> Dict[str, int]:
+        out = dict(self._flushing.get(oid, {}))
+        for field, amount in self._pending.get(oid, {}).items():
+            out[field] = out.get(field, 0) + amount
+        return out
+
+    async def _flush_now(self):
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("counter flush failed")
+        finally:
+            self._early_flush = None
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            self._flushing, self._pending = self._pending, {}
+            self._pending_hits = 0
+            oids = list(self._flushing)
+            failed = set()
+            try:
+                await self.collection.bulk_write(
+                    [UpdateOne({"_id": oid}, {"$inc": self._flushing[oid]}) for oid in oids],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                # the other updates of an unordered batch did land; retrying them would count twice
+                failed = {oids[err["index"]] for err in e.details.get("writeErrors", [])}
+                logger.warning("%d of %d counter updates failed, will retry: %s", len(failed), len(oids),
+                               e.details.get("writeErrors", [])[:1])
+            except Exception:
+                # keep the increments for the next periodic attempt rather than dropping them
+                failed = set(oids)
+                raise
+            finally:
+                for oid in failed:
+                    for field, amount in self._flushing[oid].items():
+                        self._add(oid, field, amount)
+                flushed, self._flushing = self._flushing, {}
+            written = [oid for oid in oids if oid not in failed]
+            if self.on_written is not None:
+                self.on_written({oid: flushed[oid] for oid in written})
+            await response_cache.invalidate(*(article_key(oid) for oid in written))
+            return len(written)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("counter flush failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+# the search index sorts by views without asking Mongo
+article_counters = CounterBuffer(articles_col, on_written=search_index.add_counts)
@@ -0,0 +1,219 @@
+"""
+Crawls run as background jobs.
+
+`crawl_jobs.submit()` starts crawl_and_process for the requested feeds and
+returns at once. A feed belongs to at most one running job, across every
+worker process: a job leases its feeds in feed_state for as long as it runs,
+feeds that are already being crawled are left out of a new job (see `skipped`),
+and a request whose feeds are all taken by a job of this process gets that job
+instead of a new one.
+Jobs aggregate the pipeline's stage events into per-stage and per-feed
+counters, which `stream()` sends as server-sent events.
+"""
+import asyncio
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+
+from app.config import (
+    CRAWL_JOB_HISTORY, CRAWL_KEEPALIVE_SECONDS, CRAWL_LEASE_SECONDS, CRAWL_PROGRESS_INTERVAL, RSS_SOURCES,
+)
+from app.crawler import crawl_and_process
+from app.feed_state import lease_feeds, release_feeds, renew_feed_leases
+
+logger = logging.getLogger(__name__)
+
+_COUNTS = ("items", "out", "dropped", "errors", "seconds")
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(payload).decode()}\n\n"
+
+
+class CrawlJob:
+    def __init__(self, sources: List[dict], skipped: Dict[str, str]):
+        self.id = uuid.uuid4().hex
+        self.sources = sources
+        self.skipped = skipped
+        self.status = "queued"
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.crawled: Optional[int] = None
+        self.errors = 0
+        self.error: Optional[str] = None
+        self.stages: Dict[str, dict] = {}
+        self.feeds: Dict[str, dict] = {}
+        # bumped on every change; each feed remembers the version that last touched it
+        self.version = 0
+        self._feed_versions: Dict[str, int] = {}
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def _touch(self, feed: Optional[str] = None):
+        self.version += 1
+        if feed is not None:
+            self._feed_versions[feed] = self.version
+        # wake every stream waiting on the current event, later waits get a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def record(self, event: dict):
+        """on_event callback for crawl_and_process."""
+        stage = self.stages.setdefault(event["stage"], {key: 0 for key in _COUNTS})
+        for key in _COUNTS:
+            stage[key] += event[key]
+        feed = self.feeds.setdefault(event["feed"], {"source": event["source"], "stages": {}, "errors": 0})
+        feed["stages"][event["stage"]] = feed["stages"].get(event["stage"], 0) + event["out"]
+        feed["errors"] += event["errors"]
+        self.errors += event["errors"]
+        self._touch(event["feed"])
+
+    async def run(self):
+        self.status, self.started_at = "running", datetime.utcnow()
+        self._touch()
+        try:
+            self.crawled = await crawl_and_process(self.sources, on_event=self.record)
+            self.status = "succeeded"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.exception("crawl job %s failed", self.id)
+            self.status, self.error = "failed", repr(e)
+        finally:
+            self.finished_at = datetime.utcnow()
+            self._touch()
+
+    async def wait(self):
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    def out(self, feeds_since: Optional[int] = None) -> dict:
+        """JSON-ready view; with `feeds_since`, only feeds changed after that version."""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "feed_count": len(self.sources),
+            "skipped": self.skipped,
+            "crawled": self.crawled,
+            "errors": self.errors,
+            "error": self.error,
+            "stages": self.stages,
+            "feeds": self.feeds if feeds_since is None else {
+                feed: progress for feed, progress in self.feeds.items()
+                if self._feed_versions.get(feed, 0) > feeds_since
+            },
+        }
+
+    async def stream(self) -> AsyncIterator[str]:
+        """`progress` events (stage totals plus the feeds that changed since the
+        previous event) until the job ends, then one `done` event."""
+        sent = None
+        while True:
+            changed = self._changed
+            if self.done:
+                yield _sse("done", self.out())
+                return
+            if self.version != sent:
+                yield _sse("progress", self.out(feeds_since=sent))
+                sent = self.version
+            try:
+                await asyncio.wait_for(changed.wait(), CRAWL_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            # batch up the stage events of busy moments into one message
+            await asyncio.sleep(CRAWL_PROGRESS_INTERVAL)
+
+
+class CrawlJobs:
+    def __init__(self, history: int = CRAWL_JOB_HISTORY):
+        self.history = history
+        self._jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+        # feed url -> id of the running job of this process that crawls it;
+        # the leases in feed_state are what keep other processes off them
+        self._owners: Dict[str, str] = {}
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self._jobs.get(job_id)
+
+    async def submit(self, sources: Optional[List[dict]] = None) -> Tuple[CrawlJob, bool]:
+        """Returns the job crawling `sources` (default: RSS_SOURCES) and whether
+        it was created by this call. Feeds leased by another process are skipped;
+        if that leaves nothing, the new job has no feeds to crawl."""
+        wanted = RSS_SOURCES if sources is None else sources
+        skipped = {src["feedUrl"]: self._owners[src["feedUrl"]] for src in wanted if src["feedUrl"] in self._owners}
+        if wanted and len(skipped) == len(wanted):
+            return self._jobs[next(iter(skipped.values()))], False
+
+        job = CrawlJob([], skipped)
+        candidates = [src for src in wanted if src["feedUrl"] not in skipped]
+        held = await lease_feeds([src["feedUrl"] for src in candidates], job.id)
+        skipped.update(held)
+        free = [src for src in candidates if src["feedUrl"] not in held]
+        if wanted and not free:
+            # a concurrent submit of this process won the leases while we waited
+            local = next((self._jobs[owner] for owner in skipped.values() if owner in self._jobs), None)
+            if local is not None:
+                return local, False
+
+        job.sources = free
+        for src in free:
+            self._owners[src["feedUrl"]] = job.id
+        self._jobs[job.id] = job
+        job._task = asyncio.create_task(self._run(job))
+        self._trim()
+        return job, True
+
+    async def _run(self, job: CrawlJob):
+        feed_urls = [src["feedUrl"] for src in job.sources]
+        renewer = asyncio.create_task(self._renew(feed_urls, job.id))
+        try:
+            await job.run()
+        finally:
+            renewer.cancel()
+            for feed_url in feed_urls:
+                if self._owners.get(feed_url) == job.id:
+                    del self._owners[feed_url]
+            try:
+                await release_feeds(feed_urls, job.id)
+            except Exception:
+                # the leases run out on their own after CRAWL_LEASE_SECONDS
+                logger.exception("releasing the feeds of crawl job %s failed", job.id)
+            self._trim()
+
+    @staticmethod
+    async def _renew(feed_urls: List[str], owner: str):
+        while True:
+            await asyncio.sleep(CRAWL_LEASE_SECONDS / 3)
+            try:
+                await renew_feed_leases(feed_urls, owner)
+            except Exception:
+                logger.exception("renewing the feed leases of crawl job %s failed", owner)
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - self.history, 0)]:
+            del self._jobs[job_id]
+
+    async def stop(self):
+        running = [job._task for job in self._jobs.values() if job._task is not None and not job._task.done()]
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+crawl_jobs = CrawlJobs()
@@ -1,28 +1,30 @@
-import os
-import re
 import json
 import time
-import feedparser
-import language_tool_python
+import asyncio
 from urllib.parse import urlparse
 from datetime import datetime
-from dateutil import parser as date_parser
-from newspaper import Article as NewsArticle
-from langdetect import detect, DetectorFactory
-from typing import Tuple
-
-from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from app.thread_assigner import assigner
+from collections import Counter
+from typing import Callable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from app import executors
+from app.llm_gateway import gateway
+from app.matchers import credibility_matcher
+from app.thread_assigner import assigner, related_refresher, title_refresher
 from app.credibility_labeling import compute_score_fields
-from app.database import articles_col, threads_col
-from app.config import RSS_SOURCES, MAX_ARTICLES_PER_SOURCE, DELAY, TOPICS, credibility_map, CLICKBAIT_PATTERNS, \
-    AD_PATTERNS
+from app.feed_state import CrawlLedger, load_feed_state, poll_schedule, record_feed_error, save_feed_state
+from app.fingerprint import to_int64
+from app.dedup import find_new_urls, normalize_url
+from app.indexes import ensure_indexes
+from app.near_dup import near_dups
+from app.persistence import DUPLICATE_KEY, ArticleWriter
+from app.pipeline import DONE, DomainThrottle, run_batch_stage, run_stage
+from app.config import RSS_SOURCES, MAX_ARTICLES_PER_SOURCE, DELAY, TOPICS, credibility_map, \
+    FETCH_CONCURRENCY, DOWNLOAD_CONCURRENCY, LLM_CONCURRENCY, ASSIGN_CONCURRENCY, \
+    PERSIST_CONCURRENCY, STAGE_QUEUE_SIZE, NEAR_DUP_ENABLED
 
-load_dotenv()
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-DetectorFactory.seed = 0
-tool = language_tool_python.LanguageTool('en-US')
+throttle = DomainThrottle(DELAY)
 
 
 def get_domain(url: str) -> str:
@@ -33,20 +35,11 @@ def get_domain(url: str) -> str:
 
 
 def is_clickbait(title: str) -> bool:
-    return any(re.search(pat, title.lower()) for pat in CLICKBAIT_PATTERNS)
+    return credibility_matcher.is_clickbait(title)
 
 
 def is_ad_content(title: str, content: str) -> bool:
-    combined = f"{title} {content}".lower()
-    return any(re.search(pat, combined) for pat in AD_PATTERNS)
-
-
-def assess_grammar(text: str) -> bool:
-    if not text.strip():
-        return False
-    matches = tool.check(text)
-    error_rate = len(matches) / max(len(text.split()), 1)
-    return error_rate < 0.05
+    return credibility_matcher.is_ad(title, content)
 
 
 def label_from_score(score: int) -> str:
@@ -58,160 +51,356 @@ def label_from_score(score: int) -> str:
 
 
 
+def _article_json_ok(text: str) -> bool:
+    """Whether the answer to process_article_via_llm's prompt can be used as is."""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(data, dict) and all(
+        isinstance(data.get(key), str) and data[key] for key in ("content", "description", "topic")
+    )
+
+
 async def process_article_via_llm(
         raw_content: str,
-        raw_description: str
-) -> Tuple[str, str, str]:
+        raw_description: str,
+        language: str = "en"
+) -> Tuple[str, str, str, str]:
     """
     1) Cleans & polishes the full article text.
     2) Generates a 1–2 sentence summary.
     3) Assigns exactly one topic from TOPICS.
+    4) For non-English articles, translates the cleaned text in the same call.
+    Returns (content, description, topic, content_en).
     """
+    translate = language != "en"
+    keys = "`content`, `description`, `topic`" + (" and `content_en`" if translate else "")
     system = {
         "role": "system",
         "content": (
             "You are an assistant that takes raw news article text and a raw summary, "
-            "then outputs a JSON object with exactly three keys: "
-            "`content`, `description`, and `topic`. "
+            f"then outputs a JSON object with exactly these keys: {keys}. "
             "- `content`: cleaned article body, free of cookie banners, duplicates, ads, and boilerplate. "
             "- `description`: a concise 1–2 sentence summary. "
             "- `topic`: exactly one of the provided topics matching the main theme."
+            + (" - `content_en`: the cleaned article body translated into English." if translate else "")
         )
     }
+    example = {"content": "…cleaned text…", "description": "…short summary…", "topic": "tech"}
+    if translate:
+        example["content_en"] = "…cleaned text in English…"
     user = {
         "role": "user",
         "content": (
-                f"Available topics: {TOPICS}\n\n"
-                "Raw article text (first 3000 chars):\n"
-                "```\n" + raw_content[:3000] + "\n```\n\n"
-                                               "Raw description (if any):\n"
-                                               "```\n" + (raw_description or "")[:500] + "\n```\n\n"
-                                                                                         "Respond **only** with a valid JSON object, e.g.:\n"
-                                                                                         '{\n'
-                                                                                         '  "content": "…cleaned text…",\n'
-                                                                                         '  "description": "…short summary…",\n'
-                                                                                         '  "topic": "tech"\n'
-                                                                                         '}'
+            f"Available topics: {TOPICS}\n\n"
+            "Raw article text (first 3000 chars):\n"
+            "```\n" + raw_content[:3000] + "\n```\n\n"
+            "Raw description (if any):\n"
+            "```\n" + (raw_description or "")[:500] + "\n```\n\n"
+            "Respond **only** with a valid JSON object, e.g.:\n"
+            + json.dumps(example, ensure_ascii=False, indent=2)
         )
     }
 
-    resp = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[system, user],
-        temperature=0.0,
-        max_tokens=2000
-    )
+    text = await gateway.complete([system, user], max_tokens=4000 if translate else 2000, validate=_article_json_ok)
     try:
-        data = json.loads(resp.choices[0].message.content.strip())
-        return data["content"], data["description"], data["topic"]
-    except json.JSONDecodeError:
-        return raw_content, raw_description or "", ""
+        data = json.loads(text)
+        content = data["content"]
+        content_en = data.get("content_en") or content if translate else content
+        return content, data["description"], data["topic"], content_en
+    except (json.JSONDecodeError, KeyError, TypeError):
+        content_en = await translate_to_english(raw_content) if translate else raw_content
+        return raw_content, raw_description or "", "", content_en
 
 
 async def translate_to_english(text: str) -> str:
-    resp = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
+    return await gateway.complete(
+        [
             {"role": "system", "content": "You are a translator to English."},
             {"role": "user", "content": f"Translate into English:\n\n{text}"}
         ],
-        temperature=0.0,
         max_tokens=2000
     )
-    return resp.choices[0].message.content.strip()
-
-
-async def crawl_and_process() -> int:
-    total = 0
-    for src in RSS_SOURCES:
-        entries = feedparser.parse(src["feedUrl"]).entries[:MAX_ARTICLES_PER_SOURCE]
-        for entry in entries:
-            url = entry.link
-            if await articles_col.find_one({"url": url}):
-                continue
-
-            try:
-                art = NewsArticle(url)
-                art.download()
-                art.parse()
-            except:
-                continue
-
-            raw_content = art.text or ""
-            raw_desc = entry.get("summary") or ""
-
-            try:
-                lang = detect(raw_content)
-            except:
-                lang = "unknown"
-
-            published = None
-            if getattr(entry, "published_parsed", None):
-                published = datetime.fromtimestamp(time.mktime(entry.published_parsed))
-            elif entry.get("published"):
-                try:
-                    published = date_parser.parse(entry.published)
-                except:
-                    pass
-
-            clean_content, clean_desc, topic = await process_article_via_llm(raw_content, raw_desc)
-            content_en = await translate_to_english(clean_content) if lang != "en" else clean_content
-            thread_id = await assigner.assign(content_en, topic)
-
-            base_doc = {
-                "url": url,
-                "source": src["source"],
-                "title": art.title,
-                "description": clean_desc,
-                "published": published,
-                "author": art.authors[0] if art.authors else None,
-                "language": lang,
-                "content": clean_content,
-                "content_en": content_en,
-                "image": art.top_image or None,
-                "topic": topic,
-                "thread_id": thread_id,
-                "fetched_at": datetime.utcnow(),
-            }
-
-            score_fields = compute_score_fields(
-                base_doc,
-                credibility_map,
-                assess_grammar,
-                is_clickbait,
-                is_ad_content,
-                get_domain
-            )
-
-            doc = {**base_doc, **score_fields}
-
-            res = await articles_col.insert_one(doc)
-            article_oid = res.inserted_id
-
-            await threads_col.update_one(
-                {"_id": thread_id},
-                {
-                    "$addToSet": {"articles": article_oid},
-                    "$setOnInsert": {"created_at": datetime.utcnow()},
-                    "$set": {"last_updated": datetime.utcnow()},
-                },
-                upsert=True
-            )
-
-            thread_doc = await threads_col.find_one({"_id": thread_id}, {"articles": 1})
-            if thread_doc:
-                lang_cursor = articles_col.find({"_id": {"$in": thread_doc["articles"]}}, {"language": 1})
-                langs = list({a["language"] async for a in lang_cursor if "language" in a})
-                await threads_col.update_one({"_id": thread_id}, {"$set": {"languages": langs}})
-
-            total += 1
-            time.sleep(DELAY)
-
-    return total
 
 
-if __name__ == "__main__":
-    import asyncio
+async def _fetch_feed(src: dict, ledger: CrawlLedger):
+    feed_url = src["feedUrl"]
+    state = await load_feed_state(feed_url)
+
+    await throttle.wait(get_domain(feed_url))
+    try:
+        feed = await executors.run_io(executors.fetch_feed, feed_url, state.get("etag"), state.get("modified"))
+    except Exception:
+        await record_feed_error(state)
+        raise
+
+    if feed["status"] == 304:
+        await save_feed_state(feed_url, 304, poll_schedule(state, 0, []))
+        return None
+    # feedparser reports network failures as a missing status rather than raising
+    if (feed["status"] or 0) >= 400 or (feed["status"] is None and not feed["entries"]):
+        await record_feed_error(state, feed["status"])
+        return None
+
+    seen_set = set(state.get("seen_guids", []))
+    new = [e for e in feed["entries"] if e["guid"] not in seen_set]
+    await save_feed_state(
+        feed_url, feed["status"],
+        poll_schedule(state, len(new), [e["published"] for e in feed["entries"]])
+    )
+
+    entries = new[:MAX_ARTICLES_PER_SOURCE]
+    ledger.fetched(
+        feed_url, feed["etag"], feed["modified"],
+        [e["guid"] for e in entries], [e["guid"] for e in new[MAX_ARTICLES_PER_SOURCE:]]
+    )
+    return [{"src": src, "entry": entry} for entry in entries]
+
+
+async def _dedup_entries(items: list, ledger: CrawlLedger) -> list:
+    candidates = {}
+    for item in items:
+        item["url_key"] = normalize_url(item["entry"]["link"])
+        # the same story often shows up in several feeds of one source
+        if candidates.setdefault(item["url_key"], item) is not item:
+            ledger.done(item)
 
-    count = asyncio.run(crawl_and_process())
+    new_urls = await find_new_urls({url: item["entry"]["link"] for url, item in candidates.items()})
+    for url, item in candidates.items():
+        if url not in new_urls:
+            ledger.done(item)
+    return [item for url, item in candidates.items() if url in new_urls]
+
+
+async def _download_article(item: dict):
+    url = item["entry"]["link"]
+    await throttle.wait(get_domain(url))
+    try:
+        html = await executors.run_io(executors.download_html, url)
+        if not html:
+            return None
+        item["art"] = await executors.run_cpu(executors.parse_article, url, html)
+    except:
+        return None
+    return item
+
+
+async def _check_near_duplicate(item: dict, begun: Set[ObjectId]) -> dict:
+    """A copy of an article fetched earlier (or still in flight) takes over its
+    LLM output and thread; the LLM and assignment stages then pass it through.
+    Originals registered with near_dups are added to `begun`."""
+    item["_id"] = ObjectId()
+    fp = item["art"]["simhash"]
+    if fp is None or not NEAR_DUP_ENABLED:
+        return item
+    original = near_dups.match(fp)
+    reused = await near_dups.output(original) if original is not None else None
+    if reused is None:
+        near_dups.begin(item["_id"], fp)
+        begun.add(item["_id"])
+        return item
+    item.update(reused)
+    item["duplicate_of"] = original
+    return item
+
+
+def _abandon(item: dict):
+    near_dups.abandon(item.get("_id"))
+
+
+async def _process_article(item: dict) -> dict:
+    if "duplicate_of" in item:
+        return item
+    art, entry = item["art"], item["entry"]
+    raw_content = art["text"]
+    lang = art["language"]
+
+    clean_content, clean_desc, topic, content_en = await process_article_via_llm(
+        raw_content, entry["summary"], lang
+    )
+
+    item.update({
+        "language": lang,
+        "content": clean_content,
+        "description": clean_desc,
+        "content_en": content_en,
+        "topic": topic,
+    })
+    return item
+
+
+async def _assign_thread(item: dict) -> dict:
+    if "duplicate_of" in item:
+        return item
+    item["thread_id"] = await assigner.assign(item["content_en"], item["topic"])
+    return item
+
+
+async def _persist_article(item: dict, writer: ArticleWriter, ledger: CrawlLedger):
+    art, thread_id = item["art"], item["thread_id"]
+    base_doc = {
+        "_id": item["_id"],
+        "url": item["entry"]["link"],
+        "url_key": item["url_key"],
+        "source": item["src"]["source"],
+        "title": art["title"],
+        "description": item["description"],
+        "published": item["entry"]["published"],
+        "author": art["authors"][0] if art["authors"] else None,
+        "language": item["language"],
+        "content": item["content"],
+        "content_en": item["content_en"],
+        "image": art["top_image"],
+        "topic": item["topic"],
+        "thread_id": thread_id,
+        "fetched_at": datetime.utcnow(),
+    }
+    if art["simhash"] is not None:
+        base_doc["simhash"] = to_int64(art["simhash"])
+    if "duplicate_of" in item:
+        base_doc["duplicate_of"] = item["duplicate_of"]
+
+    # the languagetool backend blocks on its worker process, keep it off the event loop
+    score_fields = await executors.run_io(
+        compute_score_fields,
+        base_doc,
+        credibility_map,
+        get_domain,
+        grammar_ok=item.get("grammar_ok")
+    )
+
+    doc = {**base_doc, **score_fields}
+    ledger.written(item)
+    written = await writer.add(doc)
+    if "duplicate_of" not in item:
+        near_dups.finish_when_stored(doc, written)
+
+
+def _stage_event(stage: str, src: dict, items: int, out: int, dropped: int, errors: int,
+                 seconds: float) -> dict:
+    return {
+        "stage": stage, "feed": src["feedUrl"], "source": src["source"],
+        "items": items, "out": out, "dropped": dropped, "errors": errors, "seconds": seconds,
+    }
+
+
+def _observe(stage: str, handler, on_event: Optional[Callable[[dict], None]], last: bool = False):
+    """Wraps a run_stage handler to report each item it finishes or fails on."""
+    if on_event is None:
+        return handler
+
+    async def observed(item):
+        # fetch stage items are the sources themselves
+        src = item.get("src", item)
+        started = time.perf_counter()
+        try:
+            result = await handler(item)
+        except Exception:
+            on_event(_stage_event(stage, src, 1, 0, 0, 1, time.perf_counter() - started))
+            raise
+        # the last stage returns nothing once it has handed the item on
+        out = 1 if last else 0 if result is None else len(result) if isinstance(result, list) else 1
+        on_event(_stage_event(stage, src, 1, out, int(out == 0), 0, time.perf_counter() - started))
+        return result
+
+    return observed
+
+
+def _observe_batch(stage: str, handler, on_event: Optional[Callable[[dict], None]]):
+    """Same as _observe for run_batch_stage; the batch time is split across feeds."""
+    if on_event is None:
+        return handler
+
+    async def observed(items: list) -> list:
+        started = time.perf_counter()
+        sources = {item["src"]["feedUrl"]: item["src"] for item in items}
+        received = Counter(item["src"]["feedUrl"] for item in items)
+        try:
+            result = await handler(items)
+        except Exception:
+            seconds = time.perf_counter() - started
+            for feed, n in received.items():
+                on_event(_stage_event(stage, sources[feed], n, 0, 0, n, seconds * n / len(items)))
+            raise
+        seconds = time.perf_counter() - started
+        kept = Counter(item["src"]["feedUrl"] for item in result)
+        for feed, n in received.items():
+            on_event(_stage_event(stage, sources[feed], n, kept[feed], n - kept[feed], 0,
+                                  seconds * n / len(items)))
+        return result
+
+    return observed
+
+
+async def crawl_and_process(sources: Optional[List[dict]] = None,
+                            on_event: Optional[Callable[[dict], None]] = None) -> int:
+    """
+    Runs every feed of `sources` (default: RSS_SOURCES) through a staged pipeline:
+    fetch feeds -> bulk url dedup -> download articles -> near-duplicate check -> LLM processing
+    -> thread assignment -> persistence.
+    Each stage has its own worker count and is fed by a bounded queue; the last
+    one buffers articles and writes them in batches (see ArticleWriter). Feed
+    entries are marked seen once the run is over, if their article was stored
+    or skipped on purpose (see CrawlLedger).
+    `on_event` receives a dict per item and stage: counts in/out/dropped/failed
+    and the time spent, tagged with the item's feed (see app.crawl_jobs).
+    """
+    queues = [asyncio.Queue(maxsize=STAGE_QUEUE_SIZE) for _ in range(7)]
+    writer = ArticleWriter()
+    ledger = CrawlLedger()
+    begun: Set[ObjectId] = set()
+    if NEAR_DUP_ENABLED:
+        await near_dups.sync()
+
+    stages = [
+        run_stage("fetch", _observe("fetch", lambda src: _fetch_feed(src, ledger), on_event), queues[0], queues[1],
+                  FETCH_CONCURRENCY),
+        run_batch_stage("dedup", _observe_batch("dedup", lambda items: _dedup_entries(items, ledger), on_event),
+                        queues[1], queues[2]),
+        run_stage("download", _observe("download", _download_article, on_event), queues[2], queues[3],
+                  DOWNLOAD_CONCURRENCY),
+        run_stage("near_dup", _observe("near_dup", lambda item: _check_near_duplicate(item, begun), on_event),
+                  queues[3], queues[4], DOWNLOAD_CONCURRENCY, on_drop=_abandon),
+        run_stage("llm", _observe("llm", _process_article, on_event), queues[4], queues[5],
+                  LLM_CONCURRENCY, on_drop=_abandon),
+        run_stage("assign", _observe("assign", _assign_thread, on_event), queues[5], queues[6],
+                  ASSIGN_CONCURRENCY, on_drop=_abandon),
+        run_stage("persist", _observe("persist", lambda item: _persist_article(item, writer, ledger), on_event,
+                                      last=True),
+                  queues[6], None, PERSIST_CONCURRENCY, on_drop=_abandon),
+    ]
+
+    async def feed_sources():
+        for src in (RSS_SOURCES if sources is None else sources):
+            await queues[0].put(src)
+        await queues[0].put(DONE)
+
+    try:
+        await asyncio.gather(feed_sources(), *stages)
+        await writer.close()
+    except BaseException:
+        # a cancelled or failed crawl never writes the originals it has in flight,
+        # and copies in other jobs may be waiting on them
+        for aid in begun:
+            near_dups.abandon(aid)
+        raise
+    # a duplicate key means another run stored the article first
+    await ledger.save(lost={f["_id"] for f in writer.failed if f["code"] != DUPLICATE_KEY})
+    return writer.inserted
+
+
+async def _run_standalone() -> int:
+    await ensure_indexes()
+    assigner.start()
+    count = await crawl_and_process()
+    # without the app lifespan nothing else flushes pending title and related updates
+    await title_refresher.flush(force=True)
+    await related_refresher.flush(force=True)
+    await assigner.stop()
+    return count
+
+
+if __name__ == "__main__":
+    count = asyncio.run(_run_standalone())
     print(f"Crawled and processed {count} new articles.")
@@ -1,3 +1,10 @@
+from typing import Optional
+
+from app.config import GRAMMAR_BACKEND
+from app.grammar import get_grammar_backend
+from app.matchers import CredibilityMatcher, credibility_matcher
+
+
 def label_from_score(score: int) -> str:
     if score >= 80:
         return "high"
@@ -5,7 +12,12 @@ def label_from_score(score: int) -> str:
         return "medium"
     return "low"
 
-def compute_score_fields(article: dict, credibility_map: dict, assess_grammar, is_clickbait, is_ad_content, get_domain) -> dict:
+def compute_score_fields(article: dict, credibility_map: dict, get_domain,
+                         grammar_backend: str = GRAMMAR_BACKEND,
+                         matcher: CredibilityMatcher = credibility_matcher,
+                         grammar_ok: Optional[bool] = None) -> dict:
+    """`grammar_ok` skips the grammar check when its result is already known
+    (near-duplicate copies share their original's cleaned content)."""
     score = 0
     domain = get_domain(article.get("url", ""))
     trust = credibility_map.get(domain, "unrated")
@@ -15,13 +27,16 @@ def compute_score_fields(article: dict, credibility_map: dict, assess_grammar, i
     elif trust == "medium":
         score += 20
 
-    if assess_grammar(article.get("content", "")):
+    if grammar_ok is None:
+        grammar_ok = bool(get_grammar_backend(grammar_backend).assess(article.get("content", "")))
+    if grammar_ok:
         score += 15
 
     title = article.get("title", "")
     content = article.get("content", "")
-    ad = is_ad_content(title, content)
-    clickbait = is_clickbait(title)
+    signals = matcher.signals(title, content)
+    ad = bool(signals["ad"])
+    clickbait = bool(signals["clickbait"])
 
     if not clickbait:
         score += 10
@@ -44,5 +59,7 @@ def compute_score_fields(article: dict, credibility_map: dict, assess_grammar, i
         "credibility_score": final_score,
         "credibility_label": label_from_score(final_score),
         "is_clickbait": clickbait,
-        "is_ad": ad
+        "is_ad": ad,
+        "credibility_signals": signals,
+        "grammar_ok": grammar_ok,
     }
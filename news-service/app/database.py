@@ -6,3 +6,6 @@ db = mongo_client["aware_news"]
 raw_rss_col = db["raw_rss"]
 articles_col = db["articles"]
 threads_col = db["threads"]
+feed_state_col = db["feed_state"]
+llm_cache_col = db["llm_cache"]
+thread_assigner_state_col = db["thread_assigner_state"]
@@ -0,0 +1,58 @@
+from typing import Dict, Set
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from app.config import RECENT_URLS_CACHE_SIZE
+from app.database import articles_col
+from app.lru import LRUCache
+
+
+# urls known to be stored already, so repeat runs skip the Mongo lookup
+recent_urls = LRUCache(RECENT_URLS_CACHE_SIZE)
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form stored as the article `url_key` (its `url` stays the feed
+    link): no utm_* params, no fragment, lowercase scheme and host, without a
+    leading `www.` label."""
+    try:
+        parts = urlparse(url.strip())
+    except ValueError:
+        return url
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode([
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_")
+    ])
+    return urlunparse((parts.scheme.lower(), host, parts.path, parts.params, query, ""))
+
+
+def stored_urls_query(candidates: Dict[str, str]) -> dict:
+    """Articles matching any of {normalized url: original link}."""
+    return {"$or": [
+        {"url_key": {"$in": list(candidates)}},
+        # articles stored before url_key have the raw feed link, or for a while
+        # the normalized one, as their url
+        {"url": {"$in": list(set(candidates) | set(candidates.values()))}},
+    ]}
+
+
+async def find_new_urls(candidates: Dict[str, str]) -> Set[str]:
+    """Takes {normalized url: original link} and returns the normalized urls
+    that are not stored yet, using a single query."""
+    pending = {norm: raw for norm, raw in candidates.items() if norm not in recent_urls}
+    if not pending:
+        return set()
+
+    existing = set()
+    async for doc in articles_col.find(stored_urls_query(pending), {"url": 1, "url_key": 1, "_id": 0}):
+        existing.add(doc.get("url_key") or normalize_url(doc["url"]))
+
+    for norm in existing:
+        recent_urls.put(norm)
+    return {norm for norm in pending if norm not in existing}
+
+
+def mark_seen(url: str):
+    recent_urls.put(url)
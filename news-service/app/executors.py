@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Optional
+
+import feedparser
+from dateutil import parser as date_parser
+from langdetect import detect, DetectorFactory
+from newspaper import Article as NewsArticle
+
+from app.config import IO_POOL_SIZE, CPU_POOL_SIZE, NEAR_DUP_MIN_WORDS
+from app.fingerprint import simhash
+
+# This module is imported by the process pool workers, so it must stay free of
+# database clients and other heavy app state.
+
+DetectorFactory.seed = 0
+
+_io_pool: Optional[ThreadPoolExecutor] = None
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_io_pool() -> ThreadPoolExecutor:
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="crawl-io")
+    return _io_pool
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool
+    if _cpu_pool is None:
+        # spawn instead of fork: the parent runs an event loop and driver threads
+        _cpu_pool = ProcessPoolExecutor(
+            max_workers=CPU_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _cpu_pool
+
+
+async def run_io(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_io_pool(), partial(fn, *args, **kwargs))
+
+
+async def run_cpu(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_cpu_pool(), partial(fn, *args, **kwargs))
+
+
+def shutdown():
+    global _io_pool, _cpu_pool
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=False, cancel_futures=True)
+        _io_pool = None
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
+
+
+# ─── Blocking work, run inside the pools ─────────────────────────────────────────────
+
+def published_from_entry(entry) -> Optional[datetime]:
+    if entry.get("published_parsed"):
+        return datetime.fromtimestamp(time.mktime(entry["published_parsed"]))
+    if entry.get("published"):
+        try:
+            return date_parser.parse(entry["published"])
+        except:
+            pass
+    return None
+
+
+def fetch_feed(url: str, etag: Optional[str] = None, modified: Optional[str] = None) -> dict:
+    feed = feedparser.parse(url, etag=etag, modified=modified)
+    status = feed.get("status")
+    if status == 304:
+        return {"status": 304, "etag": etag, "modified": modified, "entries": []}
+    return {
+        "status": status,
+        "etag": feed.get("etag", etag),
+        "modified": feed.get("modified", modified),
+        "entries": [
+            {
+                "guid": entry.get("id") or entry.get("link"),
+                "link": entry.get("link"),
+                "summary": entry.get("summary") or "",
+                "published": published_from_entry(entry),
+            }
+            for entry in feed.entries
+            if entry.get("link")
+        ],
+    }
+
+
+def download_html(url: str) -> str:
+    art = NewsArticle(url)
+    art.download()
+    return art.html
+
+
+def detect_language(text: str) -> str:
+    try:
+        return detect(text)
+    except:
+        return "unknown"
+
+
+def parse_article(url: str, html: str) -> dict:
+    art = NewsArticle(url)
+    art.download(input_html=html)
+    art.parse()
+    text = art.text or ""
+    return {
+        "title": art.title,
+        "text": text,
+        "authors": list(art.authors),
+        "top_image": art.top_image or None,
+        "language": detect_language(text),
+        "simhash": simhash(text, NEAR_DUP_MIN_WORDS),
+    }
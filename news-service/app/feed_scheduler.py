@@ -0,0 +1,70 @@
+"""
+Background polling of RSS_SOURCES at per-feed intervals.
+
+Every poll stores the feed's learned publishing rate and its `next_poll` in
+feed_state (see feed_state.poll_schedule), whether the crawl came from here or
+from POST /crawl. Every FEED_SCHEDULER_TICK seconds the scheduler submits the
+feeds that are due as one crawl job, so it never overlaps a manual crawl of the
+same feeds.
+"""
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from app.config import FEED_SCHEDULER_TICK, RSS_SOURCES
+from app.crawl_jobs import crawl_jobs
+from app.database import feed_state_col
+
+logger = logging.getLogger(__name__)
+
+
+class FeedScheduler:
+    def __init__(self, sources: Optional[List[dict]] = None, tick: float = FEED_SCHEDULER_TICK):
+        self.sources = RSS_SOURCES if sources is None else sources
+        self.tick = tick
+        self._scheduler: Optional[AsyncIOScheduler] = None
+
+    async def due_sources(self) -> List[dict]:
+        urls = [src["feedUrl"] for src in self.sources]
+        next_poll = {
+            state["_id"]: state.get("next_poll")
+            async for state in feed_state_col.find({"_id": {"$in": urls}}, {"next_poll": 1})
+        }
+        now = datetime.utcnow()
+        # feeds never polled (or polled before schedules were kept) are due right away
+        return [src for src in self.sources if (next_poll.get(src["feedUrl"]) or now) <= now]
+
+    async def poll_due(self) -> int:
+        try:
+            due = await self.due_sources()
+            if not due:
+                return 0
+            job, _ = await crawl_jobs.submit(due)
+            await job.wait()
+            logger.info("crawl job %s polled %d feeds: %s, %s new articles",
+                        job.id, len(job.sources), job.status, job.crawled)
+            return job.crawled or 0
+        except Exception:
+            logger.exception("scheduled crawl failed")
+            return 0
+
+    def start(self):
+        if self._scheduler is not None:
+            return
+        self._scheduler = AsyncIOScheduler()
+        # one tick at a time: a long crawl delays the next tick instead of overlapping it
+        self._scheduler.add_job(
+            self.poll_due, "interval", seconds=self.tick, id="poll-feeds",
+            max_instances=1, coalesce=True, next_run_time=datetime.now(),
+        )
+        self._scheduler.start()
+
+    async def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+
+feed_scheduler = FeedScheduler()
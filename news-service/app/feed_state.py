@@ -0,0 +1,203 @@
+import hashlib
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.config import (
+    CRAWL_LEASE_SECONDS, FEED_MAX_ATTEMPTS, FEED_POLL_JITTER, FEED_POLL_MAX_SECONDS, FEED_POLL_MIN_SECONDS, FEED_RATE_SMOOTHING,
+    FEED_SEEN_GUIDS, FEED_TARGET_NEW_PER_POLL,
+)
+from app.database import feed_state_col
+
+
+async def load_feed_state(feed_url: str) -> dict:
+    return await feed_state_col.find_one({"_id": feed_url}) or {"_id": feed_url, "seen_guids": []}
+
+
+async def save_feed_state(feed_url: str, status: Optional[int] = None, schedule: Optional[dict] = None):
+    """Records a poll. etag, modified and seen_guids are left to CrawlLedger,
+    which only moves them on once the poll's entries are settled."""
+    await feed_state_col.update_one(
+        {"_id": feed_url},
+        {"$set": {
+            "last_status": status,
+            "last_fetched": datetime.utcnow(),
+            **(schedule or {}),
+        }},
+        upsert=True
+    )
+
+
+# ─── entry outcomes ──────────────────────────────────────────────────────────────────
+
+def _guid_key(guid: str) -> str:
+    # guids are usually urls, and dots are not allowed in field names
+    return hashlib.sha1(guid.encode("utf-8")).hexdigest()
+
+
+class CrawlLedger:
+    """What became of the entries one crawl took from each feed.
+
+    A guid is added to seen_guids only once its article is stored or it was
+    skipped on purpose (past MAX_ARTICLES_PER_SOURCE, already stored, or a copy
+    of another entry's link). Entries still open when the crawl is saved failed
+    somewhere on the way: later polls retry them, up to FEED_MAX_ATTEMPTS times,
+    and the feed keeps its previous etag/modified so that the next poll is not
+    answered with a 304.
+    """
+
+    def __init__(self):
+        self._feeds: Dict[str, dict] = {}
+        self._written: Dict[ObjectId, dict] = {}
+
+    def fetched(self, feed_url: str, etag: Optional[str], modified: Optional[str],
+                entries: List[str], skipped: List[str]):
+        self._feeds[feed_url] = {"etag": etag, "modified": modified, "open": set(entries), "done": list(skipped)}
+
+    def done(self, item: dict):
+        feed = self._feeds.get(item["src"]["feedUrl"])
+        guid = item["entry"]["guid"]
+        if feed is not None and guid in feed["open"]:
+            feed["open"].discard(guid)
+            feed["done"].append(guid)
+
+    def written(self, item: dict):
+        """The item's article was handed to the ArticleWriter; see save()."""
+        self._written[item["_id"]] = item
+
+    async def save(self, lost: Set[ObjectId] = frozenset()):
+        """Settles every feed. `lost` are the written articles the writer could not store."""
+        for article_id, item in self._written.items():
+            if article_id not in lost:
+                self.done(item)
+        for feed_url, feed in self._feeds.items():
+            await _settle_feed(feed_url, feed)
+
+
+async def _settle_feed(feed_url: str, feed: dict):
+    state = await feed_state_col.find_one({"_id": feed_url}, {"entry_failures": 1}) or {}
+    failures = state.get("entry_failures", {})
+    seen = list(feed["done"])
+    for guid in seen:
+        failures.pop(_guid_key(guid), None)
+    retry = False
+    for guid in feed["open"]:
+        key = _guid_key(guid)
+        attempts = failures.pop(key, 0) + 1
+        if attempts >= FEED_MAX_ATTEMPTS:
+            seen.append(guid)
+        else:
+            failures[key] = attempts
+            retry = True
+
+    # entries that left the feed while failing would otherwise be kept forever
+    fields = {"entry_failures": dict(list(failures.items())[-FEED_SEEN_GUIDS:])}
+    if not retry:
+        fields.update(etag=feed["etag"], modified=feed["modified"])
+    update = {"$set": fields}
+    if seen:
+        update["$push"] = {"seen_guids": {"$each": seen, "$position": 0, "$slice": FEED_SEEN_GUIDS}}
+    await feed_state_col.update_one({"_id": feed_url}, update, upsert=True)
+
+
+# ─── crawl leases ────────────────────────────────────────────────────────────────────
+
+async def lease_feeds(feed_urls: List[str], owner: str, seconds: float = CRAWL_LEASE_SECONDS) -> Dict[str, str]:
+    """Takes the crawl lease of every feed that is free, expired or already
+    held by `owner`. Returns {feed url: owner} for the feeds someone else holds."""
+    now = datetime.utcnow()
+    held = {}
+    for feed_url in feed_urls:
+        try:
+            await feed_state_col.update_one(
+                {"_id": feed_url, "$or": [
+                    {"lease_owner": None}, {"lease_until": {"$lt": now}}, {"lease_owner": owner},
+                ]},
+                {"$set": {"lease_owner": owner, "lease_until": now + timedelta(seconds=seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # the feed exists but did not match: another owner's lease is live
+            state = await feed_state_col.find_one({"_id": feed_url}, {"lease_owner": 1})
+            held[feed_url] = (state or {}).get("lease_owner")
+    return held
+
+
+async def renew_feed_leases(feed_urls: List[str], owner: str, seconds: float = CRAWL_LEASE_SECONDS):
+    await feed_state_col.update_many(
+        {"_id": {"$in": feed_urls}, "lease_owner": owner},
+        {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=seconds)}}
+    )
+
+
+async def release_feeds(feed_urls: List[str], owner: str):
+    await feed_state_col.update_many(
+        {"_id": {"$in": feed_urls}, "lease_owner": owner},
+        {"$set": {"lease_owner": None, "lease_until": None}}
+    )
+
+
+# ─── polling schedule ────────────────────────────────────────────────────────────────
+
+def _naive_utc(t: datetime) -> datetime:
+    return t.astimezone(timezone.utc).replace(tzinfo=None) if t.tzinfo else t
+
+
+def publishing_rate(state: dict, new_entries: int, published: Iterable[Optional[datetime]],
+                    now: datetime) -> Optional[float]:
+    """New articles per hour, smoothed across polls, or None while unknown. A
+    poll contributes the rate implied by the timestamps of the entries in the
+    feed and the yield of new entries since the previous poll."""
+    samples = []
+    times = sorted(_naive_utc(t) for t in published if t)
+    if len(times) >= 2 and times[-1] > times[0]:
+        samples.append((len(times) - 1) / ((times[-1] - times[0]).total_seconds() / 3600))
+    last = state.get("last_fetched")
+    if last and now > last:
+        samples.append(new_entries / ((now - last).total_seconds() / 3600))
+    previous = state.get("poll_rate")
+    if not samples:
+        return previous
+    sample = sum(samples) / len(samples)
+    return sample if previous is None else FEED_RATE_SMOOTHING * sample + (1 - FEED_RATE_SMOOTHING) * previous
+
+
+def poll_interval(rate: Optional[float], errors: int = 0) -> float:
+    """Seconds until the next poll of a feed publishing `rate` articles an hour.
+    Feeds whose rate is still unknown are polled as often as allowed."""
+    if rate is None:
+        interval = FEED_POLL_MIN_SECONDS
+    elif rate > 0:
+        interval = FEED_TARGET_NEW_PER_POLL * 3600 / rate
+    else:
+        interval = FEED_POLL_MAX_SECONDS
+    interval = min(max(interval, FEED_POLL_MIN_SECONDS), FEED_POLL_MAX_SECONDS)
+    if errors:
+        interval = max(interval, min(FEED_POLL_MIN_SECONDS * 2 ** errors, FEED_POLL_MAX_SECONDS))
+    # spread feeds out instead of polling them in lockstep
+    return interval * random.uniform(1 - FEED_POLL_JITTER, 1 + FEED_POLL_JITTER)
+
+
+def poll_schedule(state: dict, new_entries: int, published: Iterable[Optional[datetime]]) -> dict:
+    """Fields to store after a successful poll (see save_feed_state)."""
+    now = datetime.utcnow()
+    rate = publishing_rate(state, new_entries, published, now)
+    return {"poll_rate": rate, "poll_errors": 0, "next_poll": now + timedelta(seconds=poll_interval(rate))}
+
+
+async def record_feed_error(state: dict, status: Optional[int] = None):
+    errors = state.get("poll_errors", 0) + 1
+    now = datetime.utcnow()
+    await feed_state_col.update_one(
+        {"_id": state["_id"]},
+        {"$set": {
+            "last_status": status,
+            "last_error": now,
+            "poll_errors": errors,
+            "next_poll": now + timedelta(seconds=poll_interval(state.get("poll_rate"), errors)),
+        }},
+        upsert=True
+    )
@@ -0,0 +1,48 @@
+"""
+64-bit SimHash of article text, used to spot near-duplicate copies of a story.
+
+Kept free of app state because it runs inside the parsing process pool
+(see executors.parse_article).
+"""
+import re
+from hashlib import blake2b
+from typing import Optional
+
+import numpy as np
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+BITS = 64
+
+
+def shingles(text: str, size: int = 3) -> set:
+    words = _WORD.findall(text.lower())
+    return {" ".join(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))} if words else set()
+
+
+def simhash(text: Optional[str], min_words: int = 100, size: int = 3) -> Optional[int]:
+    """SimHash over word `size`-shingles, or None for texts shorter than
+    `min_words` (paywall stubs and cookie walls all look alike)."""
+    if not text or len(_WORD.findall(text)) < min_words:
+        return None
+    grams = shingles(text, size)
+    hashes = np.fromiter(
+        (int.from_bytes(blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") for g in grams),
+        dtype=np.uint64, count=len(grams)
+    )
+    # one column per bit; each shingle votes +1 for its set bits and -1 for the rest
+    bits = np.unpackbits(hashes.astype("<u8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = (bits.sum(axis=0) * 2 > len(grams)).astype(np.uint8)
+    return int.from_bytes(np.packbits(majority, bitorder="little").tobytes(), "little")
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def to_int64(fp: int) -> int:
+    """BSON has no unsigned 64-bit integer."""
+    return fp - (1 << BITS) if fp >= 1 << (BITS - 1) else fp
+
+
+def from_int64(value: int) -> int:
+    return value + (1 << BITS) if value < 0 else value
@@ -0,0 +1,160 @@
+import abc
+import hashlib
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from app.config import GRAMMAR_BACKEND, GRAMMAR_SAMPLE_SENTENCES, GRAMMAR_CACHE_SIZE
+from app.lru import LRUCache
+
+ERROR_RATE_THRESHOLD = 0.05
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"\b\w+\b")
+
+# (pattern, errors counted per match) – cheap signals that correlate with sloppy text
+_HEURISTIC_RULES = [
+    re.compile(r"\b(\w+)\s+\1\b", re.IGNORECASE),                     # repeated word
+    re.compile(r"[,;:](?=[A-Za-z])"),                                 # missing space after punctuation
+    re.compile(r"\s+[,.;:!?]"),                                       # space before punctuation
+    re.compile(r"[!?]{2,}|\.{4,}"),                                   # stacked punctuation
+    re.compile(r"(?<![\w'’])i(?![\w'’])"),                            # lowercase pronoun "i"
+    re.compile(r"\ba\s+(?=[aeio]\w)", re.IGNORECASE),                 # "a apple"
+    re.compile(r"\ban\s+(?=[bcdfgjklmnpqrstvwxz]\w)", re.IGNORECASE),  # "an car"
+    re.compile(r"\b(could|should|would|must) of\b", re.IGNORECASE),
+    re.compile(r"\b(alot|definately|recieve|seperate|occured|untill|wich|thier)\b", re.IGNORECASE),
+]
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_SPLIT.split(text.strip()) if s]
+
+
+def sample_sentences(text: str, limit: int) -> List[str]:
+    """Evenly spaced, deterministic sample so long articles cost the same as short ones."""
+    sentences = split_sentences(text)
+    if len(sentences) <= limit:
+        return sentences
+    step = len(sentences) / limit
+    return [sentences[int(i * step)] for i in range(limit)]
+
+
+class GrammarScorer(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    def error_rate(self, text: str) -> float:
+        """Grammar errors per word."""
+
+    def assess(self, text: str) -> bool:
+        if not text.strip():
+            return False
+        return self.error_rate(text) < ERROR_RATE_THRESHOLD
+
+
+class HeuristicGrammarScorer(GrammarScorer):
+    name = "heuristic"
+
+    def error_rate(self, text: str) -> float:
+        words = len(_WORD.findall(text))
+        if not words:
+            return 1.0
+        errors = sum(len(rule.findall(text)) for rule in _HEURISTIC_RULES)
+        for sentence in split_sentences(text):
+            if sentence[0].islower():
+                errors += 1
+            if sentence.count("(") != sentence.count(")"):
+                errors += 1
+        return errors / words
+
+
+# ─── LanguageTool, hosted in its own worker process ─────────────────────────────────
+
+_lt_tool = None
+
+
+def _lt_count_matches(text: str) -> int:
+    global _lt_tool
+    if _lt_tool is None:
+        import language_tool_python
+        _lt_tool = language_tool_python.LanguageTool('en-US')
+    return len(_lt_tool.check(text))
+
+
+class LanguageToolScorer(GrammarScorer):
+    """Runs the Java-backed LanguageTool in a single worker process started on
+    first use, and only checks a sample of sentences per article."""
+    name = "languagetool"
+
+    def __init__(self, sample_sentences: int = GRAMMAR_SAMPLE_SENTENCES):
+        self.sample_size = sample_sentences
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def error_rate(self, text: str) -> float:
+        sample = " ".join(sample_sentences(text, self.sample_size))
+        words = len(sample.split())
+        if not words:
+            return 1.0
+        matches = self._get_pool().submit(_lt_count_matches, sample).result()
+        return matches / words
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class CachedGrammarScorer(GrammarScorer):
+    """Scoring runs on the executor threads, so the LRU is locked. The backend
+    call itself is not: two threads may score the same text at once."""
+
+    def __init__(self, backend: GrammarScorer, maxsize: int = GRAMMAR_CACHE_SIZE):
+        self.backend = backend
+        self.name = backend.name
+        self._cache = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    def error_rate(self, text: str) -> float:
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            rate = self._cache.get(key)
+        if rate is None:
+            rate = self.backend.error_rate(text)
+            with self._lock:
+                self._cache.put(key, rate)
+        return rate
+
+
+GRAMMAR_BACKENDS = {
+    HeuristicGrammarScorer.name: HeuristicGrammarScorer,
+    LanguageToolScorer.name: LanguageToolScorer,
+}
+_scorers: Dict[str, GrammarScorer] = {}
+_scorers_lock = threading.Lock()
+
+
+def get_grammar_backend(name: str = GRAMMAR_BACKEND) -> GrammarScorer:
+    if name not in GRAMMAR_BACKENDS:
+        raise ValueError(f"Unknown grammar backend: {name}")
+    with _scorers_lock:
+        if name not in _scorers:
+            _scorers[name] = CachedGrammarScorer(GRAMMAR_BACKENDS[name]())
+        return _scorers[name]
+
+
+def assess_grammar(text: str, backend: str = GRAMMAR_BACKEND) -> bool:
+    return get_grammar_backend(backend).assess(text)
+
+
+def shutdown():
+    for scorer in _scorers.values():
+        backend = getattr(scorer, "backend", scorer)
+        if isinstance(backend, LanguageToolScorer):
+            backend.close()
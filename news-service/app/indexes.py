@@ -0,0 +1,141 @@
+"""
+Every index the service relies on, declared in one place.
+
+`ensure_indexes()` runs at startup (INDEX_BOOTSTRAP=create) or only reports
+what is missing (INDEX_BOOTSTRAP=check). `verify_query_plans()` explains the
+queries the routers and the crawler issue and reports any that would fall back
+to a collection scan:
+
+    python -m app.maintenance ensure-indexes
+    python -m app.maintenance verify-query-plans
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from app import queries
+from app.config import LLM_CACHE_TTL_DAYS
+from app.database import db
+from app.dedup import stored_urls_query
+from app.pagination import sort_keys
+
+logger = logging.getLogger(__name__)
+
+
+def _listing(*prefix: str, field: str) -> list:
+    # keyset pagination seeks on (field, _id); see app.pagination
+    return [(p, ASCENDING) for p in prefix] + [(field, DESCENDING), ("_id", DESCENDING)]
+
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "articles": [
+        IndexModel([("url", ASCENDING)], name="url_unique", unique=True),
+        # crawler dedup; articles stored before url_key existed do not have one
+        IndexModel([("url_key", ASCENDING)], name="url_key_unique", unique=True,
+                   partialFilterExpression={"url_key": {"$exists": True}}),
+        # search index catch-up
+        IndexModel([("fetched_at", ASCENDING)], name="fetched_at"),
+        *[
+            IndexModel(_listing(*prefix, field=field), name="_".join([*prefix, field, "id"]))
+            for prefix in ((), ("topic",), ("language",))
+            for field in ("published", "views")
+        ],
+    ],
+    "threads": [
+        IndexModel([("articles", ASCENDING)], name="articles"),
+        IndexModel([("centroid_updated", ASCENDING)], name="centroid_updated"),
+        # /feed thread listing: article_count is the trailing range filter
+        *[
+            IndexModel(_listing(*prefix, field="last_updated") + [("article_count", ASCENDING)],
+                       name="_".join([*prefix, "last_updated_id_article_count"]))
+            for prefix in ((), ("topic",), ("languages",))
+        ],
+    ],
+    "llm_cache": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl",
+                   expireAfterSeconds=int(LLM_CACHE_TTL_DAYS * 86400)),
+    ],
+}
+
+
+async def ensure_indexes(create: bool = True) -> List[str]:
+    """Creates (or, with create=False, only looks for) every declared index.
+    Returns the names of the indexes that are missing afterwards."""
+    missing = []
+    for name, models in INDEXES.items():
+        existing = {tuple(info["key"].items()) for info in await db[name].list_indexes().to_list(None)}
+        for model in models:
+            doc = model.document
+            if tuple(doc["key"].items()) in existing:
+                continue
+            if create:
+                try:
+                    await db[name].create_indexes([model])
+                    continue
+                except PyMongoError:
+                    # e.g. duplicate urls in old data, or an index of that name with other options
+                    logger.exception("could not create index %s.%s", name, doc["name"])
+            missing.append(f"{name}.{doc['name']}")
+    if missing:
+        logger.warning("missing indexes: %s", ", ".join(missing))
+    return missing
+
+
+def router_queries() -> list:
+    """(label, collection, filter, sort) for the queries behind each endpoint
+    and background sync, built by the same app.queries helpers with placeholder
+    values."""
+    oid, now = ObjectId(), datetime.utcnow()
+    topics, langs = ["tech", "science"], ["en", "fr"]
+    published_pos = {"field": "published", "value": now, "id": oid}
+    updated_pos = {"field": "last_updated", "value": now, "id": oid}
+    by_published, by_views, by_updated = sort_keys("published"), sort_keys("views"), sort_keys("last_updated")
+    return [
+        ("get_article", "articles", {"_id": oid}, None),
+        ("get_article thread", "threads", queries.thread_of_article(oid), None),
+        ("list_by_topic published", "articles", queries.article_listing(topics, None), by_published),
+        ("list_by_topic views", "articles", queries.article_listing(topics, None, field="views"), by_views),
+        ("list_by_topic cursor", "articles", queries.article_listing(topics, None, published_pos), by_published),
+        ("feed articles", "articles", queries.article_listing(None, None), by_published),
+        ("feed articles by language", "articles", queries.article_listing(None, langs, field="views"), by_views),
+        ("feed articles by topic and language", "articles", queries.article_listing(topics, langs), by_published),
+        ("feed threads", "threads", queries.thread_listing(None, None), by_updated),
+        ("feed threads cursor", "threads", queries.thread_listing(None, None, updated_pos), by_updated),
+        ("feed threads by topic", "threads", queries.thread_listing(topics, None), by_updated),
+        ("feed threads by language", "threads", queries.thread_listing(None, langs), by_updated),
+        ("search page", "articles", queries.by_ids([oid]), None),
+        ("search index sync", "articles", queries.fetched_since(now), None),
+        ("near-duplicate index sync", "articles", queries.fingerprints_since(now), None),
+        ("crawler url dedup", "articles",
+         stored_urls_query({"https://example.com/a": "https://www.example.com/a?utm_source=rss"}), None),
+        ("related threads", "threads", queries.by_ids([oid]), None),
+        ("related threads by topic", "threads", queries.same_topic_threads(oid, "tech"), by_updated),
+        ("thread centroid sync", "threads", queries.centroids_since(now), None),
+    ]
+
+
+def _stages(plan: dict):
+    plan = plan.get("queryPlan", plan)
+    yield plan.get("stage")
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            yield from _stages(child)
+
+
+async def verify_query_plans() -> List[str]:
+    """Returns a description of every router query whose winning plan contains
+    a COLLSCAN."""
+    failures = []
+    for label, name, query, sort in router_queries():
+        cmd = {"find": name, "filter": query, "limit": 20}
+        if sort:
+            cmd["sort"] = dict(sort)
+        explained = await db.command("explain", cmd, verbosity="queryPlanner")
+        stages = list(_stages(explained["queryPlanner"]["winningPlan"]))
+        if "COLLSCAN" in stages:
+            failures.append(f"{label}: {' <- '.join(s for s in stages if s)}")
+    return failures
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import openai
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from app.config import OPENAI_BASE_URL, LLM_MODEL, LLM_MAX_IN_FLIGHT, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, \
+    LLM_BACKOFF_MAX, LLM_CACHE_ENABLED
+from app.database import llm_cache_col
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+
+def cache_key(model: str, messages: List[dict], max_tokens: int) -> str:
+    payload = json.dumps({"model": model, "messages": messages, "max_tokens": max_tokens},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMGateway:
+    """Single entry point for chat completions.
+
+    Bounds the number of requests in flight, retries rate limits and transient
+    errors with exponential backoff (honouring Retry-After), and caches answers
+    by a hash of the prompt so identical text is never sent twice. Only answers
+    that pass the caller's `validate` (by default: not empty) are cached, so a
+    malformed one is asked for again next time rather than served for good.
+    """
+
+    def __init__(
+            self,
+            client: Optional[AsyncOpenAI] = None,
+            model: str = LLM_MODEL,
+            max_in_flight: int = LLM_MAX_IN_FLIGHT,
+            max_retries: int = LLM_MAX_RETRIES,
+            cache_enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        # built on first use, so importing the app needs no OPENAI_API_KEY
+        self._client = client
+        self.model = model
+        self.max_retries = max_retries
+        self.cache_enabled = cache_enabled
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"calls": 0, "cache_hits": 0, "retries": 0}
+
+    async def complete(self, messages: List[dict], max_tokens: int, temperature: float = 0.0,
+                       validate: Callable[[str], bool] = bool) -> str:
+        key = cache_key(self.model, messages, max_tokens)
+
+        if self.cache_enabled:
+            cached = await llm_cache_col.find_one({"_id": key}, {"response": 1})
+            # entries cached before answers were validated may be unusable
+            if cached and validate(cached["response"]):
+                self.stats["cache_hits"] += 1
+                return cached["response"]
+
+        # syndicated copies processed concurrently share one request
+        if key in self._in_flight:
+            self.stats["cache_hits"] += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            text = await self._call(messages, max_tokens, temperature)
+            future.set_result(text)
+        except Exception as e:
+            future.set_exception(e)
+            # nobody else may be awaiting it; avoid "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        if self.cache_enabled and validate(text):
+            await llm_cache_col.update_one(
+                {"_id": key},
+                {"$set": {"response": text, "model": self.model, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        return text
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            # retries are handled by the gateway so they respect the shared semaphore
+            self._client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=OPENAI_BASE_URL, max_retries=0)
+        return self._client
+
+    async def _call(self, messages: List[dict], max_tokens: int, temperature: float) -> str:
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    self.stats["calls"] += 1
+                    resp = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+                return (resp.choices[0].message.content or "").strip()
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning("LLM call failed (%s), retrying in %.1fs", type(e).__name__, delay)
+                self.stats["retries"] += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        retry_after: Optional[str] = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_BACKOFF_MAX)
+            except ValueError:
+                pass
+        backoff = LLM_BACKOFF_BASE * (2 ** attempt)
+        return min(backoff, LLM_BACKOFF_MAX) * random.uniform(0.5, 1.0)
+
+
+gateway = LLMGateway()
@@ -1,5 +1,39 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from app import executors, grammar
+from app.config import FEED_SCHEDULER_ENABLED, INDEX_BOOTSTRAP
+from app.counters import article_counters
+from app.crawl_jobs import crawl_jobs
+from app.feed_scheduler import feed_scheduler
+from app.indexes import ensure_indexes
 from app.routers import router
+from app.search_index import search_index
+from app.thread_assigner import assigner, related_refresher, title_refresher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if INDEX_BOOTSTRAP != "off":
+        await ensure_indexes(create=INDEX_BOOTSTRAP == "create")
+    assigner.start()
+    title_refresher.start()
+    related_refresher.start()
+    article_counters.start()
+    search_index.start()
+    if FEED_SCHEDULER_ENABLED:
+        feed_scheduler.start()
+    yield
+    await feed_scheduler.stop()
+    await crawl_jobs.stop()
+    await search_index.stop()
+    await article_counters.stop()
+    await related_refresher.stop()
+    await title_refresher.stop()
+    await assigner.stop()
+    executors.shutdown()
+    grammar.shutdown()
+
 
-app = FastAPI(title="News Crawler Service")
+app = FastAPI(title="News Crawler Service", lifespan=lifespan)
 app.include_router(router)
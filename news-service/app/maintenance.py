@@ -0,0 +1,194 @@
+"""
+One-off maintenance commands for the news database.
+
+    python -m app.maintenance repair-thread-languages
+    python -m app.maintenance backfill-thread-fields
+    python -m app.maintenance check-thread-covers
+    python -m app.maintenance repair-thread-covers
+    python -m app.maintenance ensure-indexes
+    python -m app.maintenance verify-query-plans
+    python -m app.maintenance rebuild-related-threads
+"""
+import argparse
+import asyncio
+import sys
+
+from app.database import threads_col
+from app.indexes import ensure_indexes, verify_query_plans
+from app.thread_assigner import assigner, related_refresher
+
+
+def _language_counts(languages: str, all_languages: str) -> dict:
+    return {"$arrayToObject": {"$map": {
+        "input": languages,
+        "as": "lang",
+        "in": {
+            "k": "$$lang",
+            "v": {"$size": {"$filter": {"input": all_languages, "cond": {"$eq": ["$$this", "$$lang"]}}}},
+        },
+    }}}
+
+
+_MERGE_INTO_THREADS = {
+    "$merge": {"into": "threads", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}
+}
+
+
+def thread_languages_pipeline() -> list:
+    """Recomputes `languages` and `language_counts` of every thread from its
+    member articles and merges the result back into `threads`."""
+    return [
+        {"$lookup": {
+            "from": "articles",
+            "localField": "articles",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"_id": 0, "language": 1}}],
+            "as": "_members",
+        }},
+        {"$project": {
+            "languages": {"$setUnion": ["$_members.language", []]},
+            "_all": "$_members.language",
+        }},
+        {"$project": {
+            "languages": 1,
+            "language_counts": _language_counts("$languages", "$_all"),
+        }},
+        _MERGE_INTO_THREADS,
+    ]
+
+
+def thread_fields_pipeline() -> list:
+    """Backfills the denormalized fields the feed filters on: `article_count`,
+    `languages`/`language_counts` and, for threads created before it was
+    stored, `topic` (taken from the thread's first article)."""
+    return [
+        {"$lookup": {
+            "from": "articles",
+            "localField": "articles",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"language": 1, "topic": 1}}],
+            "as": "_members",
+        }},
+        {"$project": {
+            "article_count": {"$size": {"$ifNull": ["$articles", []]}},
+            "languages": {"$setUnion": ["$_members.language", []]},
+            "_all": "$_members.language",
+            "topic": {"$ifNull": ["$topic", {"$first": {"$filter": {
+                "input": "$_members",
+                "cond": {"$eq": ["$$this._id", {"$first": {"$ifNull": ["$articles", []]}}]},
+            }}}]},
+        }},
+        {"$project": {
+            "article_count": 1,
+            "languages": 1,
+            "language_counts": _language_counts("$languages", "$_all"),
+            # either the stored topic string or the first member document
+            "topic": {"$cond": [{"$eq": [{"$type": "$topic"}, "object"]}, "$topic.topic", "$topic"]},
+        }},
+        _MERGE_INTO_THREADS,
+    ]
+
+
+def thread_cover_pipeline() -> list:
+    """Pairs each thread's materialized `image`/`topic` with the values derived
+    from its first article (same rule as app.persistence.cover_fields). Threads
+    whose first article is gone keep their stored values."""
+    return [
+        {"$project": {"image": 1, "topic": 1, "_first": {"$first": {"$ifNull": ["$articles", []]}}}},
+        {"$lookup": {
+            "from": "articles",
+            "localField": "_first",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"image": 1, "topic": 1, "topics": 1}}],
+            "as": "_cover",
+        }},
+        {"$set": {"_cover": {"$first": "$_cover"}}},
+        {"$project": {
+            "image": {"$ifNull": ["$image", None]},
+            "topic": {"$ifNull": ["$topic", None]},
+            "expected_image": {"$cond": [
+                {"$eq": [{"$type": "$_cover"}, "missing"]},
+                {"$ifNull": ["$image", None]},
+                {"$ifNull": ["$_cover.image", None]},
+            ]},
+            "expected_topic": {"$ifNull": [{"$first": "$_cover.topics"}, "$_cover.topic", "$topic", None]},
+        }},
+        {"$match": {"$expr": {"$or": [
+            {"$ne": ["$image", "$expected_image"]},
+            {"$ne": ["$topic", "$expected_topic"]},
+        ]}}},
+    ]
+
+
+async def check_thread_covers():
+    mismatched = await threads_col.aggregate(thread_cover_pipeline()).to_list(None)
+    for t in mismatched[:20]:
+        print(t["_id"], {
+            field: (t[field], t[f"expected_{field}"])
+            for field in ("image", "topic") if t[field] != t[f"expected_{field}"]
+        })
+    print(len(mismatched), "threads disagree with their first article.")
+    if mismatched:
+        sys.exit(1)
+
+
+async def repair_thread_covers():
+    await threads_col.aggregate(thread_cover_pipeline() + [
+        {"$project": {"image": "$expected_image", "topic": "$expected_topic"}},
+        _MERGE_INTO_THREADS,
+    ]).to_list(None)
+    print("Re-materialized image and topic from first articles.")
+
+
+async def repair_thread_languages():
+    await threads_col.aggregate(thread_languages_pipeline()).to_list(None)
+    print("Recomputed languages for", await threads_col.count_documents({}), "threads.")
+
+
+async def backfill_thread_fields():
+    await threads_col.aggregate(thread_fields_pipeline()).to_list(None)
+    await ensure_indexes()
+    print("Backfilled topic, languages and article_count for",
+          await threads_col.count_documents({}), "threads.")
+
+
+async def create_indexes():
+    missing = await ensure_indexes()
+    if missing:
+        sys.exit(f"Could not create: {', '.join(missing)}")
+    print("All indexes present.")
+
+
+async def check_query_plans():
+    failures = await verify_query_plans()
+    for failure in failures:
+        print("COLLSCAN", failure)
+    if failures:
+        sys.exit(1)
+    print("Every router query uses an index.")
+
+
+async def rebuild_related_threads():
+    await assigner.ready()
+    tids = [t["_id"] async for t in threads_col.find({}, {"_id": 1})]
+    # every list is recomputed, so there is nothing to patch
+    rebuilt = await related_refresher.refresh(tids, propagate=False)
+    print("Rebuilt related threads for", len(rebuilt), "of", len(tids), "threads.")
+
+
+COMMANDS = {
+    "repair-thread-languages": repair_thread_languages,
+    "backfill-thread-fields": backfill_thread_fields,
+    "check-thread-covers": check_thread_covers,
+    "repair-thread-covers": repair_thread_covers,
+    "ensure-indexes": create_indexes,
+    "verify-query-plans": check_query_plans,
+    "rebuild-related-threads": rebuild_related_threads,
+}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="News database maintenance")
+    ap.add_argument("command", choices=sorted(COMMANDS))
+    args = ap.parse_args()
+    asyncio.run(COMMANDS[args.command]())
@@ -0,0 +1,129 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import CLICKBAIT_PATTERNS, AD_PATTERNS
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+_LITERAL = sre_parse.LITERAL
+_BRANCH = sre_parse.BRANCH
+_SUBPATTERN = sre_parse.SUBPATTERN
+_AT = sre_parse.AT
+
+
+def _longest_literal(items) -> str:
+    """Longest run of consecutive literal characters in a parsed sequence. A
+    character under a quantifier, in a class or in a group is not a LITERAL
+    node, so it ends the run instead of being taken as required."""
+    best, run = "", []
+    for op, av in items:
+        if op is _LITERAL:
+            run.append(chr(av))
+        else:
+            best, run = max(best, "".join(run), key=len), []
+    return max(best, "".join(run), key=len)
+
+
+def _anchors(items) -> Optional[List[str]]:
+    body = [(op, av) for op, av in items if op is not _AT]
+    if len(body) == 1:
+        op, av = body[0]
+        if op is _BRANCH:
+            anchors = []
+            for branch in av[1]:
+                found = _anchors(branch)
+                if found is None:
+                    return None
+                anchors.extend(found)
+            return anchors
+        # a plain group around the whole pattern, e.g. (?:buy|get) now is not one
+        if op is _SUBPATTERN and not av[1] and not av[2]:
+            return _anchors(av[-1])
+    literal = _longest_literal(items)
+    return [literal] if literal.strip() else None
+
+
+def literal_anchors(pattern: str) -> Optional[List[str]]:
+    """Literal substrings at least one of which must occur for `pattern` to match,
+    or None when some alternative has no required literal part to key on."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    anchors = _anchors(list(parsed))
+    if anchors is not None and parsed.state.flags & re.IGNORECASE:
+        anchors = [a.lower() for a in anchors]
+    return anchors
+
+
+class PatternMatcher:
+    """Matches a set of named regex rules against lowercased text.
+
+    Every rule is reduced to the literal phrases it cannot match without; those
+    are located with plain substring search (C speed, no per-position regex
+    attempts), and only rules whose phrases occur are confirmed with their regex.
+    Python's `re` cannot skip ahead on a large alternation, so a single combined
+    pattern is slower than this on long articles (see benchmarks/bench_matcher.py).
+    """
+
+    def __init__(self, rules: Dict[str, str]):
+        self.rules = dict(rules)
+        self._compiled = [
+            (name, re.compile(pat), literal_anchors(pat)) for name, pat in self.rules.items()
+        ]
+
+    def _candidates(self, lowered: str):
+        for name, regex, anchors in self._compiled:
+            if anchors is None or any(a in lowered for a in anchors):
+                yield name, regex
+
+    def search(self, text: str) -> bool:
+        if not text:
+            return False
+        lowered = text.lower()
+        return any(regex.search(lowered) for _, regex in self._candidates(lowered))
+
+    def matches(self, text: str) -> List[Tuple[str, str]]:
+        """(rule name, matched text) for every hit."""
+        if not text:
+            return []
+        lowered = text.lower()
+        return [
+            (name, m.group(0))
+            for name, regex in self._candidates(lowered)
+            for m in regex.finditer(lowered)
+        ]
+
+    def fired(self, text: str) -> List[str]:
+        if not text:
+            return []
+        lowered = text.lower()
+        return [name for name, regex in self._candidates(lowered) if regex.search(lowered)]
+
+
+class CredibilityMatcher:
+    def __init__(self, clickbait_patterns: List[str], ad_patterns: List[str]):
+        self.clickbait = PatternMatcher({f"clickbait_{i}": p for i, p in enumerate(clickbait_patterns)})
+        self.ads = PatternMatcher({f"ad_{i}": p for i, p in enumerate(ad_patterns)})
+
+    def is_clickbait(self, title: str) -> bool:
+        return self.clickbait.search(title)
+
+    def is_ad(self, title: str, content: str) -> bool:
+        # title and content are scanned separately instead of being joined
+        return self.ads.search(title) or self.ads.search(content)
+
+    def signals(self, title: str, content: str) -> Dict[str, List[str]]:
+        return {
+            "clickbait": self.clickbait.fired(title),
+            "ad": sorted(set(self.ads.fired(title)) | set(self.ads.fired(content))),
+        }
+
+    def signals_many(self, items: Iterable[Tuple[str, str]]) -> List[Dict[str, List[str]]]:
+        return [self.signals(title or "", content or "") for title, content in items]
+
+
+credibility_matcher = CredibilityMatcher(CLICKBAIT_PATTERNS, AD_PATTERNS)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from bson import ObjectId
 
@@ -68,14 +68,44 @@ class Article(BaseModel):
     }
 
 
-class CrawlResponse(BaseModel):
-    success: bool
-    crawled: int
+class CrawlStage(BaseModel):
+    items: int
+    out: int
+    dropped: int
+    errors: int
+    seconds: float
+
+
+class CrawlFeed(BaseModel):
+    source: str
+    # items each stage passed on for this feed
+    stages: Dict[str, int]
+    errors: int
+
+
+class CrawlJob(BaseModel):
+    id: str
+    status: str = Field(description="queued, running, succeeded, failed or cancelled")
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    feed_count: int
+    # feed url -> id of the job that was already crawling it
+    skipped: Dict[str, str] = {}
+    crawled: Optional[int] = None
+    errors: int = 0
+    error: Optional[str] = None
+    stages: Dict[str, CrawlStage] = {}
+    feeds: Dict[str, CrawlFeed] = {}
 
 
 class FeedResponse(BaseModel):
     articles: Optional[List[Article]] = None
     threads: Optional[List[Thread]] = None
+    next_cursor: Optional[str] = None
+    # /search only: facet value counts and highlighted snippets by article id
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+    highlights: Optional[Dict[str, str]] = None
 
     model_config = {
         "populate_by_name": True,
@@ -0,0 +1,154 @@
+"""
+Near-duplicate detection for the crawl pipeline.
+
+Wire stories and syndicated copies arrive under different urls. Each parsed
+article gets a SimHash (app.fingerprint), stored on its document as `simhash`;
+articles fetched in the last NEAR_DUP_WINDOW_DAYS are kept in a banded index so
+a copy within NEAR_DUP_MAX_DISTANCE bits is found with a few dict lookups.
+
+A copy reuses the LLM output and thread of the article it matches instead of
+being processed again. The original may still be in flight in this process:
+`begin()` registers it as soon as it is fingerprinted, and copies wait until
+it is stored (`finish_when_stored()`) or abandoned, after which they are
+processed normally.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from bson import ObjectId
+
+from app.config import NEAR_DUP_MAX_DISTANCE, NEAR_DUP_WINDOW_DAYS
+from app.database import articles_col
+from app.fingerprint import BITS, distance, from_int64
+from app.lru import LRUCache
+from app.queries import fingerprints_since
+
+# what a copy takes over from its original
+REUSED_FIELDS = ("language", "content", "description", "content_en", "topic", "thread_id", "grammar_ok")
+# as in the search index: fetched_at precedes the batched insert
+_SYNC_OVERLAP = timedelta(minutes=2)
+
+
+class NearDuplicateIndex:
+    def __init__(self, max_distance: int = NEAR_DUP_MAX_DISTANCE,
+                 window: timedelta = timedelta(days=NEAR_DUP_WINDOW_DAYS)):
+        self.max_distance = max_distance
+        self.window = window
+        # split into max_distance + 1 bands: two fingerprints within max_distance
+        # bits of each other agree exactly on at least one band
+        n_bands = max_distance + 1
+        width = BITS // n_bands
+        self._bands = [(i * width, BITS if i == n_bands - 1 else (i + 1) * width) for i in range(n_bands)]
+        self._buckets: List[Dict[int, Set[ObjectId]]] = [{} for _ in self._bands]
+        self._fingerprints: Dict[ObjectId, int] = {}
+        self._added: Dict[ObjectId, datetime] = {}
+        self._pending: Dict[ObjectId, asyncio.Future] = {}
+        self._recent = LRUCache(1000)
+        self._synced_until: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def _keys(self, fp: int):
+        for i, (lo, hi) in enumerate(self._bands):
+            yield i, (fp >> lo) & ((1 << (hi - lo)) - 1)
+
+    def add(self, aid: ObjectId, fp: int, added: Optional[datetime] = None):
+        self.remove(aid)
+        self._fingerprints[aid] = fp
+        self._added[aid] = added or datetime.utcnow()
+        for i, key in self._keys(fp):
+            self._buckets[i].setdefault(key, set()).add(aid)
+
+    def remove(self, aid: ObjectId):
+        fp = self._fingerprints.pop(aid, None)
+        if fp is None:
+            return
+        self._added.pop(aid, None)
+        for i, key in self._keys(fp):
+            bucket = self._buckets[i].get(key)
+            if bucket is not None:
+                bucket.discard(aid)
+                if not bucket:
+                    del self._buckets[i][key]
+
+    def match(self, fp: int) -> Optional[ObjectId]:
+        """The closest indexed article within max_distance bits, if any."""
+        best, best_distance = None, self.max_distance + 1
+        for i, key in self._keys(fp):
+            for aid in self._buckets[i].get(key, ()):
+                d = distance(fp, self._fingerprints[aid])
+                if d < best_distance:
+                    best, best_distance = aid, d
+        return best
+
+    # ─── articles in flight ─────────────────────────────────────────────────────────
+
+    def begin(self, aid: ObjectId, fp: int):
+        self.add(aid, fp)
+        self._pending[aid] = asyncio.get_running_loop().create_future()
+
+    def finish(self, aid: ObjectId, doc: dict):
+        self._recent.put(aid, {field: doc.get(field) for field in REUSED_FIELDS})
+        future = self._pending.pop(aid, None)
+        if future is not None and not future.done():
+            future.set_result(self._recent.get(aid))
+
+    def finish_when_stored(self, doc: dict, written: asyncio.Future):
+        """Finishes `doc` once the ArticleWriter future `written` reports it
+        stored, and abandons it if the write failed: copies must never take over
+        the output (and thread) of an original that is not in Mongo."""
+        def settle(future: asyncio.Future):
+            if not future.cancelled() and future.result() is None:
+                self.finish(doc["_id"], doc)
+            else:
+                self.abandon(doc["_id"])
+
+        written.add_done_callback(settle)
+
+    def abandon(self, aid: Optional[ObjectId]):
+        """`aid` will never be stored; copies waiting on it process themselves."""
+        future = self._pending.pop(aid, None)
+        if future is None:
+            return
+        self.remove(aid)
+        if not future.done():
+            future.set_result(None)
+
+    async def output(self, aid: ObjectId) -> Optional[dict]:
+        """What a copy of `aid` reuses, waiting for it if it is still in flight."""
+        cached = self._recent.get(aid)
+        if cached is not None:
+            return cached
+        future = self._pending.get(aid)
+        if future is not None:
+            return await asyncio.shield(future)
+        doc = await articles_col.find_one({"_id": aid}, {field: 1 for field in REUSED_FIELDS})
+        if doc is None or doc.get("thread_id") is None:
+            # deleted since it was indexed
+            self.remove(aid)
+            return None
+        out = {field: doc.get(field) for field in REUSED_FIELDS}
+        self._recent.put(aid, out)
+        return out
+
+    # ─── persistence ────────────────────────────────────────────────────────────────
+
+    async def sync(self) -> int:
+        """Indexes fingerprints stored since the last sync and drops those that
+        fell out of the window."""
+        started = datetime.utcnow()
+        horizon = started - self.window
+        since = max(self._synced_until - _SYNC_OVERLAP, horizon) if self._synced_until else horizon
+        added = 0
+        async for doc in articles_col.find(fingerprints_since(since), {"simhash": 1, "fetched_at": 1}):
+            self.add(doc["_id"], from_int64(doc["simhash"]), doc["fetched_at"])
+            added += 1
+        for aid in [aid for aid, at in self._added.items() if at < horizon and aid not in self._pending]:
+            self.remove(aid)
+        self._synced_until = started
+        return added
+
+
+near_dups = NearDuplicateIndex()
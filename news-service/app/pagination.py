@@ -0,0 +1,95 @@
+"""
+Opaque keyset cursors for the listing endpoints.
+
+A cursor records, per listing ("articles", "threads"), the sort field and the
+`(value, _id)` of the last item served. The next page is everything strictly
+after that position in `(field desc, _id desc)` order, so each page costs one
+index seek no matter how deep it is, and inserts at the head of the listing
+do not shift later pages.
+
+Every listing sends the cursor of its next page in the X-Next-Cursor header;
+/feed and /search also return it as `next_cursor` in the body.
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Dict, Optional
+
+from bson import ObjectId, json_util
+from bson.errors import InvalidBSON
+from fastapi import HTTPException
+
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+# what a cursor position may hold for each sort field; anything else would
+# compare across BSON types and silently skip or repeat items
+_VALUE_TYPES = {
+    "published": (datetime,),
+    "last_updated": (datetime,),
+    "views": (int, float),
+}
+
+
+def sort_keys(field: str) -> list:
+    return [(field, -1), ("_id", -1)]
+
+
+def position(doc: dict, field: str) -> dict:
+    """Position of `doc` in a listing sorted by `field`; call before the
+    document's values are converted for the response."""
+    return {"field": field, "value": doc.get(field), "id": doc["_id"]}
+
+
+def encode_cursor(positions: Dict[str, dict]) -> Optional[str]:
+    if not positions:
+        return None
+    raw = json_util.dumps(positions).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def cursor_headers(token: Optional[str]) -> Dict[str, str]:
+    return {CURSOR_HEADER: token} if token else {}
+
+
+def decode_cursor(token: str) -> Dict[str, dict]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        positions = json_util.loads(raw)
+    except (binascii.Error, ValueError, InvalidBSON):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if not isinstance(positions, dict):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return positions
+
+
+def after(pos: dict, field: str) -> dict:
+    """Filter for the items following `pos` in `(field desc, _id desc)` order.
+
+    Missing and null values sort last, so once the cursor is past every
+    non-null value only the null tail is left to walk.
+    """
+    if not isinstance(pos, dict) or pos.get("field") != field or "id" not in pos:
+        raise HTTPException(status_code=400, detail="cursor does not match the requested sort")
+    value, oid = pos.get("value"), pos["id"]
+    if not isinstance(oid, ObjectId):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if value is not None and (isinstance(value, bool) or not isinstance(value, _VALUE_TYPES.get(field, ()))):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if value is None:
+        return {field: None, "_id": {"$lt": oid}}
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "_id": {"$lt": oid}},
+        {field: None},
+    ]}
+
+
+def offset_of(pos: dict, field: str) -> int:
+    """Offset stored by listings that are ranked in memory (see /search)."""
+    if not isinstance(pos, dict) or pos.get("field") != field:
+        raise HTTPException(status_code=400, detail="cursor does not match the requested sort")
+    offset = pos.get("offset")
+    if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return offset
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.cache import response_cache, thread_key
+from app.config import PERSIST_BATCH_SIZE, PERSIST_FLUSH_SECONDS
+from app.database import articles_col, threads_col
+from app.dedup import mark_seen
+from app.search_index import search_index
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+def cover_fields(article: dict) -> dict:
+    """Thread fields derived from its first article."""
+    fields = {"image": article.get("image")}
+    topics = article.get("topics") or ([article.get("topic")] if article.get("topic") else [])
+    if topics:
+        fields["topic"] = topics[0]
+    return fields
+
+
+def thread_updates(docs: List[dict]) -> List[UpdateOne]:
+    """One update per thread appending all of its new articles and languages.
+    Threads are created by the assigner; one deleted since is not brought back."""
+    by_thread: Dict[object, List[dict]] = {}
+    for doc in docs:
+        by_thread.setdefault(doc["thread_id"], []).append(doc)
+
+    now = datetime.utcnow()
+    ops = []
+    for tid, members in by_thread.items():
+        counts: Dict[str, int] = {}
+        for doc in members:
+            counts[doc["language"]] = counts.get(doc["language"], 0) + 1
+        ops.append(UpdateOne(
+            {"_id": tid},
+            {
+                "$addToSet": {
+                    "articles": {"$each": [doc["_id"] for doc in members]},
+                    "languages": {"$each": list(counts)},
+                },
+                "$inc": {
+                    "article_count": len(members),
+                    **{f"language_counts.{lang}": n for lang, n in counts.items()},
+                },
+                "$set": {"last_updated": now},
+            },
+        ))
+    return ops
+
+
+def cover_updates(docs: List[dict]) -> List[UpdateOne]:
+    """Cover fields for threads that have no article yet, from the first of
+    `docs` to join each. Run before thread_updates: the thread's first stored
+    article becomes its cover, not the article that opened it, which may never
+    be written."""
+    first: Dict[object, dict] = {}
+    for doc in docs:
+        first.setdefault(doc["thread_id"], doc)
+    return [UpdateOne({"_id": tid, "article_count": 0}, {"$set": cover_fields(doc)}) for tid, doc in first.items()]
+
+
+async def refresh_thread_cover(tid):
+    thread = await threads_col.find_one({"_id": tid}, {"articles": {"$slice": 1}})
+    first = thread.get("articles") if thread else None
+    if not first:
+        return
+    article = await articles_col.find_one({"_id": first[0]}, {"image": 1, "topics": 1, "topic": 1})
+    if article:
+        await threads_col.update_one({"_id": tid}, {"$set": cover_fields(article)})
+
+
+async def detach_article(article: dict):
+    """Removes a deleted article from its thread, keeping the denormalized counts,
+    languages and cover fields in step. Returns the thread id, if any."""
+    aid, lang = article["_id"], article.get("language")
+    inc = {"article_count": -1}
+    if lang:
+        inc[f"language_counts.{lang}"] = -1
+    before = await threads_col.find_one_and_update(
+        {"articles": aid},
+        {"$pull": {"articles": aid}, "$inc": inc},
+        projection={"articles": {"$slice": 1}},
+    )
+    if before is None:
+        return None
+
+    tid = before["_id"]
+    if lang:
+        await threads_col.update_one(
+            {"_id": tid, f"language_counts.{lang}": {"$lte": 0}},
+            {"$pull": {"languages": lang}, "$unset": {f"language_counts.{lang}": ""}}
+        )
+    if before.get("articles", [None])[0] == aid:
+        await refresh_thread_cover(tid)
+    return tid
+
+
+def _failure(doc: dict, code: Optional[int], error: str) -> dict:
+    return {"_id": doc["_id"], "url": doc.get("url"), "code": code, "error": error}
+
+
+class ArticleWriter:
+    """Buffers processed articles and writes them with one insert_many and one
+    bulk_write of thread updates per batch.
+
+    A batch is flushed when it reaches `max_batch` documents or `max_delay`
+    seconds after its first document, whichever comes first. `add()` returns a
+    future that the flush resolves with None once the article is stored, or
+    with its failure; failures are also collected in `failed`.
+    """
+
+    def __init__(self, max_batch: int = PERSIST_BATCH_SIZE, max_delay: float = PERSIST_FLUSH_SECONDS):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.inserted = 0
+        self.failed: List[dict] = []
+        self._buffer: List[dict] = []
+        self._waiters: Dict[ObjectId, asyncio.Future] = {}
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+
+    def pending(self, article_id: ObjectId) -> Optional[dict]:
+        return next((doc for doc in self._buffer if doc["_id"] == article_id), None)
+
+    async def add(self, doc: dict) -> asyncio.Future:
+        doc.setdefault("_id", ObjectId())
+        written = asyncio.get_running_loop().create_future()
+        self._waiters[doc["_id"]] = written
+        self._buffer.append(doc)
+        if len(self._buffer) >= self.max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        return written
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("timed article flush failed")
+
+    async def flush(self) -> dict:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        async with self._lock:
+            batch, self._buffer = self._buffer, []
+            waiters = {doc["_id"]: self._waiters.pop(doc["_id"]) for doc in batch}
+            if not batch:
+                return {"inserted": 0, "failed": []}
+
+            inserted, failed = 0, None
+            try:
+                inserted, failed = await self._write(batch)
+            finally:
+                if failed is None:
+                    # cancelled or crashed halfway: nothing in the batch is known to be stored
+                    failed = [_failure(doc, None, "write interrupted") for doc in batch]
+                by_id = {f["_id"]: f for f in failed}
+                for article_id, written in waiters.items():
+                    if not written.done():
+                        written.set_result(by_id.get(article_id))
+                self.failed.extend(failed)
+
+            self.inserted += inserted
+            return {"inserted": inserted, "failed": failed}
+
+    async def _write(self, batch: List[dict]) -> Tuple[int, List[dict]]:
+        """Returns how many articles were inserted and what failed, which
+        includes inserted articles whose thread could not be updated."""
+        failed: List[dict] = []
+        try:
+            await articles_col.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed.append(_failure(batch[err["index"]], err.get("code"), err.get("errmsg")))
+        except PyMongoError as e:
+            # connection loss, timeouts, write concern: no telling which documents landed
+            failed = [_failure(doc, None, repr(e)) for doc in batch]
+
+        failed_ids = {f["_id"] for f in failed}
+        stored = [doc for doc in batch if doc["_id"] not in failed_ids]
+        for doc in stored:
+            mark_seen(doc["url_key"])
+        search_index.add_many(stored)
+
+        if stored:
+            ops = thread_updates(stored)
+            # same order as the ops: one per thread, by first appearance
+            tids = list(dict.fromkeys(doc["thread_id"] for doc in stored))
+            try:
+                await threads_col.bulk_write(cover_updates(stored), ordered=False)
+            except PyMongoError:
+                # the articles still join their threads; backfill-thread-fields repairs covers
+                logger.exception("thread cover update failed")
+            failed_tids: Dict[object, str] = {}
+            try:
+                result = await threads_col.bulk_write(ops, ordered=False)
+                if result.matched_count < len(ops):
+                    logger.warning("%d threads were deleted before their new articles were added",
+                                   len(ops) - result.matched_count)
+            except BulkWriteError as e:
+                for err in e.details.get("writeErrors", []):
+                    failed_tids[tids[err["index"]]] = err.get("errmsg")
+            except PyMongoError as e:
+                failed_tids = {tid: repr(e) for tid in tids}
+            failed.extend(
+                _failure(doc, None, f"thread update failed: {failed_tids[doc['thread_id']]}")
+                for doc in stored if doc["thread_id"] in failed_tids
+            )
+            await response_cache.invalidate(*(thread_key(tid) for tid in tids))
+
+        for f in failed:
+            # duplicates are expected when two runs race on the same story
+            if f["code"] != DUPLICATE_KEY:
+                logger.warning("could not persist %s: %s", f["url"], f["error"])
+        return len(stored), failed
+
+    async def close(self) -> dict:
+        return await self.flush()
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DONE = object()
+
+
+class DomainThrottle:
+    """Spaces out requests to the same host by at least `delay` seconds.
+
+    Different domains never wait on each other, so many sources can be
+    crawled in parallel while each host still sees a polite request rate.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._last_hit: Dict[str, float] = {}
+
+    async def wait(self, domain: str):
+        lock = self._locks.setdefault(domain, asyncio.Lock())
+        async with lock:
+            elapsed = time.monotonic() - self._last_hit.get(domain, 0.0)
+            if elapsed < self.delay:
+                await asyncio.sleep(self.delay - elapsed)
+            self._last_hit[domain] = time.monotonic()
+
+
+async def run_stage(
+        name: str,
+        handler: Callable[[object], Awaitable[object]],
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue],
+        concurrency: int,
+        on_drop: Optional[Callable[[object], None]] = None,
+):
+    """Runs `concurrency` workers that pull items from `inbox` until DONE.
+
+    Whatever the handler returns is pushed to `outbox`: None drops the item,
+    a list fans out into several items. `on_drop` is called with every item
+    the handler failed on, was cancelled in, or (before the last stage)
+    dropped. When every worker has finished, DONE is forwarded so the next
+    stage can shut down too.
+    """
+
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is DONE:
+                # put it back so sibling workers see it as well
+                await inbox.put(DONE)
+                return
+            try:
+                result = await handler(item)
+            except asyncio.CancelledError:
+                if on_drop is not None:
+                    on_drop(item)
+                raise
+            except Exception:
+                logger.exception("stage %s failed on item", name)
+                if on_drop is not None:
+                    on_drop(item)
+                continue
+            if outbox is None:
+                continue
+            if result is None:
+                if on_drop is not None:
+                    on_drop(item)
+                continue
+            for out in (result if isinstance(result, list) else [result]):
+                await outbox.put(out)
+
+    await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    if outbox is not None:
+        await outbox.put(DONE)
+
+
+async def run_batch_stage(
+        name: str,
+        handler: Callable[[list], Awaitable[list]],
+        inbox: asyncio.Queue,
+        outbox: asyncio.Queue,
+):
+    """Collects every item from `inbox`, hands them to `handler` in one call and
+    forwards the returned items. Used where one bulk operation beats many small ones."""
+    items = []
+    while True:
+        item = await inbox.get()
+        if item is DONE:
+            break
+        items.append(item)
+
+    try:
+        results = await handler(items) if items else []
+    except Exception:
+        logger.exception("stage %s failed", name)
+        results = []
+    for out in results:
+        await outbox.put(out)
+    await outbox.put(DONE)
@@ -0,0 +1,70 @@
+"""
+Filters behind the endpoints and the background syncs.
+
+The routers and syncs build their queries here, and indexes.router_queries
+calls the same functions with placeholder values, so `verify_query_plans()`
+explains exactly the queries that are served.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+
+from app.pagination import after
+
+# threads are listed once a second article has joined them
+THREAD_MIN_ARTICLES = 2
+
+
+def by_ids(ids: list) -> dict:
+    return {"_id": {"$in": ids}}
+
+
+def thread_of_article(article_id: ObjectId) -> dict:
+    # articles stored before thread_id was recorded are found by membership
+    return {"articles": article_id}
+
+
+def article_listing(topics: Optional[List[str]], languages: Optional[List[str]],
+                    pos: Optional[dict] = None, field: str = "published") -> dict:
+    """Articles in any of `topics` and `languages` (None: no restriction),
+    after the cursor position `pos` when paging by cursor."""
+    query: dict = {}
+    if topics is not None:
+        query["topic"] = {"$in": topics}
+    if languages is not None:
+        query["language"] = {"$in": languages}
+    if pos is not None:
+        query.update(after(pos, field))
+    return query
+
+
+def thread_listing(topics: Optional[List[str]], languages: Optional[List[str]],
+                   pos: Optional[dict] = None) -> dict:
+    """Same as article_listing for threads, which are always sorted by last_updated.
+    topic, languages and article_count are denormalized onto threads, so this is
+    a single indexed query (see app.maintenance backfill-thread-fields)."""
+    query: dict = {"article_count": {"$gte": THREAD_MIN_ARTICLES}}
+    if topics is not None:
+        query["topic"] = {"$in": topics}
+    if languages is not None:
+        query["languages"] = {"$in": languages}
+    if pos is not None:
+        query.update(after(pos, "last_updated"))
+    return query
+
+
+def same_topic_threads(thread_id: ObjectId, topic: str) -> dict:
+    return {"_id": {"$ne": thread_id}, "topic": topic}
+
+
+def fetched_since(since: Optional[datetime]) -> dict:
+    return {"fetched_at": {"$gt": since}} if since else {}
+
+
+def fingerprints_since(since: datetime) -> dict:
+    return {"fetched_at": {"$gt": since}, "simhash": {"$exists": True}}
+
+
+def centroids_since(since: Optional[datetime]) -> dict:
+    return {"centroid_updated": {"$gt": since}} if since else {}
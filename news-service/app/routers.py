@@ -1,73 +1,117 @@
 from fastapi import APIRouter, HTTPException, Path, Query, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from bson import ObjectId
-from datetime import datetime
-from app.models import Article, CrawlResponse, FeedResponse, Thread
+from app.models import Article, CrawlJob, FeedResponse, Thread
+from app.cache import article_key, response_cache, thread_key
+from app.config import RSS_SOURCES
+from app.counters import article_counters
 from app.database import articles_col, threads_col
-from app.crawler import crawl_and_process
+from app.persistence import detach_article
+from app.search_index import search_index
+from app import queries
+from app.pagination import cursor_headers, decode_cursor, encode_cursor, offset_of, position, sort_keys
+from app.serializers import ARTICLE_FIELDS, THREAD_FIELDS, article_out, feed_out, json_response, thread_out
+from app.crawl_jobs import crawl_jobs
+from app.thread_assigner import assigner, related_refresher
 
 router = APIRouter()
 
 
-@router.post("/crawl", response_model=CrawlResponse)
-async def trigger_crawl():
-    count = await crawl_and_process()
-    return {"success": True, "crawled": count}
+@router.post(
+    "/crawl",
+    response_model=CrawlJob,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Start a crawl in the background (or get the one already crawling these feeds)",
+)
+async def trigger_crawl(
+        sources: Optional[str] = Query(None, description="Comma-separated feed urls or source names; all by default"),
+):
+    selected = None
+    if sources:
+        wanted = {s.strip() for s in sources.split(",") if s.strip()}
+        selected = [src for src in RSS_SOURCES if src["feedUrl"] in wanted or src["source"] in wanted]
+        unknown = wanted - {src["feedUrl"] for src in selected} - {src["source"] for src in selected}
+        if unknown:
+            raise HTTPException(400, detail=f"Unknown sources: {', '.join(sorted(unknown))}")
+    job, created = await crawl_jobs.submit(selected)
+    return json_response(
+        job.out(),
+        headers={"Location": f"/crawl/{job.id}"},
+        status_code=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+    )
 
 
-@router.get("/articles/{id}", response_model=Article)
-async def get_article(id: str):
+def _crawl_job(job_id: str):
+    job = crawl_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Crawl job not found")
+    return job
+
+
+@router.get("/crawl/{job_id}", response_model=CrawlJob, summary="Status and progress of a crawl job")
+async def get_crawl(job_id: str = Path(..., description="id returned by POST /crawl")):
+    return json_response(_crawl_job(job_id).out())
+
+
+@router.get(
+    "/crawl/{job_id}/events",
+    summary="Server-sent events with per-feed progress, stage timings and error counts until the job ends",
+)
+async def stream_crawl(job_id: str = Path(..., description="id returned by POST /crawl")):
+    job = _crawl_job(job_id)
+    return StreamingResponse(
+        job.stream(),
+        media_type="text/event-stream",
+        # no buffering in reverse proxies (nginx honours X-Accel-Buffering)
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _thread_id(thread_id: str):
+    if thread_id.isdigit():
+        return int(thread_id)
     try:
-        oid = ObjectId(id)
+        return ObjectId(thread_id)
     except Exception:
-        raise HTTPException(status_code=400, detail="invalid article id")
-
-    doc = await articles_col.find_one({"_id": oid})
-    if not doc:
-        raise HTTPException(status_code=404, detail="Not found")
+        raise HTTPException(status_code=400, detail="Invalid thread ID format")
 
-    doc['views'] = doc.get('views', 0)
 
-    doc['commentsCount'] = doc.get('commentsCount', 0)
-    doc["reports"] = doc.get("reports", 0)
+async def _load_article(oid: ObjectId) -> Optional[dict]:
+    doc = await articles_col.find_one({"_id": oid}, ARTICLE_FIELDS)
+    if not doc:
+        return None
 
-    doc["credibility_label"] = doc.get("credibility_label", "unrated")
+    if doc.get("thread_id") is None:
+        thr = await threads_col.find_one(queries.thread_of_article(oid), {"_id": 1})
+        doc["thread_id"] = thr["_id"] if thr else None
+    return doc
 
-    pub = doc.get("published")
-    if isinstance(pub, datetime):
-        doc["published"] = pub.isoformat()
 
-    if "topics" not in doc:
-        t = doc.get("topic")
-        doc["topics"] = [t] if t else []
+async def _load_thread(tid) -> Optional[dict]:
+    thr_doc = await threads_col.find_one({"_id": tid}, THREAD_FIELDS)
+    return thread_out(thr_doc) if thr_doc else None
 
-    thr_doc = await threads_col.find_one({"articles": oid})
-    if thr_doc:
-        thr_doc["_id"] = str(thr_doc["_id"])
-        thr_doc["articles"] = [str(a) for a in thr_doc.get("articles", [])]
 
-        lu = thr_doc.get("last_updated")
-        if isinstance(lu, datetime):
-            thr_doc["last_updated"] = lu.isoformat()
+async def _thread_view(tid) -> Optional[dict]:
+    return await response_cache.get_or_load(thread_key(tid), lambda: _load_thread(tid))
 
-        thr_doc["language"] = thr_doc.get("language", "en")
 
-        if thr_doc["articles"]:
-            first_oid = ObjectId(thr_doc["articles"][0])
-            art = await articles_col.find_one(
-                {"_id": first_oid},
-                {"image": 1, "topics": 1, "topic": 1}
-            )
-            if art:
-                thr_doc["image"] = art.get("image")
-                topics = art.get("topics") or ([art.get("topic")] if art.get("topic") else [])
-                thr_doc["topic"] = topics[0] if topics else None
+@router.get("/articles/{id}", response_model=Article)
+async def get_article(id: str):
+    try:
+        oid = ObjectId(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="invalid article id")
 
-        doc["thread"] = thr_doc
-    else:
-        doc["thread"] = None
+    doc = await response_cache.get_or_load(article_key(oid), lambda: _load_article(oid))
+    if not doc:
+        raise HTTPException(status_code=404, detail="Not found")
 
-    return doc
+    tid = doc.get("thread_id")
+    thread = await _thread_view(tid) if tid is not None else None
+    # counts not written yet by the counter buffer are added on top
+    return json_response(article_out(doc, thread, article_counters.deltas(oid)))
 
 
 @router.get(
@@ -78,38 +122,10 @@ async def get_article(id: str):
 async def get_thread(
         thread_id: str = Path(..., description="Either the integer cluster ID or a Mongo ObjectId")
 ):
-    if thread_id.isdigit():
-        query = {"_id": int(thread_id)}
-    else:
-        try:
-            oid = ObjectId(thread_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid thread ID format")
-        query = {"_id": oid}
-
-    thr_doc = await threads_col.find_one(query)
+    thr_doc = await _thread_view(_thread_id(thread_id))
     if not thr_doc:
         raise HTTPException(status_code=404, detail="Thread not found")
-
-    thr_doc["language"] = thr_doc.get("language", "en")
-    lu = thr_doc.get("last_updated")
-    if isinstance(lu, datetime):
-        thr_doc["last_updated"] = lu.isoformat()
-    thr_doc["_id"] = str(thr_doc["_id"])
-    thr_doc["articles"] = [str(a) for a in thr_doc.get("articles", [])]
-
-    if thr_doc["articles"]:
-        first_oid = ObjectId(thr_doc["articles"][0])
-        art = await articles_col.find_one(
-            {"_id": first_oid},
-            {"image": 1, "topics": 1, "topic": 1}
-        )
-        if art:
-            thr_doc["image"] = art.get("image")
-            topics = art.get("topics") or ([art.get("topic")] if art.get("topic") else [])
-            thr_doc["topic"] = topics[0] if topics else None
-
-    return Thread.model_validate(thr_doc)
+    return json_response(thr_doc)
 
 
 @router.delete(
@@ -123,9 +139,15 @@ async def delete_article(id: str = Path(..., description="Mongo ObjectId of the
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid article id")
 
-    result = await articles_col.delete_one({"_id": oid})
-    if result.deleted_count == 0:
+    deleted = await articles_col.find_one_and_delete({"_id": oid}, {"language": 1})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Article not found")
+    search_index.remove(oid)
+    keys = [article_key(oid)]
+    tid = await detach_article(deleted)
+    if tid is not None:
+        keys.append(thread_key(tid))
+    await response_cache.invalidate(*keys)
     return
 
 
@@ -137,18 +159,13 @@ async def delete_article(id: str = Path(..., description="Mongo ObjectId of the
 async def delete_thread(
         thread_id: str = Path(..., description="Either integer cluster ID or Mongo ObjectId")
 ):
-    if thread_id.isdigit():
-        query = {"_id": int(thread_id)}
-    else:
-        try:
-            oid = ObjectId(thread_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid thread ID format")
-        query = {"_id": oid}
+    query = {"_id": _thread_id(thread_id)}
 
     result = await threads_col.delete_one(query)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Thread not found")
+    assigner.forget(query["_id"])
+    await response_cache.invalidate(thread_key(query["_id"]))
 
     return
 
@@ -156,7 +173,7 @@ async def delete_thread(
 @router.get(
     "/threads/{thread_id}/related",
     response_model=List[Thread],
-    summary="Get up to 4 threads whose titles match this one (fallback to same topic)"
+    summary="Get up to 4 threads closest to this one by content (fallback to same topic)"
 )
 async def get_related_threads(
         thread_id: str = Path(..., description="Mongo ObjectId of the thread"),
@@ -166,43 +183,30 @@ async def get_related_threads(
         base_oid = ObjectId(thread_id)
     except Exception:
         raise HTTPException(400, detail="Invalid thread ID format")
-    base = await threads_col.find_one({"_id": base_oid})
+    base = await threads_col.find_one({"_id": base_oid}, {"related": 1, "topic": 1})
     if not base:
         raise HTTPException(404, detail="Thread not found")
 
-    base["_id"] = str(base["_id"])
-    base["articles"] = [str(a) for a in base.get("articles", [])]
-    if isinstance(base.get("last_updated"), datetime):
-        base["last_updated"] = base["last_updated"].isoformat()
-
-    related = await threads_col.find(
-        {"$text": {"$search": base["title"]}, "_id": {"$ne": base_oid}}
-    ).limit(max_results).to_list(length=max_results)
-
-    if len(related) < max_results:
-        topic = base.get("topic")
-        if not topic and base["articles"]:
-            art = await articles_col.find_one(
-                {"_id": ObjectId(base["articles"][0])},
-                {"topics": 1}
-            )
-            topic = (art.get("topics") or [None])[0] if art else None
+    related = base.get("related")
+    if related is None:
+        # not refreshed since related lists were introduced
+        await assigner.ready()
+        related = (await related_refresher.refresh([base_oid])).get(base_oid, [])
 
-        if topic:
-            more = await threads_col.find(
-                {"_id": {"$ne": base_oid}, "topic": topic}
-            ).limit(max_results - len(related)).to_list(length=max_results)
-            related.extend(more)
+    ids = [entry["_id"] for entry in related]
+    by_id = {
+        doc["_id"]: doc
+        async for doc in threads_col.find(queries.by_ids(ids), THREAD_FIELDS)
+    }
+    docs = [by_id[tid] for tid in ids if tid in by_id][:max_results]
 
-    output: List[Thread] = []
-    for doc in related:
-        doc["_id"] = str(doc["_id"])
-        doc["articles"] = [str(a) for a in doc.get("articles", [])]
-        lu = doc.get("last_updated")
-        if isinstance(lu, datetime):
-            doc["last_updated"] = lu.isoformat()
-        output.append(Thread.model_validate(doc))
-    return output
+    if not docs and base.get("topic"):
+        # no centroid to compare with yet
+        docs = await threads_col.find(
+            queries.same_topic_threads(base_oid, base["topic"]), THREAD_FIELDS
+        ).sort(sort_keys("last_updated")).limit(max_results).to_list(length=max_results)
+
+    return json_response([thread_out(doc) for doc in docs])
 
 
 @router.get(
@@ -214,29 +218,29 @@ async def list_by_topic(
         topics: str = Path(..., description="Comma-separated topics"),
         page: int = Query(1, ge=1),
         size: int = Query(20, ge=1, le=100),
-        sort: str = Query("published", description="Sort by 'published' or 'views'")
+        sort: str = Query("published", description="Sort by 'published' or 'views'"),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page; replaces `page`"),
 ):
-    topic_list = [t.strip() for t in topics.split(",") if t.strip()]
-    skip = (page - 1) * size
     order_field = sort if sort in ("published", "views") else "published"
 
-    cursor = (
+    pos, skip = None, (page - 1) * size
+    if cursor:
+        pos = decode_cursor(cursor).get("articles")
+        if pos is None:
+            return json_response([])
+        skip = 0
+    query = queries.article_listing(_csv(topics), None, pos, order_field)
+
+    docs = await (
         articles_col
-        .find({"topic": {"$in": topic_list}})
-        .sort(order_field, -1)
+        .find(query, ARTICLE_FIELDS)
+        .sort(sort_keys(order_field))
         .skip(skip)
         .limit(size)
-    )
-    docs = await cursor.to_list(length=size)
+    ).to_list(length=size)
 
-    for doc in docs:
-        pub = doc.get("published")
-        if isinstance(pub, datetime):
-            doc["published"] = pub.isoformat()
-        if "topics" not in doc:
-            t = doc.get("topic")
-            doc["topics"] = [t] if t else []
-    return docs
+    next_cursor = encode_cursor({"articles": position(docs[-1], order_field)}) if len(docs) == size else None
+    return json_response([article_out(doc) for doc in docs], headers=cursor_headers(next_cursor))
 
 
 @router.get(
@@ -259,93 +263,65 @@ async def get_feed(
         page: int = Query(1, ge=1),
         size: int = Query(20, ge=1, le=100),
         sort: Optional[str] = Query("published", description="Sort by 'published' or 'views'"),
-) -> FeedResponse:
-    global count_articles
+        cursor: Optional[str] = Query(
+            None, description="`next_cursor` (or X-Next-Cursor) of the previous page; replaces `page`"
+        ),
+):
     skip = (page - 1) * size
-    result = FeedResponse()
+    articles, threads = None, None
+    # with a cursor, a listing it has no position for is already exhausted
+    positions = decode_cursor(cursor) if cursor else None
+    next_positions: dict = {}
+    topic_list = _csv(topics) if topics else None
+    lang_list = _csv(languages) if languages else None
 
     # --- ARTICLES ---
     if feed_type in ("articles", "both"):
-        art_q: dict = {}
-        if topics:
-            tlist = [t.strip() for t in topics.split(",") if t.strip()]
-            art_q["topic"] = {"$in": tlist}
-        if languages:
-            lang_list = [l.strip() for l in languages.split(",") if l.strip()]
-            art_q["language"] = {"$in": lang_list}
         order_field = sort if sort in ("published", "views") else "published"
 
-        art_cursor = (
-            articles_col
-            .find(art_q)
-            .sort(order_field, -1)
-            .skip(skip)
-            .limit(size)
-        )
-        docs = await art_cursor.to_list(length=size)
-
-        for d in docs:
-            d["_id"] = str(d["_id"])
-            if isinstance(d.get("published"), datetime):
-                d["published"] = d["published"].isoformat()
-            if "topics" not in d:
-                d["topics"] = [d.get("topic")] if d.get("topic") else []
-            if "thread_id" in d:
-                d["thread_id"] = str(d["thread_id"])
-            if isinstance(d.get("fetched_at"), datetime):
-                d["fetched_at"] = d["fetched_at"].isoformat()
-            d["credibility_label"] = d.get("credibility_label", "unrated")
-            d["reports"] = d.get("reports", 0)
-
-            d["thread"] = None
-
-        result.articles = [Article.model_validate(d) for d in docs]
+        docs = []
+        if positions is None or "articles" in positions:
+            art_skip = skip if positions is None else 0
+            pos = None if positions is None else positions["articles"]
+            art_q = queries.article_listing(topic_list, lang_list, pos, order_field)
+            art_cursor = (
+                articles_col
+                .find(art_q, ARTICLE_FIELDS)
+                .sort(sort_keys(order_field))
+                .skip(art_skip)
+                .limit(size)
+            )
+            docs = await art_cursor.to_list(length=size)
+            if len(docs) == size:
+                next_positions["articles"] = position(docs[-1], order_field)
+
+        articles = docs
 
     # --- THREADS ---
     if feed_type in ("threads", "both"):
-        art_q: dict = {}
-        if topics:
-            tlist = [t.strip() for t in topics.split(",") if t.strip()]
-            art_q["topic"] = {"$in": tlist}
-
-        lang_list = []
-        if languages:
-            lang_list = [l.strip() for l in languages.split(",") if l.strip()]
-            art_q["language"] = {"$in": lang_list}
-
-        art_ids_cursor = articles_col.find(art_q, {"_id": 1})
-        art_id_docs = await art_ids_cursor.to_list(None)
-        art_ids = [doc["_id"] for doc in art_id_docs]
-
-        thr_q = {
-            "articles": {"$in": art_ids},
-            "$expr": {"$gte": [{"$size": "$articles"}, 2]},
-        }
-        if lang_list:
-            thr_q["languages"] = {"$in": lang_list}
-
-        thr_cursor = (
-            threads_col
-            .find(thr_q)
-            .sort("last_updated", -1)
-            .skip(skip)
-            .limit(size)
-        )
-        ths = await thr_cursor.to_list(length=size)
-
-        for t in ths:
-            t["_id"] = str(t["_id"])
-            if isinstance(t.get("last_updated"), datetime):
-                t["last_updated"] = t["last_updated"].isoformat()
-            t["language"] = t.get("language", "en")
-            t["articles"] = [str(a) for a in t.get("articles", [])]
-
-        result.threads = [Thread.model_validate(t) for t in ths]
+        ths = []
+        if positions is None or "threads" in positions:
+            thr_skip = skip if positions is None else 0
+            pos = None if positions is None else positions["threads"]
+            thr_q = queries.thread_listing(topic_list, lang_list, pos)
+            thr_cursor = (
+                threads_col
+                .find(thr_q, THREAD_FIELDS)
+                .sort(sort_keys("last_updated"))
+                .skip(thr_skip)
+                .limit(size)
+            )
+            ths = await thr_cursor.to_list(length=size)
+            if len(ths) == size:
+                next_positions["threads"] = position(ths[-1], "last_updated")
+
+        threads = ths
     if feed_type == "articles":
-        result.threads = []
+        threads = []
     elif feed_type == "threads":
-        result.articles = []
-    return result
+        articles = []
+    next_cursor = encode_cursor(next_positions)
+    return json_response(feed_out(articles, threads, next_cursor), headers=cursor_headers(next_cursor))
 
 
 @router.post("/articles/{id}/track-view")
@@ -355,7 +331,7 @@ async def track_article_view(id: str):
     except:
         raise HTTPException(400, "Invalid article ID")
 
-    await articles_col.update_one({"_id": oid}, {"$inc": {"views": 10}})
+    article_counters.incr(oid, "views", 10)
     return {"success": True}
 
 
@@ -373,6 +349,7 @@ async def update_comments_count(id: str, payload: dict):
     result = await articles_col.update_one({"_id": oid}, {"$set": {"commentsCount": count}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Article not found")
+    await response_cache.invalidate(article_key(oid))
 
     return {"success": True, "updated": result.modified_count}
 
@@ -380,100 +357,100 @@ async def update_comments_count(id: str, payload: dict):
 @router.patch("/articles/{id}/report", status_code=204)
 async def report_article(id: str):
     oid = ObjectId(id)
-    result = await articles_col.update_one({"_id": oid}, {"$inc": {"reports": 1}})
-    if result.matched_count == 0:
+    if await response_cache.get_or_load(article_key(oid), lambda: _load_article(oid)) is None:
         raise HTTPException(404, "Not found")
+    article_counters.incr(oid, "reports")
+
+
+@router.get("/cache/stats", summary="Hit/miss counters of the article and thread response cache")
+async def cache_stats():
+    return response_cache.info()
+
+
+def _csv(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+
+async def _articles_in_order(ids: list) -> List[dict]:
+    docs = {d["_id"]: d for d in await articles_col.find(queries.by_ids(ids), ARTICLE_FIELDS).to_list(None)}
+    for aid in ids:
+        if aid not in docs:
+            # deleted through another worker
+            search_index.remove(aid)
+    return [docs[aid] for aid in ids if aid in docs]
 
 
 @router.get("/search", response_model=FeedResponse)
 async def search_items(
         q: str = Query(..., description="Search query string"),
         view: str = Query("both", pattern="^(articles|threads|both)$"),
-        sort: str = Query("published", description="Sort by 'published' or 'views'"),
+        sort: str = Query("relevance", description="Sort articles by 'relevance', 'published' or 'views'"),
         page: int = Query(1, ge=1),
-        size: int = Query(20, ge=1, le=100)
+        size: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(
+            None, description="`next_cursor` (or X-Next-Cursor) of the previous page; replaces `page`"
+        ),
+        topics: Optional[str] = Query(None, description="Comma-separated topics to keep"),
+        languages: Optional[str] = Query(None, description="Comma-separated lang codes to keep"),
+        credibility: Optional[str] = Query(None, description="Comma-separated credibility labels to keep"),
 ):
-    skip = (page - 1) * size
-    result = FeedResponse()
-    article_map: dict[str, dict] = {}
+    await search_index.ensure_loaded()
+    sort = sort if sort in ("relevance", "published", "views") else "relevance"
+    found = await search_index.search(q, {
+        "topic": _csv(topics), "language": _csv(languages), "credibility_label": _csv(credibility),
+    })
+    hits = found["hits"]
+
+    # ranking happens in memory, so search cursors carry an offset into it
+    positions = decode_cursor(cursor) if cursor else None
+    next_positions: dict = {}
+
+    def start_of(listing: str, field: str) -> Optional[int]:
+        if positions is None:
+            return (page - 1) * size
+        pos = positions.get(listing)
+        return None if pos is None else offset_of(pos, field)
 
     # --- ARTICLES ---
-    art_docs = []
-    if view in ("articles", "both", "threads"):
-        art_cursor = (
-            articles_col.find({"$text": {"$search": q}})
-            .sort(sort if sort in ("published", "views") else "published", -1)
-            .skip(skip)
-            .limit(size)
-        )
-        art_docs = await art_cursor.to_list(length=size)
-
+    art_docs: List[dict] = []
+    highlights: dict = {}
+    offset = start_of("articles", sort)
+    if offset is not None:
+        if sort == "views":
+            ranked = search_index.sort_by_views(hits)
+        else:
+            ranked = search_index.sort_by_published(hits) if sort == "published" else hits
+        art_docs = await _articles_in_order([aid for aid, _ in ranked[offset:offset + size]])
+        if offset + size < len(hits):
+            next_positions["articles"] = {"field": sort, "offset": offset + size}
         for d in art_docs:
-            d["_id"] = str(d["_id"])
-            d["published"] = d.get("published").isoformat() if isinstance(d.get("published"), datetime) else None
-            d["topics"] = d.get("topics") or ([d.get("topic")] if d.get("topic") else [])
-            d["views"] = d.get("views", 0)
-            d["commentsCount"] = d.get("commentsCount", 0)
-            d["thread"] = None
-            if "thread_id" in d:
-                d["thread_id"] = str(d["thread_id"])
-            if isinstance(d.get("fetched_at"), datetime):
-                d["fetched_at"] = d["fetched_at"].isoformat()
-            d["credibility_label"] = d.get("credibility_label", "unrated")
-
-            article_map[d["_id"]] = d
-
-        result.articles = [Article.model_validate(d) for d in art_docs]
+            snippet = search_index.snippet(d["_id"], found["terms"])
+            if snippet:
+                highlights[str(d["_id"])] = snippet
+    articles = list(art_docs)
+    article_ids = {d["_id"] for d in art_docs}
 
     # --- THREADS ---
+    threads = None
     if view in ("threads", "both"):
-        thr_cursor = (
-            threads_col.find({"$text": {"$search": q}})
-            .sort("last_updated", -1)
-            .skip(skip)
-            .limit(size)
-        )
-        thr_docs = await thr_cursor.to_list(length=size)
-
-        missing_ids = []
-        for t in thr_docs:
-            for aid in t.get("articles", []):
-                if str(aid) not in article_map:
-                    try:
-                        missing_ids.append(ObjectId(aid))
-                    except Exception:
-                        continue
-
-        if missing_ids:
-            missing_docs = await articles_col.find({"_id": {"$in": missing_ids}}).to_list(length=None)
-            for d in missing_docs:
-                d["_id"] = str(d["_id"])
-                d["published"] = d.get("published").isoformat() if isinstance(d.get("published"), datetime) else None
-                d["topics"] = d.get("topics") or ([d.get("topic")] if d.get("topic") else [])
-                d["views"] = d.get("views", 0)
-                d["commentsCount"] = d.get("commentsCount", 0)
-                d["credibility_label"] = d.get("credibility_label", "unrated")
-                d["thread"] = None
-                article_map[d["_id"]] = d
-                result.articles.append(Article.model_validate(d))
-
         threads = []
-        for t in thr_docs:
-            t["_id"] = str(t["_id"])
-            t["language"] = t.get("language", "en")
-            t["last_updated"] = t.get("last_updated").isoformat() if isinstance(t.get("last_updated"),
-                                                                                datetime) else None
-            t["articles"] = [str(aid) for aid in t.get("articles", [])]
-
-            if t["articles"]:
-                first = article_map.get(t["articles"][0])
-                if first:
-                    t["image"] = first.get("image")
-                    topics = first.get("topics") or ([first.get("topic")] if first.get("topic") else [])
-                    t["topic"] = topics[0] if topics else None
-
-            threads.append(Thread.model_validate(t))
-
-        result.threads = threads
-
-    return result
+        ranked_threads = search_index.rank_threads(hits)
+        offset = start_of("threads", "relevance")
+        if offset is not None:
+            tids = [tid for tid, _ in ranked_threads[offset:offset + size]]
+            by_id = {t["_id"]: t for t in await threads_col.find(queries.by_ids(tids), THREAD_FIELDS).to_list(None)}
+            threads = [by_id[tid] for tid in tids if tid in by_id]
+            if offset + size < len(ranked_threads):
+                next_positions["threads"] = {"field": "relevance", "offset": offset + size}
+
+        missing_ids = [aid for t in threads for aid in t.get("articles", []) if aid not in article_ids]
+        if missing_ids:
+            # member articles of the matched threads, so clients can render them
+            articles.extend(await articles_col.find(
+                queries.by_ids(missing_ids), ARTICLE_FIELDS
+            ).to_list(length=None))
+
+    next_cursor = encode_cursor(next_positions)
+    return json_response(feed_out(
+        articles, threads, next_cursor, facets=found["facets"], highlights=highlights
+    ), headers=cursor_headers(next_cursor))
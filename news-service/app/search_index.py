@@ -0,0 +1,412 @@
+"""
+In-process inverted index for /search.
+
+Articles are indexed on `title`, `description` and `content_en` (field-weighted
+term frequencies, ranked with BM25). Facet fields and the short text used for
+snippets are kept next to the postings, so a query is answered without Mongo
+except for loading the page of documents it returns.
+
+The index is kept current by the article writer and delete_article, pulls
+articles written by other workers every SEARCH_SYNC_SECONDS, drops the ones they
+deleted every SEARCH_RECONCILE_SECONDS, and is snapshotted to SEARCH_INDEX_PATH
+so a restart only has to catch up on what came after. The initial load runs in
+the background task; searches wait for it.
+
+Queries over large postings are scored in a thread. The event loop keeps
+adding and removing documents meanwhile, so scoring copies each posting before
+walking it and skips documents that went away.
+"""
+import asyncio
+import gzip
+import html
+import json
+import logging
+import math
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from app.config import (
+    SEARCH_INDEX_PATH, SEARCH_OFFLOAD_POSTINGS, SEARCH_RECONCILE_SECONDS, SEARCH_SNAPSHOT_SECONDS,
+    SEARCH_SYNC_SECONDS,
+)
+from app.database import articles_col
+from app.queries import fetched_since
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+FIELD_WEIGHTS = {"title": 3.0, "description": 1.5, "content_en": 1.0}
+FACETS = ("topic", "language", "credibility_label")
+INDEXED_FIELDS = {
+    field: 1 for field in (*FIELD_WEIGHTS, *FACETS, "thread_id", "published", "fetched_at", "views")
+}
+SNIPPET_CHARS = 160
+# articles carry the fetched_at of their crawl, which precedes the batched insert;
+# re-scanning a short overlap catches ones written just after the previous sync
+_SYNC_OVERLAP = timedelta(minutes=2)
+# documents tokenized per thread hop while loading
+_LOAD_BATCH = 1000
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in ENGLISH_STOP_WORDS]
+
+
+def _weighted_tf(doc: dict) -> Dict[str, float]:
+    tf: Dict[str, float] = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(doc.get(field)):
+            tf[term] = tf.get(term, 0.0) + weight
+    return tf
+
+
+def highlight(text: str, terms: Iterable[str], width: int = SNIPPET_CHARS) -> Optional[str]:
+    """Window of `text` around the first query term, terms wrapped in <mark>.
+    Feed text can carry markup of its own, so everything else is HTML-escaped."""
+    terms = sorted(set(terms), key=len, reverse=True)
+    if not text or not terms:
+        return None
+    pattern = re.compile(r"\b(" + "|".join(map(re.escape, terms)) + r")\b", re.IGNORECASE)
+    first = pattern.search(text)
+    if first is None:
+        return None
+    start = max(first.start() - width // 3, 0)
+    end = min(start + width, len(text))
+    window = text[start:end]
+    parts, pos = ["…" if start > 0 else ""], 0
+    for m in pattern.finditer(window):
+        parts.append(html.escape(window[pos:m.start()]))
+        parts.append("<mark>" + html.escape(m.group(0)) + "</mark>")
+        pos = m.end()
+    parts.append(html.escape(window[pos:]))
+    parts.append("…" if end < len(text) else "")
+    return "".join(parts)
+
+
+class SearchIndex:
+    def __init__(self, path: str = SEARCH_INDEX_PATH, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._clear()
+        self._synced_until: Optional[datetime] = None
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_snapshot = time.monotonic()
+        # the first tick also drops what was deleted since the snapshot
+        self._last_reconcile = 0.0
+        # deleted while the initial load was running, applied once it is adopted
+        self._removed_while_loading: List[ObjectId] = []
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _clear(self):
+        # postings and per-document entries are keyed by a small int document
+        # number: hashing ObjectIds dominated the scoring loop
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._numbers: Dict[ObjectId, int] = {}
+        # per article: id, tf, length, facets and snippet text
+        self._docs: Dict[int, dict] = {}
+        self._next_number = 0
+        self._total_len = 0.0
+
+    def _adopt(self, other: "SearchIndex"):
+        self._postings, self._numbers, self._docs = other._postings, other._numbers, other._docs
+        self._next_number, self._total_len = other._next_number, other._total_len
+
+    # ─── maintenance ────────────────────────────────────────────────────────────────
+
+    def _insert(self, aid: ObjectId, entry: dict):
+        self._discard(aid)
+        no = self._next_number
+        self._next_number += 1
+        entry["_id"] = aid
+        self._numbers[aid] = no
+        self._docs[no] = entry
+        self._total_len += entry["len"]
+        postings = self._postings
+        for term, tf in entry["tf"].items():
+            posting = postings.get(term)
+            if posting is None:
+                postings[term] = {no: tf}
+            else:
+                posting[no] = tf
+
+    def add(self, doc: dict):
+        tf = _weighted_tf(doc)
+        published = doc.get("published")
+        self._insert(doc["_id"], {
+            "tf": tf,
+            "len": sum(tf.values()),
+            "thread_id": doc.get("thread_id"),
+            "published": published if isinstance(published, datetime) else None,
+            # kept current by the view counter flush and the reconcile
+            "views": doc.get("views") or 0,
+            "title": doc.get("title") or "",
+            "description": doc.get("description") or "",
+            **{facet: doc.get(facet) for facet in FACETS},
+        })
+
+    def add_many(self, docs: Iterable[dict]):
+        if not self._loaded:
+            # the initial sync will pick these up from Mongo
+            return
+        self._add_all(docs)
+
+    def _add_all(self, docs: Iterable[dict]):
+        for doc in docs:
+            self.add(doc)
+
+    def remove(self, aid: ObjectId):
+        if not self._loaded:
+            self._removed_while_loading.append(aid)
+            return
+        self._discard(aid)
+
+    def add_counts(self, written: Dict[ObjectId, Dict[str, int]]):
+        """on_written callback of the article counters."""
+        for aid, fields in written.items():
+            entry = self._entry(aid)
+            if entry is not None and "views" in fields:
+                entry["views"] += fields["views"]
+
+    def _discard(self, aid: ObjectId):
+        no = self._numbers.pop(aid, None)
+        if no is None:
+            return
+        entry = self._docs.pop(no)
+        self._total_len -= entry["len"]
+        for term in entry["tf"]:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(no, None)
+                if not posting:
+                    del self._postings[term]
+
+    # ─── querying ───────────────────────────────────────────────────────────────────
+
+    def _scores(self, terms: List[str]) -> Dict[int, float]:
+        n = len(self._docs)
+        if not n:
+            return {}
+        k1, docs = self.k1, self._docs
+        # BM25 length normalisation k1 * (1 - b + b * len / avg_len) = base + per_len * len
+        base, per_len = k1 * (1 - self.b), k1 * self.b * n / self._total_len if self._total_len else 0.0
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5)) * (k1 + 1)
+            for no, tf in list(posting.items()):
+                entry = docs.get(no)
+                if entry is not None:
+                    scores[no] = scores.get(no, 0.0) + idf * tf / (tf + base + per_len * entry["len"])
+        return scores
+
+    async def search(self, query: str, filters: Optional[Dict[str, List[str]]] = None) -> dict:
+        """Every match of `query` that passes `filters` ({facet: [allowed values]}),
+        best first, plus facet counts. Each facet is counted over the matches that
+        pass the *other* filters, so a selected facet still shows its alternatives."""
+        terms = tokenize(query)
+        postings = sum(len(self._postings.get(term, ())) for term in set(terms))
+        if postings > SEARCH_OFFLOAD_POSTINGS:
+            return await asyncio.to_thread(self._search, terms, filters)
+        return self._search(terms, filters)
+
+    def _search(self, terms: List[str], filters: Optional[Dict[str, List[str]]]) -> dict:
+        filters = {f: set(v) for f, v in (filters or {}).items() if v}
+        scores = self._scores(terms)
+
+        facets: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        hits: List[Tuple[float, int]] = []
+        ids: Dict[int, ObjectId] = {}
+        for no, score in scores.items():
+            entry = self._docs.get(no)
+            if entry is None:
+                continue
+            ids[no] = entry["_id"]
+            failed = [f for f, allowed in filters.items() if entry.get(f) not in allowed] if filters else ()
+            if not failed:
+                hits.append((score, no))
+            for facet in FACETS:
+                if not failed or failed == [facet]:
+                    value = entry.get(facet)
+                    if value is not None:
+                        facets[facet][value] = facets[facet].get(value, 0) + 1
+
+        # ties go to the most recently indexed article
+        hits.sort(reverse=True)
+        return {"terms": terms, "hits": [(ids[no], score) for score, no in hits], "facets": facets}
+
+    def _entry(self, aid: ObjectId) -> Optional[dict]:
+        no = self._numbers.get(aid)
+        return self._docs[no] if no is not None else None
+
+    def sort_by_published(self, hits: List[Tuple[ObjectId, float]]) -> List[Tuple[ObjectId, float]]:
+        return sorted(
+            hits, key=lambda h: (self._entry(h[0])["published"] or datetime.min, h[0]), reverse=True
+        )
+
+    def sort_by_views(self, hits: List[Tuple[ObjectId, float]]) -> List[Tuple[ObjectId, float]]:
+        return sorted(hits, key=lambda h: (self._entry(h[0])["views"], h[0]), reverse=True)
+
+    def rank_threads(self, hits: List[Tuple[ObjectId, float]]) -> List[Tuple[object, float]]:
+        """Threads of the matching articles, scored by their best member."""
+        best: Dict[object, float] = {}
+        for aid, score in hits:
+            tid = self._entry(aid)["thread_id"]
+            if tid is not None and score > best.get(tid, -1.0):
+                best[tid] = score
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)
+
+    def snippet(self, aid: ObjectId, terms: List[str]) -> Optional[str]:
+        entry = self._entry(aid)
+        if entry is None:
+            return None
+        return highlight(entry["description"], terms) or highlight(entry["title"], terms)
+
+    # ─── persistence ────────────────────────────────────────────────────────────────
+
+    def _snapshot(self) -> dict:
+        return {
+            "saved_at": (self._synced_until or datetime.utcnow()).isoformat(),
+            "docs": [
+                {
+                    **entry,
+                    "_id": str(entry["_id"]),
+                    # legacy clustered threads have integer ids, JSON keeps those as they are
+                    "thread_id": str(entry["thread_id"]) if isinstance(entry["thread_id"], ObjectId)
+                    else entry["thread_id"],
+                    "published": entry["published"].isoformat() if entry["published"] else None,
+                }
+                for entry in self._docs.values()
+            ],
+        }
+
+    def _write_snapshot(self, snapshot: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # write-then-rename so a crash never leaves a torn snapshot behind
+        with gzip.open(self.path + ".tmp", "wt", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def _load_snapshot(self) -> Optional[datetime]:
+        if not os.path.exists(self.path):
+            return None
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        for entry in snapshot["docs"]:
+            aid = ObjectId(entry.pop("_id"))
+            tid = entry["thread_id"]
+            entry["thread_id"] = ObjectId(tid) if isinstance(tid, str) else tid
+            entry["published"] = datetime.fromisoformat(entry["published"]) if entry["published"] else None
+            entry.setdefault("views", 0)
+            self._insert(aid, entry)
+        return datetime.fromisoformat(snapshot["saved_at"])
+
+    async def save_snapshot(self):
+        if not self._loaded:
+            return
+        await asyncio.to_thread(self._write_snapshot, self._snapshot())
+        self._last_snapshot = time.monotonic()
+
+    async def sync(self, offload: bool = False) -> int:
+        """Indexes articles fetched since the last sync (all of them on a cold start).
+        With `offload`, documents are tokenized in a thread, in batches; only for an
+        index nothing else is reading or writing yet."""
+        started = datetime.utcnow()
+        since = self._synced_until - _SYNC_OVERLAP if self._synced_until else None
+        added = 0
+        batch: List[dict] = []
+        async for doc in articles_col.find(fetched_since(since), INDEXED_FIELDS):
+            if not offload:
+                self.add(doc)
+            else:
+                batch.append(doc)
+                if len(batch) >= _LOAD_BATCH:
+                    await asyncio.to_thread(self._add_all, batch)
+                    batch = []
+            added += 1
+        if batch:
+            await asyncio.to_thread(self._add_all, batch)
+        self._synced_until = started
+        return added
+
+    async def _reconcile(self):
+        """Drops articles that no longer exist in Mongo (deleted by another
+        worker), which sync cannot see since it only fetches new ones, and
+        takes over the view counts other workers have written."""
+        # articles indexed while the ids are read are left alone
+        known = set(self._numbers)
+        live = set()
+        async for doc in articles_col.find({}, {"_id": 1, "views": 1}):
+            live.add(doc["_id"])
+            entry = self._entry(doc["_id"])
+            if entry is not None:
+                entry["views"] = doc.get("views") or 0
+        for aid in known - live:
+            self._discard(aid)
+        self._last_reconcile = time.monotonic()
+
+    async def ensure_loaded(self):
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            # load into a fresh index so a torn or partial snapshot leaves nothing behind
+            staged = SearchIndex(self.path, self.k1, self.b)
+            try:
+                staged._synced_until = await asyncio.to_thread(staged._load_snapshot)
+            except Exception:
+                logger.exception("search index snapshot unreadable, rebuilding from Mongo")
+                staged = SearchIndex(self.path, self.k1, self.b)
+            await staged.sync(offload=True)
+            self._adopt(staged)
+            self._synced_until = staged._synced_until
+            self._loaded = True
+            for aid in self._removed_while_loading:
+                self._discard(aid)
+            self._removed_while_loading = []
+
+    async def _run(self):
+        try:
+            await self.ensure_loaded()
+        except Exception:
+            # the first search retries the load
+            logger.exception("search index load failed")
+        while True:
+            await asyncio.sleep(SEARCH_SYNC_SECONDS)
+            try:
+                await self.ensure_loaded()
+                await self.sync()
+                if time.monotonic() - self._last_reconcile >= SEARCH_RECONCILE_SECONDS:
+                    await self._reconcile()
+                if time.monotonic() - self._last_snapshot >= SEARCH_SNAPSHOT_SECONDS:
+                    await self.save_snapshot()
+            except Exception:
+                logger.exception("search index sync failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.save_snapshot()
+
+
+search_index = SearchIndex()
@@ -0,0 +1,80 @@
+"""
+Mongo document -> response projection shared by the routers.
+
+The `*_out` functions produce plain JSON-ready dicts with exactly the fields
+and defaults of the `Article`/`Thread` models, so handlers can hand them to
+`json_response` and skip model validation (once in the handler, once more for
+`response_model`). The models stay as the documented response schema.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from fastapi.responses import ORJSONResponse
+
+# only what the response models (and the listing cursors) need
+ARTICLE_FIELDS = {field: 1 for field in (
+    "url", "source", "title", "description", "credibility_score", "credibility_label",
+    "published", "author", "content", "image", "topics", "topic", "fetched_at",
+    "views", "commentsCount", "reports", "thread_id",
+)}
+THREAD_FIELDS = {field: 1 for field in ("title", "language", "last_updated", "image", "topic", "articles")}
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def thread_out(doc: dict) -> dict:
+    return {
+        "_id": str(doc["_id"]),
+        "title": doc.get("title"),
+        "language": doc.get("language", "en"),
+        "last_updated": _iso(doc.get("last_updated")),
+        "image": doc.get("image"),
+        "topic": doc.get("topic"),
+        "articles": [str(a) for a in doc.get("articles", [])],
+    }
+
+
+def article_out(doc: dict, thread: Optional[dict] = None, deltas: Optional[Dict[str, int]] = None) -> dict:
+    """`thread` is an already projected thread (see thread_out); `deltas` are
+    counter increments not yet written to Mongo."""
+    out = {
+        "_id": str(doc["_id"]),
+        "url": doc.get("url"),
+        "source": doc.get("source"),
+        "title": doc.get("title"),
+        "description": doc.get("description"),
+        "credibility_score": doc.get("credibility_score", 0),
+        "credibility_label": doc.get("credibility_label", "unrated"),
+        "published": _iso(doc.get("published")),
+        "author": doc.get("author"),
+        "content": doc.get("content", ""),
+        "image": doc.get("image"),
+        "topics": doc.get("topics") or ([doc["topic"]] if doc.get("topic") else []),
+        "fetched_at": _iso(doc.get("fetched_at")),
+        "thread": thread,
+        "views": doc.get("views", 0),
+        "commentsCount": doc.get("commentsCount", 0),
+        "reports": doc.get("reports", 0),
+    }
+    for field, n in (deltas or {}).items():
+        out[field] = (out.get(field) or 0) + n
+    return out
+
+
+def feed_out(articles: Optional[Iterable[dict]], threads: Optional[Iterable[dict]],
+             next_cursor: Optional[str] = None, facets: Optional[dict] = None,
+             highlights: Optional[Dict[str, str]] = None) -> dict:
+    """FeedResponse shape from raw article and thread documents."""
+    return {
+        "articles": [article_out(d) for d in articles] if articles is not None else None,
+        "threads": [thread_out(t) for t in threads] if threads is not None else None,
+        "next_cursor": next_cursor,
+        "facets": facets,
+        "highlights": highlights,
+    }
+
+
+def json_response(content, headers: Optional[Dict[str, str]] = None, status_code: int = 200) -> ORJSONResponse:
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
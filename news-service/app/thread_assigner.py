@@ -1,138 +1,345 @@
 import os
+import json
+import time
+import asyncio
+import logging
 import numpy as np
-from datetime import datetime
-from typing import Dict, List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
 from motor.motor_asyncio import AsyncIOMotorClient
-from app.database import articles_col
-from bson import ObjectId
-from openai import AsyncOpenAI
+from app.centroid_index import TopicCentroids
+from app.config import (
+    THREAD_IDF_FLUSH_SECONDS, THREAD_RECONCILE_SECONDS, THREAD_STATE_DIR, THREAD_STATE_SYNC_SECONDS,
+    THREAD_SNAPSHOT_SECONDS,
+)
+from app.queries import centroids_since
+from app.vectorizer import StableVectorizer
+from bson import Binary, ObjectId
+from app.thread_refresher import RelatedThreadsRefresher, ThreadTitleRefresher, generate_thread_title
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/aware_news")
-OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 
 mongo = AsyncIOMotorClient(MONGO_URI)
 threads_col = mongo["aware_news"]["threads"]
 
-openai_client = AsyncOpenAI(api_key=OPENAI_KEY)
-
-
-async def generate_thread_title(examples: List[str]) -> str:
-    prompt = (
-            "You are a headline-writing assistant. "
-            "Given these related news snippets, produce a 3–6 word title"
-            " capturing their common theme like a news headline.\n\n"
-            + "\n".join(f"- {e}" for e in examples)
-            + "\n\nReply with just the title."
-    )
-    resp = await openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "Write a 3–6 word news title."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.0,
-        max_tokens=20
-    )
-    return resp.choices[0].message.content.strip().strip('"')
+
+def _centroid_bytes(vec: np.ndarray) -> Binary:
+    return Binary(np.asarray(vec, dtype=np.float32).tobytes())
+
+
+def _stand_in_title(text: str, words: int = 8) -> str:
+    tokens = text.split()
+    return " ".join(tokens[:words]) + ("…" if len(tokens) > words else "")
 
 
 class ThreadAssigner:
-    def __init__(self, threshold: float = 0.4):
+    def __init__(self, threshold: float = 0.4, state_dir: str = THREAD_STATE_DIR):
         self.threshold = threshold
-        self._centroids: Dict[ObjectId, np.ndarray] = {}
-        self._vectorizer = TfidfVectorizer(
-            max_features=1000, stop_words="english", ngram_range=(1, 2)
-        )
+        # one centroid matrix per topic; threads only ever match within their topic
+        self._topics: Dict[Optional[str], TopicCentroids] = {}
+        self._vectorizer = StableVectorizer()
+        self._state_dir = state_dir
+        self._synced_until: Optional[datetime] = None
+        self._last_sync = 0.0
+        self._last_reconcile = 0.0
+        self._last_snapshot = time.monotonic()
+        self._init_lock = asyncio.Lock()
+        # crawl jobs over different feeds can run at once; two copies of a new
+        # story must not both open a thread
+        self._assign_lock = asyncio.Lock()
+        # threads opened by assign() that are not in Mongo yet
+        self._opening: Dict[ObjectId, asyncio.Event] = {}
         self._initialized = False
+        self._task: Optional[asyncio.Task] = None
 
-    async def _initialize(self):
-        docs = await threads_col.find({}, {"title": 1}).to_list(None)
-        texts, tids = [], []
-        for doc in docs:
-            title = doc.get("title")
-            if title:
-                texts.append(title)
-                tids.append(doc["_id"])
-        if texts:
-            self._vectorizer.fit(texts)
-            X = self._vectorizer.transform(texts).toarray()
-            for vec, tid in zip(X, tids):
-                self._centroids[tid] = vec
-        self._initialized = True
+    @property
+    def dim(self) -> int:
+        return self._vectorizer.dim
 
-    async def assign(self, text: str, topic: str) -> ObjectId:
+    def _vectorize(self, text: str) -> np.ndarray:
+        return self._vectorizer.transform(text)
+
+    def _topic_index(self, topic: Optional[str]) -> TopicCentroids:
+        if topic not in self._topics:
+            self._topics[topic] = TopicCentroids(self.dim)
+        return self._topics[topic]
+
+    def _snapshot_paths(self) -> Tuple[str, str]:
+        return (os.path.join(self._state_dir, "centroids.npy"),
+                os.path.join(self._state_dir, "centroids.json"))
+
+    def _load_snapshot(self) -> Optional[datetime]:
+        matrix_path, meta_path = self._snapshot_paths()
+        if not (os.path.exists(matrix_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("dim") != self.dim:
+            return None
+
+        matrix = np.load(matrix_path, mmap_mode="r")
+        by_topic: Dict[Optional[str], List[int]] = {}
+        for i, topic in enumerate(meta["topics"]):
+            by_topic.setdefault(topic, []).append(i)
+        ids = [ObjectId(tid) for tid in meta["ids"]]
+        for topic, rows in by_topic.items():
+            self._topics[topic] = TopicCentroids.from_rows([ids[i] for i in rows], matrix[rows])
+        # snapshots from before the watermark was stored get a full sync
+        synced_until = meta.get("synced_until")
+        return datetime.fromisoformat(synced_until) if synced_until else None
+
+    def _snapshot(self) -> Tuple[np.ndarray, dict]:
+        ids, topics, blocks = [], [], []
+        for topic, index in self._topics.items():
+            ids.extend(str(tid) for tid in index.ids)
+            topics.extend([topic] * len(index))
+            blocks.append(index.matrix[:len(index)].copy())
+        matrix = np.vstack(blocks) if blocks else np.zeros((0, self.dim), dtype=np.float32)
+        meta = {
+            "dim": self.dim,
+            "saved_at": datetime.utcnow().isoformat(),
+            # what the next _sync resumes from: updates made by other workers after
+            # the last sync are not in these rows, whenever the snapshot is taken
+            "synced_until": self._synced_until.isoformat() if self._synced_until else None,
+            "ids": ids,
+            "topics": topics,
+        }
+        return matrix, meta
+
+    def _write_snapshot(self, matrix: np.ndarray, meta: dict):
+        os.makedirs(self._state_dir, exist_ok=True)
+        matrix_path, meta_path = self._snapshot_paths()
+        # write-then-rename so a crash never leaves a torn snapshot behind
+        with open(matrix_path + ".tmp", "wb") as f:
+            np.save(f, matrix)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(matrix_path + ".tmp", matrix_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    async def save_snapshot(self):
         if not self._initialized:
-            await self._initialize()
+            return
+        matrix, meta = self._snapshot()
+        await asyncio.to_thread(self._write_snapshot, matrix, meta)
+        self._last_snapshot = time.monotonic()
 
-        if not self._centroids:
-            return await self._create_new_thread(text, topic)
+    async def _sync(self):
+        """Pulls centroids written by other workers (or before the snapshot was taken).
+        Threads created before centroids were persisted get one from their title."""
+        started = datetime.utcnow()
+        cursor = threads_col.find(centroids_since(self._synced_until), {"title": 1, "topic": 1, "centroid": 1})
+        async for doc in cursor:
+            raw = doc.get("centroid")
+            vec = np.frombuffer(raw, dtype=np.float32) if raw else None
+            if vec is None or vec.shape[0] != self.dim:
+                if not doc.get("title"):
+                    continue
+                vec = self._vectorize(doc["title"])
+                await threads_col.update_one(
+                    {"_id": doc["_id"]},
+                    {"$set": {"centroid": _centroid_bytes(vec), "centroid_updated": datetime.utcnow()}}
+                )
+            topic = doc.get("topic")
+            for other, index in self._topics.items():
+                if other != topic:
+                    index.remove(doc["_id"])
+            self._topic_index(topic).add(doc["_id"], vec)
+        self._synced_until = started
+        self._last_sync = time.monotonic()
 
-        vec = self._vectorizer.transform([text]).toarray()[0]
-        best_tid, best_sim = None, -1.0
+    async def _reconcile(self):
+        """Drops threads that no longer exist in Mongo (deleted, or merged into
+        another), which _sync cannot see since it only fetches updates."""
+        known = {tid for index in self._topics.values() for tid in index.ids}
+        # a thread being created right now may be in memory before it is in Mongo
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=1)
+        live = {doc["_id"] async for doc in threads_col.find({}, {"_id": 1})}
+        for tid in known - live:
+            if not isinstance(tid, ObjectId) or tid.generation_time < cutoff:
+                self.forget(tid)
+        self._last_reconcile = time.monotonic()
 
-        for tid, c in self._centroids.items():
-            thread_doc = await threads_col.find_one({"_id": tid})
-            if not thread_doc:
-                continue
-            thread_topic = thread_doc.get("topic")
-            if thread_topic != topic:
-                continue
+    async def _initialize(self):
+        async with self._init_lock:
+            if self._initialized:
+                return
+            await self._vectorizer.load()
+            self._synced_until = self._load_snapshot()
+            await self._sync()
+            await self._reconcile()
+            self._initialized = True
+
+    async def _refresh(self):
+        """Flushes the IDF counts and runs whichever of sync, reconcile and
+        snapshot is due. Only _run calls it, so assign() never waits on Mongo."""
+        await self._vectorizer.flush()
+        if time.monotonic() - self._last_sync >= THREAD_STATE_SYNC_SECONDS:
+            await self._vectorizer.load()
+            await self._sync()
+        if time.monotonic() - self._last_reconcile >= THREAD_RECONCILE_SECONDS:
+            await self._reconcile()
+        if time.monotonic() - self._last_snapshot >= THREAD_SNAPSHOT_SECONDS:
+            await self.save_snapshot()
+
+    async def _run(self):
+        await self._initialize()
+        while True:
+            await asyncio.sleep(THREAD_IDF_FLUSH_SECONDS)
+            try:
+                await self._refresh()
+            except Exception:
+                logger.exception("thread state refresh failed")
 
-            sim = np.dot(vec, c) / (np.linalg.norm(vec) * np.linalg.norm(c) + 1e-9)
-            if sim > best_sim:
-                best_tid, best_sim = tid, sim
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
 
-        if best_sim >= self.threshold and best_tid is not None:
-            self._centroids[best_tid] = (self._centroids[best_tid] + vec) / 2
-            await threads_col.update_one(
-                {"_id": best_tid},
-                {"$set": {"last_updated": datetime.utcnow()}}
-            )
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._initialized:
+            await self._vectorizer.flush()
+        await self.save_snapshot()
 
-            thread_doc = await threads_col.find_one({"_id": best_tid})
-            article_ids = thread_doc.get("articles", [])
-            article_texts = []
-            for aid in article_ids:
-                a = await articles_col.find_one({"_id": aid})
-                if a:
-                    article_texts.append(a.get("description") or a.get("title") or "")
+    async def assign(self, text: str, topic: str) -> ObjectId:
+        if not self._initialized:
+            await self._initialize()
+        # only the in-memory lookup and update are serialized; Mongo writes and the
+        # title call for a new thread happen after the lock is released
+        async with self._assign_lock:
+            counts = self._vectorizer.counts(text)
+            self._vectorizer.observe(counts)
+            vec = self._vectorizer.weigh(counts)
 
-            article_texts.append(text[:200])
-            new_title = await generate_thread_title(article_texts)
-            await threads_col.update_one(
-                {"_id": best_tid},
-                {"$set": {"title": new_title}}
-            )
+            index = self._topics.get(topic)
+            best_tid, best_sim = index.best_match(vec) if index else (None, 0.0)
+            if best_tid is None or best_sim < self.threshold:
+                # in the index right away, so a copy arriving meanwhile joins this thread
+                new_tid = ObjectId()
+                self._topic_index(topic).add(new_tid, vec)
+                self._opening[new_tid] = asyncio.Event()
+                centroid = self._topic_index(topic).vector(new_tid).copy()
+            else:
+                new_tid = None
+                index.update(best_tid, (index.vector(best_tid) + vec) / 2)
+                centroid = index.vector(best_tid).copy()
 
-            return best_tid
+        if new_tid is not None:
+            await self._create_new_thread(new_tid, text, topic, centroid)
+            return new_tid
 
-        return await self._create_new_thread(text, topic)
+        opening = self._opening.get(best_tid)
+        if opening is not None:
+            await opening.wait()
+        now = datetime.utcnow()
+        await threads_col.update_one(
+            {"_id": best_tid},
+            {"$set": {
+                "last_updated": now,
+                "centroid": _centroid_bytes(centroid),
+                "centroid_updated": now,
+            }}
+        )
 
-    async def _create_new_thread(self, text: str, topic: str) -> ObjectId:
-        new_tid = ObjectId()
+        title_refresher.mark_dirty(best_tid)
+        related_refresher.mark_dirty(best_tid)
+        return best_tid
 
+    def centroid(self, tid: ObjectId) -> Optional[np.ndarray]:
+        for index in self._topics.values():
+            if tid in index:
+                return index.vector(tid).copy()
+        return None
+
+    def similarity(self, a: ObjectId, b: ObjectId) -> Optional[float]:
+        va, vb = self.centroid(a), self.centroid(b)
+        if va is None or vb is None:
+            return None
+        # rows are stored L2-normalized
+        return float(va @ vb)
+
+    def neighbours(self, tids: List[ObjectId], k: int) -> Dict[ObjectId, List[Tuple[ObjectId, float]]]:
+        """The k most similar threads of each of `tids`, across all topics, best first.
+        Threads without a known centroid are left out of the result."""
+        queries = [(tid, self.centroid(tid)) for tid in tids]
+        queries = [(tid, vec) for tid, vec in queries if vec is not None]
+        if not queries:
+            return {}
+        q = np.stack([vec for _, vec in queries], axis=1)
+        found: Dict[ObjectId, List[Tuple[ObjectId, float]]] = {tid: [] for tid, _ in queries}
+        for index in self._topics.values():
+            n = len(index)
+            if not n:
+                continue
+            sims = index.matrix[:n] @ q
+            # k + 1 per topic so dropping the thread itself still leaves k
+            take = min(k + 1, n)
+            top = np.argpartition(-sims, take - 1, axis=0)[:take]
+            for j, (tid, _) in enumerate(queries):
+                found[tid].extend(
+                    (index.ids[i], float(sims[i, j])) for i in top[:, j]
+                    if index.ids[i] != tid and sims[i, j] > 0
+                )
+        return {tid: sorted(c, key=lambda c: c[1], reverse=True)[:k] for tid, c in found.items()}
+
+    async def ready(self):
+        """Loads the centroids before they are read directly; _run keeps them current."""
         if not self._initialized:
             await self._initialize()
 
-        vec = self._vectorizer.transform([text]).toarray()[0]
-        self._centroids[new_tid] = vec
-
-        title = await generate_thread_title([text[:200]])
-        await threads_col.insert_one({
-            "_id": new_tid,
-            "title": title,
-            "language": "en",
-            "topic": topic,
-            "created_at": datetime.utcnow(),
-            "last_updated": datetime.utcnow(),
-            "articles": []
-        })
+    def forget(self, tid: ObjectId):
+        for index in self._topics.values():
+            index.remove(tid)
+
+    async def _create_new_thread(self, new_tid: ObjectId, text: str, topic: str, centroid: np.ndarray) -> ObjectId:
+        """Inserts the thread under a stand-in title, then asks the LLM for the
+        real one. Articles joining it meanwhile wait for the insert only."""
+        now = datetime.utcnow()
+        try:
+            await threads_col.insert_one({
+                "_id": new_tid,
+                "title": _stand_in_title(text),
+                "language": "en",
+                "topic": topic,
+                # set from the first article stored into it (see persistence.cover_updates)
+                "image": None,
+                "created_at": now,
+                "last_updated": now,
+                "articles": [],
+                "article_count": 0,
+                "languages": [],
+                "centroid": _centroid_bytes(centroid),
+                "centroid_updated": now,
+            })
+        except Exception:
+            self.forget(new_tid)
+            raise
+        finally:
+            self._opening.pop(new_tid).set()
+        related_refresher.mark_dirty(new_tid)
+
+        try:
+            title = await generate_thread_title([text[:200]])
+        except Exception:
+            # no title_centroid yet, so the title refresher retries it
+            logger.exception("title generation failed for new thread %s", new_tid)
+            title_refresher.mark_dirty(new_tid)
+            return new_tid
+        await threads_col.update_one(
+            {"_id": new_tid},
+            {"$set": {"title": title, "title_centroid": _centroid_bytes(centroid)}}
+        )
         return new_tid
 
 
 assigner = ThreadAssigner()
+title_refresher = ThreadTitleRefresher(assigner.centroid)
+related_refresher = RelatedThreadsRefresher(assigner.neighbours, assigner.similarity)
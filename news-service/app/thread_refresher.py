@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import Binary, ObjectId
+from pymongo import UpdateOne
+
+from app.cache import response_cache, thread_key
+from app.config import (
+    RELATED_REFRESH_WINDOW, RELATED_THREADS_K, TITLE_MAX_EXAMPLES, TITLE_MIN_CENTROID_SHIFT,
+    TITLE_REFRESH_WINDOW,
+)
+from app.database import articles_col, threads_col
+from app.llm_gateway import gateway
+
+logger = logging.getLogger(__name__)
+
+
+async def generate_thread_title(examples: List[str]) -> str:
+    prompt = (
+            "You are a headline-writing assistant. "
+            "Given these related news snippets, produce a 3–6 word title"
+            " capturing their common theme like a news headline.\n\n"
+            + "\n".join(f"- {e}" for e in examples)
+            + "\n\nReply with just the title."
+    )
+    title = await gateway.complete(
+        [
+            {"role": "system", "content": "Write a 3–6 word news title."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=20
+    )
+    return title.strip('"')
+
+
+def sample_ids(ids: list, limit: int) -> list:
+    """Evenly spaced sample that always keeps the first and the latest article."""
+    if len(ids) <= limit:
+        return list(ids)
+    if limit == 1:
+        return [ids[-1]]
+    step = (len(ids) - 1) / (limit - 1)
+    return [ids[round(i * step)] for i in range(limit)]
+
+
+def centroid_shift(current: np.ndarray, previous: Optional[np.ndarray]) -> float:
+    if previous is None or previous.shape != current.shape:
+        return 1.0
+    denom = float(np.linalg.norm(current) * np.linalg.norm(previous))
+    if denom == 0:
+        return 1.0
+    return 1.0 - float(current @ previous) / denom
+
+
+class ThreadTitleRefresher:
+    """Marks threads dirty when articles join them and regenerates their titles
+    in batches, at most once per window and only when the topic has drifted."""
+
+    def __init__(
+            self,
+            centroid_lookup: Callable[[ObjectId], Optional[np.ndarray]],
+            window: float = TITLE_REFRESH_WINDOW,
+            max_examples: int = TITLE_MAX_EXAMPLES,
+            min_shift: float = TITLE_MIN_CENTROID_SHIFT,
+    ):
+        self._centroid_lookup = centroid_lookup
+        self.window = window
+        self.max_examples = max_examples
+        self.min_shift = min_shift
+        self._dirty: Dict[ObjectId, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self, tid: ObjectId):
+        self._dirty.setdefault(tid, time.monotonic())
+
+    async def flush(self, force: bool = False) -> int:
+        now = time.monotonic()
+        due = [tid for tid, since in self._dirty.items() if force or now - since >= self.window]
+        if not due:
+            return 0
+        for tid in due:
+            self._dirty.pop(tid, None)
+
+        threads = await threads_col.find(
+            {"_id": {"$in": due}}, {"articles": 1, "title_centroid": 1}
+        ).to_list(None)
+
+        stale = {}
+        for thread in threads:
+            current = self._centroid_lookup(thread["_id"])
+            if current is None:
+                continue
+            raw = thread.get("title_centroid")
+            previous = np.frombuffer(raw, dtype=np.float32) if raw else None
+            if centroid_shift(current, previous) >= self.min_shift:
+                stale[thread["_id"]] = (sample_ids(thread.get("articles", []), self.max_examples), current)
+        if not stale:
+            return 0
+
+        wanted = [aid for ids, _ in stale.values() for aid in ids]
+        snippets = {
+            a["_id"]: (a.get("description") or a.get("title") or "")[:300]
+            async for a in articles_col.find({"_id": {"$in": wanted}}, {"description": 1, "title": 1})
+        }
+
+        refreshed = 0
+        for tid, (ids, centroid) in stale.items():
+            examples = [snippets[aid] for aid in ids if snippets.get(aid)]
+            if not examples:
+                continue
+            try:
+                title = await generate_thread_title(examples)
+            except Exception:
+                logger.exception("title generation failed for thread %s", tid)
+                continue
+            await threads_col.update_one(
+                {"_id": tid},
+                {"$set": {
+                    "title": title,
+                    "title_centroid": Binary(np.asarray(centroid, dtype=np.float32).tobytes()),
+                    "title_updated": datetime.utcnow(),
+                }}
+            )
+            await response_cache.invalidate(thread_key(tid))
+            refreshed += 1
+        return refreshed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(max(self.window / 2, 1.0))
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("thread title refresh failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush(force=True)
+
+
+class RelatedThreadsRefresher:
+    """Keeps `related` on each thread: its k nearest threads by centroid cosine,
+    as [{"_id", "score"}] best first, so /threads/{id}/related is a lookup.
+
+    Threads whose centroid moved are recomputed in batches once the window has
+    passed. Their old and new neighbours are patched rather than recomputed: the
+    moved thread is re-scored in (or dropped from) their lists, which keeps one
+    refresh to a single matrix product per topic.
+    """
+
+    def __init__(
+            self,
+            neighbours: Callable[[List[ObjectId], int], Dict[ObjectId, List[Tuple[ObjectId, float]]]],
+            similarity: Callable[[ObjectId, ObjectId], Optional[float]],
+            k: int = RELATED_THREADS_K,
+            window: float = RELATED_REFRESH_WINDOW,
+            batch_size: int = 256,
+    ):
+        self._neighbours = neighbours
+        self._similarity = similarity
+        self.k = k
+        self.window = window
+        self.batch_size = batch_size
+        self._dirty: Dict[ObjectId, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self, tid: ObjectId):
+        self._dirty.setdefault(tid, time.monotonic())
+
+    async def _compute(self, tids: List[ObjectId]) -> Dict[ObjectId, List[dict]]:
+        fresh = {}
+        for i in range(0, len(tids), self.batch_size):
+            found = self._neighbours(tids[i:i + self.batch_size], self.k)
+            fresh.update({
+                tid: [{"_id": other, "score": round(score, 4)} for other, score in ranked]
+                for tid, ranked in found.items()
+            })
+            # one batch is a matrix product per topic; let requests through in between
+            await asyncio.sleep(0)
+        return fresh
+
+    def _patched(self, tid: ObjectId, entries: List[dict], moved: Iterable[ObjectId]) -> List[dict]:
+        moved = set(moved)
+        entries = [e for e in entries if e["_id"] not in moved]
+        for other in moved:
+            score = self._similarity(tid, other)
+            if score is not None and score > 0:
+                entries.append({"_id": other, "score": round(score, 4)})
+        entries.sort(key=lambda e: e["score"], reverse=True)
+        return entries[:self.k]
+
+    async def refresh(self, tids: List[ObjectId], propagate: bool = True) -> Dict[ObjectId, List[dict]]:
+        """Recomputes and stores the related lists of `tids`; returns them."""
+        fresh = await self._compute(tids)
+        if not fresh:
+            return {}
+        updates = dict(fresh)
+
+        if propagate:
+            previous = {
+                t["_id"]: t.get("related") or []
+                async for t in threads_col.find({"_id": {"$in": list(fresh)}}, {"related": 1})
+            }
+            affected: Dict[ObjectId, Set[ObjectId]] = {}
+            for tid, entries in fresh.items():
+                for entry in previous.get(tid, []) + entries:
+                    if entry["_id"] not in fresh:
+                        affected.setdefault(entry["_id"], set()).add(tid)
+            # read-modify-write: a concurrent refresh elsewhere can win, which only
+            # costs accuracy until that thread is refreshed itself
+            async for t in threads_col.find({"_id": {"$in": list(affected)}}, {"related": 1}):
+                updates[t["_id"]] = self._patched(t["_id"], t.get("related") or [], affected[t["_id"]])
+
+        now = datetime.utcnow()
+        await threads_col.bulk_write(
+            [UpdateOne({"_id": tid}, {"$set": {"related": entries, "related_updated": now}})
+             for tid, entries in updates.items()],
+            ordered=False
+        )
+        return fresh
+
+    async def flush(self, force: bool = False) -> int:
+        now = time.monotonic()
+        due = [tid for tid, since in self._dirty.items() if force or now - since >= self.window]
+        if not due:
+            return 0
+        for tid in due:
+            self._dirty.pop(tid, None)
+        return len(await self.refresh(due))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(max(self.window / 2, 1.0))
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("related threads refresh failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush(force=True)
@@ -0,0 +1,91 @@
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from app.config import THREAD_VECTOR_DIM
+from app.database import thread_assigner_state_col
+
+_IDF_DOC_ID = "idf"
+
+
+class StableVectorizer:
+    """TF-IDF over hashed features.
+
+    The hashing step needs no fitted vocabulary, so a feature index means the
+    same thing in every process and after every restart, and new terms are
+    never invisible. Document frequencies are accumulated in Mongo with `$inc`
+    so all workers converge on the same IDF weights; `observe()` only counts in
+    memory and `flush()` sends what was observed since the last one in a single
+    update.
+    """
+
+    def __init__(self, dim: int = THREAD_VECTOR_DIM):
+        self.dim = dim
+        self._hasher = HashingVectorizer(
+            n_features=dim, stop_words="english", ngram_range=(1, 2),
+            alternate_sign=False, norm=None
+        )
+        self.df = np.zeros(dim, dtype=np.float64)
+        self.n_docs = 0
+        self._idf = np.ones(dim, dtype=np.float32)
+        # observed here but not in Mongo yet
+        self._pending_df = np.zeros(dim, dtype=np.int64)
+        self._pending_docs = 0
+
+    def counts(self, text: str) -> np.ndarray:
+        return self._hasher.transform([text]).toarray()[0].astype(np.float32)
+
+    def weigh(self, counts: np.ndarray) -> np.ndarray:
+        vec = counts * self._idf
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def transform(self, text: str) -> np.ndarray:
+        return self.weigh(self.counts(text))
+
+    def _refresh_idf(self):
+        # same smoothing as sklearn's TfidfVectorizer
+        self._idf = (np.log((1 + self.n_docs) / (1 + self.df)) + 1).astype(np.float32)
+
+    async def load(self):
+        doc = await thread_assigner_state_col.find_one({"_id": _IDF_DOC_ID}) or {}
+        if doc.get("dim", self.dim) != self.dim:
+            # statistics were collected for another feature space
+            doc = {}
+        df = np.zeros(self.dim, dtype=np.float64)
+        for key, value in (doc.get("df") or {}).items():
+            i = int(key)
+            if i < self.dim:
+                df[i] = value
+        # counts not flushed yet are still ours to add
+        self.df = df + self._pending_df
+        self.n_docs = doc.get("n_docs", 0) + self._pending_docs
+        self._refresh_idf()
+
+    def observe(self, counts: np.ndarray):
+        """Adds one document to the document-frequency statistics."""
+        present = np.nonzero(counts)[0]
+        self.df[present] += 1
+        self.n_docs += 1
+        self._pending_df[present] += 1
+        self._pending_docs += 1
+        self._refresh_idf()
+
+    async def flush(self):
+        """Adds the documents observed since the last flush to the shared statistics."""
+        if not self._pending_docs:
+            return
+        pending_df, pending_docs = self._pending_df, self._pending_docs
+        self._pending_df, self._pending_docs = np.zeros(self.dim, dtype=np.int64), 0
+        inc = {f"df.{int(i)}": int(pending_df[i]) for i in np.nonzero(pending_df)[0]}
+        inc["n_docs"] = pending_docs
+        try:
+            await thread_assigner_state_col.update_one(
+                {"_id": _IDF_DOC_ID},
+                {"$inc": inc, "$set": {"dim": self.dim}},
+                upsert=True
+            )
+        except Exception:
+            # kept for the next flush
+            self._pending_df += pending_df
+            self._pending_docs += pending_docs
+            raise
@@ -0,0 +1,94 @@
+"""
+Compares the cost of the grammar-scoring backends on a fixed corpus.
+
+    python -m benchmarks.bench_grammar [--repeat 50] [--backends heuristic,languagetool]
+
+Reports throughput in documents per second, raw and through the cache, and
+how often each backend's verdicts agree with LanguageTool's when it is available.
+The corpus has no labels of its own. Its sloppy half was written around the
+mistakes the heuristic rules look for, so agreement on it is an upper bound,
+not an accuracy estimate.
+"""
+import argparse
+import time
+
+from app.grammar import GRAMMAR_BACKENDS, CachedGrammarScorer
+
+CORPUS = [
+    "The central bank raised interest rates by a quarter point on Wednesday. Officials said inflation "
+    "remained above target and signalled that further increases were possible later this year.",
+    "Rescue teams worked through the night to reach villagers cut off by the floods. The regional "
+    "governor said roads would reopen once the water receded.",
+    "Scientists have identified a new species of frog in the Andes. The animal, which is smaller than "
+    "a fingernail, lives in moss on the forest floor.",
+    "The company reported higher quarterly profits, driven by strong demand for its cloud services. "
+    "Shares rose four percent in early trading.",
+    "Voters in the capital will elect a new mayor next month. Polls suggest the race between the two "
+    "leading candidates remains close.",
+    "The museum will reopen its modern art wing after a two-year renovation. Visitors can book tickets "
+    "online from Monday.",
+    "A spokesperson for the ministry declined to comment on the report. An official statement is "
+    "expected on Friday.",
+    "The team secured a late victory with a goal in the final minute. Their coach praised the players "
+    "for staying calm under pressure.",
+    # written to contain the mistakes the heuristic rules look for
+    "the the government said it would definately act soon ,but nobody knew when.it was unclear what "
+    "would happen next!!!",
+    "i think this is a amazing deal,you should of bought it already. alot of people agree untill now",
+    "experts say the the market will recieve a boost. investors are are waiting for an decision.",
+    "He said that they could of won ,if the referee was fair.the fans was angry and and left early",
+    "shocking news!!! you wont believe what happened ... click here ,now. its a incredible story",
+    "the new phone is seperate from the old model wich had alot of problems. i recommend it",
+    "officials occured to be late.. the meeting started untill noon , nobody knew why (or how",
+    "there team lost again.the players was tired and the coach said nothing ,nothing at all!!",
+]
+
+
+def run(backends, repeat: int):
+    results = {}
+
+    for name in backends:
+        # no cache here: we want the raw backend cost
+        scorer = GRAMMAR_BACKENDS[name]()
+        try:
+            verdicts = [scorer.assess(text) for text in CORPUS]
+        except Exception as e:
+            print(f"{name:>14}: unavailable ({type(e).__name__}: {e})")
+            continue
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text in CORPUS:
+                scorer.assess(text)
+        elapsed = time.perf_counter() - start
+
+        cached = CachedGrammarScorer(scorer)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text in CORPUS:
+                cached.assess(text)
+        cached_elapsed = time.perf_counter() - start
+
+        results[name] = verdicts
+        docs = repeat * len(CORPUS)
+        print(f"{name:>14}: {docs / elapsed:10.1f} docs/s  "
+              f"(cached {docs / cached_elapsed:10.1f} docs/s)")
+
+        if hasattr(scorer, "close"):
+            scorer.close()
+
+    if "languagetool" in results:
+        reference = results["languagetool"]
+        for name, verdicts in results.items():
+            if name == "languagetool":
+                continue
+            agreement = sum(a == b for a, b in zip(verdicts, reference)) / len(reference)
+            print(f"{name:>14}: agreement with languagetool {agreement:.2f}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--backends", default=",".join(GRAMMAR_BACKENDS))
+    args = ap.parse_args()
+    run([b.strip() for b in args.backends.split(",") if b.strip()], args.repeat)
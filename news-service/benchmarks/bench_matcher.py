@@ -0,0 +1,79 @@
+"""
+Per-pattern re.search loop vs. the precompiled single-pass CredibilityMatcher.
+
+    python -m benchmarks.bench_matcher [--articles 200] [--paragraphs 60]
+"""
+import argparse
+import random
+import re
+import time
+
+from app.config import CLICKBAIT_PATTERNS, AD_PATTERNS
+from app.matchers import credibility_matcher
+
+PARAGRAPH = (
+    "Officials confirmed on Tuesday that the new regulations would come into force next spring, "
+    "following months of consultation with industry groups and consumer organisations. "
+    "Critics argue the rules do not go far enough, while supporters say they strike a balance. "
+)
+TITLES = [
+    "Parliament approves budget after marathon session",
+    "You won’t believe what happened next at the summit",
+    "Top 10 reasons why markets are nervous",
+    "How to prepare for the winter energy crunch",
+    "Storm leaves thousands without power",
+]
+
+
+def legacy_is_clickbait(title: str) -> bool:
+    return any(re.search(pat, title.lower()) for pat in CLICKBAIT_PATTERNS)
+
+
+def legacy_is_ad_content(title: str, content: str) -> bool:
+    combined = f"{title} {content}".lower()
+    return any(re.search(pat, combined) for pat in AD_PATTERNS)
+
+
+def make_corpus(n: int, paragraphs: int):
+    rng = random.Random(0)
+    corpus = []
+    for i in range(n):
+        body = PARAGRAPH * paragraphs
+        if i % 7 == 0:
+            body += " This article contains an affiliate link. Buy now!"
+        corpus.append((rng.choice(TITLES), body))
+    return corpus
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - start
+
+
+def run(n: int, paragraphs: int):
+    corpus = make_corpus(n, paragraphs)
+    print(f"{n} articles, ~{len(corpus[0][1]) // 1000}k chars each")
+
+    legacy, t_legacy = timed(lambda: [
+        (legacy_is_clickbait(t), legacy_is_ad_content(t, c)) for t, c in corpus
+    ])
+    fast, t_fast = timed(lambda: [
+        (credibility_matcher.is_clickbait(t), credibility_matcher.is_ad(t, c)) for t, c in corpus
+    ])
+    signals, t_signals = timed(lambda: credibility_matcher.signals_many(corpus))
+
+    assert legacy == fast, "matcher disagrees with the per-pattern loop"
+    assert legacy == [(bool(s["clickbait"]), bool(s["ad"])) for s in signals]
+
+    print(f"  per-pattern loop : {t_legacy * 1000:8.1f} ms")
+    print(f"  matcher (bool)   : {t_fast * 1000:8.1f} ms  ({t_legacy / t_fast:.1f}x)")
+    print(f"  matcher (rules)  : {t_signals * 1000:8.1f} ms  ({t_legacy / t_signals:.1f}x)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--articles", type=int, default=200)
+    ap.add_argument("--paragraphs", type=int, default=60)
+    args = ap.parse_args()
+    run(args.articles, args.paragraphs)
@@ -0,0 +1,81 @@
+"""
+Query latency of the in-process BM25 search index.
+
+    python -m benchmarks.bench_search [--articles 50000] [--queries 500]
+
+Articles are synthetic: words drawn from a Zipf-like vocabulary, so common
+terms have long posting lists as in real news text. Reports build time and
+p50/p95 latency of search() plus facet counting and snippet extraction for the
+first page.
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.search_index import SearchIndex
+
+TOPICS = ["politics", "tech", "science", "sport", "economy", "health", "world"]
+LANGUAGES = ["en", "fr", "de", "es", "ro"]
+LABELS = ["high", "medium", "low", "unrated"]
+
+
+def vocabulary(n: int) -> list:
+    return [f"term{i}" for i in range(n)]
+
+
+def text(rng, vocab, cum_weights, n_words: int) -> str:
+    return " ".join(rng.choices(vocab, cum_weights=cum_weights, k=n_words))
+
+
+def run(n_articles: int, n_queries: int):
+    rng = random.Random(0)
+    vocab = vocabulary(20000)
+    weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocab))))
+    now = datetime(2025, 6, 1)
+    threads = [ObjectId() for _ in range(n_articles // 4)]
+
+    index = SearchIndex(path="/dev/null")
+    index._loaded = True
+    start = time.perf_counter()
+    for i in range(n_articles):
+        index.add({
+            "_id": ObjectId(),
+            "title": text(rng, vocab, weights, 10),
+            "description": text(rng, vocab, weights, 30),
+            "content_en": text(rng, vocab, weights, 300),
+            "topic": rng.choice(TOPICS),
+            "language": rng.choice(LANGUAGES),
+            "credibility_label": rng.choice(LABELS),
+            "thread_id": rng.choice(threads),
+            "published": now - timedelta(minutes=i),
+        })
+    build_s = time.perf_counter() - start
+
+    queries = [" ".join(rng.choices(vocab[50:5000], k=rng.randint(1, 3))) for _ in range(n_queries)]
+    timings = []
+    for i, q in enumerate(queries):
+        filters = {"topic": [rng.choice(TOPICS)]} if i % 2 else None
+        start = time.perf_counter()
+        found = index.search(q, filters)
+        index.rank_threads(found["hits"])
+        for aid, _ in found["hits"][:20]:
+            index.snippet(aid, found["terms"])
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{n_articles} articles indexed in {build_s:.1f}s, {len(index._postings)} terms")
+    print(f"  search + facets + threads + 20 snippets: p50 {p50:.2f} ms  p95 {p95:.2f} ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--articles", type=int, default=50000)
+    ap.add_argument("--queries", type=int, default=500)
+    args = ap.parse_args()
+    run(args.articles, args.queries)
@@ -0,0 +1,124 @@
+"""
+Serialization cost of one /feed page: the per-field mutation + model_validate +
+response_model path vs. the shared projection + ORJSONResponse path.
+
+    python -m benchmarks.bench_serialization [--items 100] [--rounds 200]
+
+Both paths start from the same raw Mongo documents and end with response
+bytes; the script checks that they decode to the same JSON.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models import Article, FeedResponse, Thread
+from app.serializers import feed_out, json_response
+
+TOPICS = ["politics", "tech", "science", "sport", "economy"]
+
+
+def raw_articles(rng, n: int) -> list:
+    now = datetime(2025, 6, 1)
+    return [{
+        "_id": ObjectId(),
+        "url": f"https://example.com/news/{i}",
+        "source": "Example News",
+        "title": f"Headline number {i} about the day's events",
+        "description": "A short description of what happened. " * 3,
+        "credibility_score": rng.randint(0, 100),
+        "credibility_label": "medium",
+        "published": now - timedelta(minutes=i),
+        "author": "Staff",
+        "content": "Body text of the article. " * 120,
+        "image": f"https://example.com/img/{i}.jpg",
+        "topic": rng.choice(TOPICS),
+        "fetched_at": now,
+        "views": rng.randint(0, 5000),
+        "thread_id": ObjectId(),
+    } for i in range(n)]
+
+
+def raw_threads(rng, n: int) -> list:
+    now = datetime(2025, 6, 1)
+    return [{
+        "_id": ObjectId(),
+        "title": f"Thread {i}",
+        "language": "en",
+        "last_updated": now - timedelta(minutes=i),
+        "image": f"https://example.com/img/t{i}.jpg",
+        "topic": rng.choice(TOPICS),
+        "articles": [ObjectId() for _ in range(rng.randint(2, 12))],
+    } for i in range(n)]
+
+
+async def legacy(articles: list, threads: list, field) -> bytes:
+    """What get_feed did before app.serializers."""
+    result = FeedResponse()
+    for d in articles:
+        d["_id"] = str(d["_id"])
+        if isinstance(d.get("published"), datetime):
+            d["published"] = d["published"].isoformat()
+        if "topics" not in d:
+            d["topics"] = [d.get("topic")] if d.get("topic") else []
+        if "thread_id" in d:
+            d["thread_id"] = str(d["thread_id"])
+        if isinstance(d.get("fetched_at"), datetime):
+            d["fetched_at"] = d["fetched_at"].isoformat()
+        d["credibility_label"] = d.get("credibility_label", "unrated")
+        d["reports"] = d.get("reports", 0)
+        d["thread"] = None
+    result.articles = [Article.model_validate(d) for d in articles]
+    for t in threads:
+        t["_id"] = str(t["_id"])
+        if isinstance(t.get("last_updated"), datetime):
+            t["last_updated"] = t["last_updated"].isoformat()
+        t["language"] = t.get("language", "en")
+        t["articles"] = [str(a) for a in t.get("articles", [])]
+    result.threads = [Thread.model_validate(t) for t in threads]
+    content = await serialize_response(field=field, response_content=result)
+    return JSONResponse(content).body
+
+
+def fast(articles: list, threads: list) -> bytes:
+    return json_response(feed_out(articles, threads)).body
+
+
+def run(items: int, rounds: int):
+    rng = random.Random(0)
+    articles, threads = raw_articles(rng, items), raw_threads(rng, items)
+    field = create_model_field(name="Response_get_feed", type_=FeedResponse, mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    # legacy mutates its input, so every round gets fresh copies; copying is timed separately
+    copies = [(copy.deepcopy(articles), copy.deepcopy(threads)) for _ in range(rounds)]
+    start = time.perf_counter()
+    for a, t in copies:
+        legacy_body = loop.run_until_complete(legacy(a, t, field))
+    legacy_ms = (time.perf_counter() - start) * 1000 / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fast_body = fast(articles, threads)
+    fast_ms = (time.perf_counter() - start) * 1000 / rounds
+
+    assert json.loads(legacy_body) == json.loads(fast_body), "outputs differ"
+    print(f"feed page with {items} articles + {items} threads, {len(fast_body) / 1024:.0f} KiB")
+    print(f"  model_validate + response_model + json : {legacy_ms:7.2f} ms/page")
+    print(f"  projection + orjson                    : {fast_ms:7.2f} ms/page  ({legacy_ms / fast_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+    run(args.items, args.rounds)
@@ -0,0 +1,73 @@
+"""
+Recall vs. latency of the LSH thread index against exact cosine search.
+
+    python -m benchmarks.bench_thread_index [--threads 20000] [--dim 1000] [--queries 500]
+
+Centroids are sparse synthetic TF-IDF-like vectors; each query is a noisy copy
+of a random centroid, so its exact best match is known to be a real hit.
+Recall@1 counts queries where the ANN answer equals the exact answer.
+"""
+import argparse
+import time
+
+import numpy as np
+from bson import ObjectId
+
+from app.centroid_index import LSHIndex, TopicCentroids, l2_normalize
+
+
+def sparse_vectors(rng, n: int, dim: int, nnz: int) -> np.ndarray:
+    out = np.zeros((n, dim), dtype=np.float32)
+    for row in out:
+        idx = rng.choice(dim, size=nnz, replace=False)
+        row[idx] = rng.random(nnz)
+    return out
+
+
+def run(n_threads: int, dim: int, n_queries: int, configs):
+    rng = np.random.default_rng(0)
+    centroids = sparse_vectors(rng, n_threads, dim, 40)
+    targets = rng.integers(0, n_threads, size=n_queries)
+    queries = [
+        l2_normalize(centroids[t] + 0.6 * sparse_vectors(rng, 1, dim, 40)[0]) for t in targets
+    ]
+    ids = [ObjectId() for _ in range(n_threads)]
+
+    exact = TopicCentroids(dim, ann=False)
+    for tid, vec in zip(ids, centroids):
+        exact.add(tid, vec)
+
+    start = time.perf_counter()
+    truth = [exact.best_match(q) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / n_queries
+    print(f"{n_threads} threads, dim {dim}")
+    print(f"  exact                 : {exact_ms:7.3f} ms/query")
+
+    for tables, bits in configs:
+        index = TopicCentroids(dim, ann=False)
+        index.matrix, index.ids, index.rows = exact.matrix, exact.ids, exact.rows
+        index.ann = LSHIndex(dim, n_tables=tables, n_bits=bits)
+        index.ann_min_size = 0
+
+        start = time.perf_counter()
+        for tid in ids:
+            index.ann.insert(tid, index.vector(tid))
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        answers = [index.best_match(q) for q in queries]
+        ann_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+        recall = sum(a[0] == t[0] for a, t in zip(answers, truth)) / n_queries
+        scanned = np.mean([len(index.ann.candidates(q)) for q in queries[:50]]) / n_threads
+        print(f"  lsh tables={tables:<2} bits={bits:<2}: {ann_ms:7.3f} ms/query  recall@1 {recall:.3f}  "
+              f"scanned {scanned:.1%}  build {build_s:.1f}s")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--threads", type=int, default=20000)
+    ap.add_argument("--dim", type=int, default=1000)
+    ap.add_argument("--queries", type=int, default=500)
+    args = ap.parse_args()
+    run(args.threads, args.dim, args.queries, [(8, 12), (16, 12), (16, 14), (24, 16)])
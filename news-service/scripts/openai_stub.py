@@ -0,0 +1,74 @@
+"""
+Minimal stand-in for the OpenAI chat completions API, for exercising the LLM
+gateway without network access or API costs.
+
+    uvicorn scripts.openai_stub:app --port 8089
+    OPENAI_BASE_URL=http://localhost:8089/v1 OPENAI_API_KEY=stub python -m app.crawler
+
+STUB_RATE_LIMIT_EVERY=N answers every Nth request with a 429 (Retry-After: 1)
+so the gateway's backoff can be observed. STUB_LATENCY adds a fixed delay.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+RATE_LIMIT_EVERY = int(os.getenv("STUB_RATE_LIMIT_EVERY", "0"))
+LATENCY = float(os.getenv("STUB_LATENCY", "0"))
+
+app = FastAPI(title="OpenAI stub")
+state = {"requests": 0}
+
+
+def _answer(messages: list) -> str:
+    system = messages[0]["content"] if messages else ""
+    user = messages[-1]["content"] if messages else ""
+
+    if "JSON object" in system:
+        blocks = re.findall(r"```\n(.*?)\n```", user, flags=re.S)
+        content = blocks[0] if blocks else ""
+        description = (blocks[1] if len(blocks) > 1 else "") or content[:200]
+        data = {"content": content, "description": description, "topic": "world"}
+        if "content_en" in system:
+            data["content_en"] = content
+        return json.dumps(data)
+    if "title" in system.lower():
+        return "Stub Thread Title"
+    return user.split("\n\n", 1)[-1]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    state["requests"] += 1
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    if RATE_LIMIT_EVERY and state["requests"] % RATE_LIMIT_EVERY == 0:
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": "1"},
+            content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+        )
+
+    text = _answer(body.get("messages", []))
+    return {
+        "id": f"chatcmpl-stub-{state['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return state
@@ -0,0 +1,231 @@
+import copy
+import os
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError, DuplicateKeyError
+
+# the suite must run without credentials; nothing in it may reach the real API
+os.environ.pop("OPENAI_API_KEY", None)
+
+
+class NoNetworkClient:
+    """Stands in for AsyncOpenAI so a test that forgets to fake the LLM fails loudly."""
+
+    @property
+    def chat(self):
+        raise AssertionError("tests must not call the OpenAI API")
+
+
+@pytest.fixture(autouse=True)
+def no_llm(monkeypatch):
+    from app.llm_gateway import gateway
+    monkeypatch.setattr(gateway, "_client", NoNetworkClient())
+
+
+# ─── fake Motor collections ─────────────────────────────────────────────────────────
+
+_MISSING = object()
+
+
+def _get(doc: dict, path: str):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return _MISSING
+        doc = doc[part]
+    return doc
+
+
+def _set(doc: dict, path: str, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def _compare(value, op: str, arg) -> bool:
+    values = value if isinstance(value, list) else [value]
+    if op == "$in":
+        return any(v in arg for v in values) or (value is _MISSING and None in arg)
+    if op == "$ne":
+        return value != arg
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if value is _MISSING or value is None:
+        return False
+    return {"$gt": value > arg, "$gte": value >= arg, "$lt": value < arg, "$lte": value <= arg}[op]
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """Equality, $in/$ne/$exists/$gt/$gte/$lt/$lte and a top-level $or."""
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            if not all(_compare(value, op, arg) for op, arg in cond.items()):
+                return False
+        elif cond is None:
+            if value not in (None, _MISSING):
+                return False
+        elif not (value == cond or (isinstance(value, list) and cond in value)):
+            return False
+    return True
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False):
+    for path, value in update.get("$set", {}).items():
+        _set(doc, path, value)
+    if inserting:
+        for path, value in update.get("$setOnInsert", {}).items():
+            _set(doc, path, value)
+    for path, amount in update.get("$inc", {}).items():
+        current = _get(doc, path)
+        _set(doc, path, (0 if current is _MISSING else current) + amount)
+    for path, spec in update.get("$addToSet", {}).items():
+        current = _get(doc, path)
+        items = list(current) if current is not _MISSING else []
+        for value in spec["$each"] if isinstance(spec, dict) else [spec]:
+            if value not in items:
+                items.append(value)
+        _set(doc, path, items)
+    for path, spec in update.get("$push", {}).items():
+        current = _get(doc, path)
+        items = list(current) if current is not _MISSING else []
+        each = spec["$each"] if isinstance(spec, dict) else [spec]
+        at = spec.get("$position", len(items)) if isinstance(spec, dict) else len(items)
+        items[at:at] = each
+        if isinstance(spec, dict) and "$slice" in spec:
+            items = items[:spec["$slice"]]
+        _set(doc, path, items)
+    for path in update.get("$unset", {}):
+        *parents, last = path.split(".")
+        parent = _get(doc, ".".join(parents)) if parents else doc
+        if isinstance(parent, dict):
+            parent.pop(last, None)
+    for path, value in update.get("$pull", {}).items():
+        current = _get(doc, path)
+        if current is not _MISSING:
+            _set(doc, path, [v for v in current if v != value])
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self._docs.sort(key=lambda d: (_get(d, field) is not _MISSING, _get(d, field)), reverse=direction < 0)
+        return self
+
+    def skip(self, n):
+        self._docs = self._docs[n:]
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n] if n else self._docs
+        return self
+
+    async def to_list(self, length=None):
+        return list(self._docs if length is None else self._docs[:length])
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for unit tests, kept in a dict by _id.
+    `updates` records every update document it was sent; inserts of the ids in
+    `reject` fail as write errors."""
+
+    def __init__(self, docs=(), reject=()):
+        self.docs = {doc["_id"]: dict(doc) for doc in docs}
+        self.updates = []
+        self.reject = set(reject)
+
+    def find(self, query=None, projection=None):
+        return FakeCursor([doc for doc in self.docs.values() if matches(doc, query or {})])
+
+    async def find_one(self, query, projection=None):
+        return next((doc for doc in self.docs.values() if matches(doc, query)), None)
+
+    async def insert_one(self, doc):
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def insert_many(self, docs, ordered=True):
+        errors = []
+        for i, doc in enumerate(docs):
+            if doc["_id"] in self.reject:
+                errors.append({"index": i, "code": 121, "errmsg": "Document failed validation"})
+            else:
+                self.docs[doc["_id"]] = dict(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(docs) - len(errors)})
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append(update)
+        doc = await self.find_one(query)
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+            if query["_id"] in self.docs:
+                raise DuplicateKeyError("E11000 duplicate key error collection")
+            doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+            apply_update(doc, update, inserting=True)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+        apply_update(doc, update)
+        return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+
+    async def update_many(self, query, update):
+        self.updates.append(update)
+        docs = [doc for doc in self.docs.values() if matches(doc, query)]
+        for doc in docs:
+            apply_update(doc, update)
+        return SimpleNamespace(matched_count=len(docs), modified_count=len(docs))
+
+    async def find_one_and_update(self, query, update, projection=None, upsert=False, return_document=False):
+        before = await self.find_one(query)
+        snapshot = copy.deepcopy(before)
+        result = await self.update_one(query, update, upsert=upsert)
+        if not return_document:
+            return snapshot
+        _id = before["_id"] if before is not None else result.upserted_id
+        return None if _id is None else self.docs[_id]
+
+    async def bulk_write(self, ops, ordered=True):
+        matched = 0
+        for op in ops:
+            result = await self.update_one(op._filter, op._doc, upsert=op._upsert)
+            matched += result.matched_count
+        return SimpleNamespace(matched_count=matched)
+
+    async def delete_one(self, query):
+        doc = await self.find_one(query)
+        if doc is not None:
+            del self.docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=int(doc is not None))
+
+
+class UnreachableCollection:
+    """Every call fails the way a dropped connection does."""
+
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            raise AutoReconnect("connection closed")
+        return fail
+
+
+@pytest.fixture
+def make_collection():
+    return FakeCollection
+
+
+@pytest.fixture
+def unreachable():
+    return UnreachableCollection()
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from app.cache import MemoryBackend, ResponseCache
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return {"value": self.calls}
+
+
+class BrokenBackend:
+    async def get(self, key):
+        raise ConnectionError("cache down")
+
+    async def set(self, key, value, ttl):
+        raise ConnectionError("cache down")
+
+
+def test_loads_once_until_invalidated_or_expired(monkeypatch):
+    cache, load = ResponseCache(MemoryBackend(), ttl=60), Loader()
+
+    async def run():
+        assert await cache.get_or_load("article:1", load) == {"value": 1}
+        assert await cache.get_or_load("article:1", load) == {"value": 1}
+        await cache.invalidate("article:1")
+        assert await cache.get_or_load("article:1", load) == {"value": 2}
+        later = time.monotonic() + 61
+        monkeypatch.setattr(time, "monotonic", lambda: later)
+        assert await cache.get_or_load("article:1", load) == {"value": 3}
+
+    asyncio.run(run())
+    assert cache.stats["hits"] == 1 and cache.stats["invalidations"] == 1
+
+
+def test_a_broken_backend_falls_back_to_the_loader():
+    cache, load = ResponseCache(BrokenBackend()), Loader()
+    assert asyncio.run(cache.get_or_load("thread:1", load)) == {"value": 1}
+    assert load.calls == 1
+    assert cache.stats["errors"] == 2
@@ -0,0 +1,79 @@
+import asyncio
+
+import numpy as np
+from bson import ObjectId
+
+from app import thread_assigner, vectorizer
+from app.centroid_index import TopicCentroids, l2_normalize
+from app.thread_assigner import ThreadAssigner
+
+
+def _vectors(n, dim=32, seed=1):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_best_match_is_the_most_similar_row_after_growth_and_removals():
+    vecs = _vectors(100)
+    ids = [ObjectId() for _ in vecs]
+    # starts small so the matrix has to grow
+    index = TopicCentroids(32, capacity=4, ann=False)
+    for tid, vec in zip(ids, vecs):
+        index.add(tid, vec)
+    for tid in ids[::3]:
+        index.remove(tid)
+    kept = {tid: vec for i, (tid, vec) in enumerate(zip(ids, vecs)) if i % 3}
+    assert len(index) == len(kept)
+
+    for query in _vectors(20, seed=2):
+        expected = max(kept, key=lambda tid: float(l2_normalize(kept[tid]) @ l2_normalize(query)))
+        tid, sim = index.best_match(query)
+        assert tid == expected
+        assert np.isclose(sim, float(l2_normalize(kept[tid]) @ l2_normalize(query)), atol=1e-5)
+    for tid, vec in kept.items():
+        assert np.allclose(index.vector(tid), l2_normalize(vec))
+
+
+def test_threads_only_match_within_their_topic(monkeypatch, tmp_path, make_collection):
+    async def title(examples):
+        return "Title"
+
+    monkeypatch.setattr(thread_assigner, "threads_col", make_collection())
+    monkeypatch.setattr(vectorizer, "thread_assigner_state_col", make_collection())
+    monkeypatch.setattr(thread_assigner, "generate_thread_title", title)
+    assigner = ThreadAssigner(state_dir=str(tmp_path))
+    text = "Chip maker unveils a faster processor for laptops"
+
+    async def run():
+        return [await assigner.assign(text, topic) for topic in ("tech", "business", "tech")]
+
+    tech, business, tech_again = asyncio.run(run())
+    assert tech == tech_again
+    assert business != tech
+
+
+def test_lsh_finds_close_threads_from_a_small_candidate_set():
+    vecs = _vectors(3000, dim=64)
+    ids = [ObjectId() for _ in vecs]
+    index = TopicCentroids(64, ann=True, ann_min_size=1000)
+    for tid, vec in zip(ids, vecs):
+        index.add(tid, vec)
+
+    rng = np.random.default_rng(3)
+    found = 0
+    for i in range(0, 3000, 60):
+        query = vecs[i] + 0.2 * rng.standard_normal(64).astype(np.float32)
+        assert len(index.ann.candidates(l2_normalize(query))) < len(index) // 4
+        found += index.best_match(query)[0] == ids[i]
+    assert found >= 45
+
+
+def test_lsh_follows_updates_and_removals():
+    vecs = _vectors(2, dim=64)
+    tid = ObjectId()
+    index = TopicCentroids(64, ann=True, ann_min_size=1)
+    index.add(tid, vecs[0])
+    index.update(tid, vecs[1])
+    assert tid in index.ann.candidates(l2_normalize(vecs[1]))
+    index.remove(tid)
+    assert index.ann.candidates(l2_normalize(vecs[1])) == set()
+    assert index.best_match(vecs[1]) == (None, -1.0)
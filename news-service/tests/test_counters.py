@@ -0,0 +1,34 @@
+import asyncio
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.counters import CounterBuffer
+
+
+class FailingCollection:
+    """Applies every update of the batch except those at `fail`."""
+
+    def __init__(self, fail):
+        self.fail = fail
+        self.applied = []
+
+    async def bulk_write(self, ops, ordered=True):
+        errors = []
+        for i, op in enumerate(ops):
+            if i in self.fail:
+                errors.append({"index": i, "code": 14, "errmsg": "Cannot apply $inc to a value of non-numeric type"})
+            else:
+                self.applied.append(op)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": 0, "nModified": len(self.applied)})
+
+
+def test_flush_requeues_only_failed_updates():
+    a, b = ObjectId(), ObjectId()
+    counters = CounterBuffer(FailingCollection(fail={1}))
+    counters.incr(a, "views", 10)
+    counters.incr(b, "views", 10)
+    assert asyncio.run(counters.flush()) == 1
+    assert counters.deltas(a) == {}
+    assert counters.deltas(b) == {"views": 10}
@@ -0,0 +1,100 @@
+import asyncio
+
+import orjson
+
+from app import crawl_jobs as jobs_module
+from app import feed_state
+from app.crawl_jobs import CrawlJobs
+
+SOURCES = [{"source": "A", "feedUrl": "feed-a"}, {"source": "B", "feedUrl": "feed-b"}]
+
+
+def _hold_crawls(monkeypatch, make_collection):
+    col = make_collection()
+    monkeypatch.setattr(feed_state, "feed_state_col", col)
+    release = asyncio.Event()
+
+    async def crawl(sources, on_event=None):
+        await release.wait()
+        return len(sources)
+
+    monkeypatch.setattr(jobs_module, "crawl_and_process", crawl)
+    return col, release
+
+
+def test_workers_never_crawl_the_same_feed(monkeypatch, make_collection):
+    async def run():
+        col, release = _hold_crawls(monkeypatch, make_collection)
+        # two worker processes, sharing only the database
+        first, second = CrawlJobs(), CrawlJobs()
+        job_a, created_a = await first.submit(SOURCES[:1])
+        job_b, created_b = await second.submit(SOURCES)
+        assert created_a and created_b
+        assert [src["feedUrl"] for src in job_b.sources] == ["feed-b"]
+        assert job_b.skipped == {"feed-a": job_a.id}
+
+        release.set()
+        await asyncio.gather(job_a.wait(), job_b.wait())
+        assert col.docs["feed-a"]["lease_owner"] is None
+        job_c, _ = await second.submit(SOURCES[:1])
+        assert job_c.sources == SOURCES[:1]
+        await job_c.wait()
+
+    asyncio.run(run())
+
+
+def test_feeds_taken_in_this_process_return_the_running_job(monkeypatch, make_collection):
+    async def run():
+        _, release = _hold_crawls(monkeypatch, make_collection)
+        jobs = CrawlJobs()
+        job, _ = await jobs.submit(SOURCES)
+        again, created = await jobs.submit(SOURCES[1:])
+        assert again is job and not created
+        release.set()
+        await job.wait()
+
+    asyncio.run(run())
+
+
+def _event(stage, feed, out=1, errors=0):
+    return {"stage": stage, "feed": feed, "source": feed.upper(), "items": 1, "out": out,
+            "dropped": 1 - out, "errors": errors, "seconds": 0.5}
+
+
+def test_stream_sends_progress_then_done(monkeypatch, make_collection):
+    _, release = _hold_crawls(monkeypatch, make_collection)
+    monkeypatch.setattr(jobs_module, "CRAWL_PROGRESS_INTERVAL", 0)
+    step = asyncio.Event()
+
+    async def crawl(sources, on_event=None):
+        on_event(_event("fetch", "feed-a"))
+        on_event(_event("fetch", "feed-b"))
+        await step.wait()
+        on_event(_event("download", "feed-b", out=0, errors=1))
+        await release.wait()
+        return 1
+
+    monkeypatch.setattr(jobs_module, "crawl_and_process", crawl)
+
+    async def run():
+        job, _ = await CrawlJobs().submit(SOURCES)
+        events = []
+        async for message in job.stream():
+            name, data = message.split("\n")[:2]
+            payload = orjson.loads(data[len("data: "):])
+            events.append((name[len("event: "):], payload))
+            if len(payload["feeds"]) == 2:
+                step.set()
+            if "download" in payload["stages"]:
+                release.set()
+        return events
+
+    events = asyncio.run(run())
+    names = [name for name, _ in events]
+    assert names.count("done") == 1 and names[-1] == "done"
+    both = next(i for i, (_, payload) in enumerate(events) if len(payload["feeds"]) == 2)
+    # later progress events only carry the feeds that changed
+    assert set(events[both + 1][1]["feeds"]) == {"feed-b"}
+    done = events[-1][1]
+    assert done["status"] == "succeeded" and done["crawled"] == 1 and done["errors"] == 1
+    assert done["stages"]["fetch"]["out"] == 2 and done["stages"]["download"]["dropped"] == 1
@@ -0,0 +1,10 @@
+from app.dedup import normalize_url
+
+
+def test_normalize_url_drops_tracking_and_fragment():
+    assert normalize_url("HTTPS://WWW.Example.com/a?id=1&utm_source=rss#top") == "https://example.com/a?id=1"
+
+
+def test_normalize_url_only_strips_leading_www_label():
+    assert normalize_url("https://news.www.example.com/a") == "https://news.www.example.com/a"
+    assert normalize_url("https://wwwexample.com/a") == "https://wwwexample.com/a"
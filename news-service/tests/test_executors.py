@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from app import executors
+
+FEED = """<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Example</title>
+  <item><guid>story-1</guid><link>https://example.com/1</link><title>One</title>
+    <pubDate>Mon, 06 Jan 2025 10:00:00 GMT</pubDate></item>
+  <item><link>https://example.com/2</link><title>Two</title></item>
+  <item><title>No link, not crawlable</title></item>
+</channel></rss>
+"""
+
+PAGE = """<html><head><title>Storm floods the coast</title></head><body><article>
+<p>Rescue teams worked through the night to reach villagers cut off by the floods on the coast.</p>
+<p>The regional governor said the roads would reopen once the water had receded, and that
+shelters in the nearby towns had room for every family that had to leave its home.</p>
+</article></body></html>"""
+
+
+def test_blocking_calls_leave_the_event_loop_free():
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await asyncio.gather(*(executors.run_io(time.sleep, 0.2) for _ in range(4)))
+        elapsed = time.perf_counter() - started
+        task.cancel()
+        return ticks, elapsed
+
+    ticks, elapsed = asyncio.run(run())
+    # four sleeps side by side in the pool, with the loop ticking meanwhile
+    assert elapsed < 0.6
+    assert ticks >= 10
+
+
+def test_feed_entries_are_plain_data(tmp_path):
+    path = tmp_path / "feed.xml"
+    path.write_text(FEED, encoding="utf-8")
+    feed = executors.fetch_feed(str(path))
+    assert [entry["guid"] for entry in feed["entries"]] == ["story-1", "https://example.com/2"]
+    assert feed["entries"][0]["published"].day == 6
+
+
+def test_articles_are_parsed_in_the_process_pool():
+    async def run():
+        try:
+            return await executors.run_cpu(executors.parse_article, "https://example.com/storm", PAGE)
+        finally:
+            executors.shutdown()
+
+    art = asyncio.run(run())
+    assert art["title"] == "Storm floods the coast"
+    assert "governor" in art["text"]
+    assert art["language"] == "en"
+
+
+class ConditionalFeed(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = FEED.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_unchanged_feeds_are_answered_with_a_304():
+    server = HTTPServer(("127.0.0.1", 0), ConditionalFeed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/feed.xml"
+    try:
+        first = executors.fetch_feed(url)
+        again = executors.fetch_feed(url, first["etag"], first["modified"])
+    finally:
+        server.shutdown()
+    assert first["status"] == 200 and len(first["entries"]) == 2
+    assert again == {"status": 304, "etag": '"v1"', "modified": None, "entries": []}
+    assert ConditionalFeed.requests == [None, '"v1"']
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app import feed_scheduler as scheduler_module
+from app import feed_state
+from app.config import FEED_POLL_JITTER, FEED_POLL_MAX_SECONDS, FEED_POLL_MIN_SECONDS, FEED_RATE_SMOOTHING
+from app.feed_scheduler import FeedScheduler
+
+SOURCES = [{"source": name, "feedUrl": f"feed-{name}"} for name in ("new", "late", "early", "legacy")]
+
+
+class RecordingJobs:
+    def __init__(self):
+        self.submitted = []
+
+    async def submit(self, sources):
+        self.submitted.append([src["source"] for src in sources])
+
+        async def wait():
+            pass
+
+        return SimpleNamespace(id="job", sources=sources, status="succeeded", crawled=2, wait=wait), True
+
+
+def test_only_due_feeds_are_submitted(monkeypatch, make_collection):
+    now = datetime.utcnow()
+    monkeypatch.setattr(scheduler_module, "feed_state_col", make_collection([
+        {"_id": "feed-late", "next_poll": now - timedelta(minutes=1)},
+        {"_id": "feed-early", "next_poll": now + timedelta(minutes=10)},
+        # polled before schedules were kept
+        {"_id": "feed-legacy", "etag": "x"},
+    ]))
+    jobs = RecordingJobs()
+    monkeypatch.setattr(scheduler_module, "crawl_jobs", jobs)
+
+    assert asyncio.run(FeedScheduler(SOURCES).poll_due()) == 2
+    assert jobs.submitted == [["new", "late", "legacy"]]
+
+
+def test_busy_feeds_are_polled_more_often_and_failing_ones_back_off():
+    def bounds(interval):
+        return interval / (1 + FEED_POLL_JITTER), interval / (1 - FEED_POLL_JITTER)
+
+    low, high = bounds(feed_state.poll_interval(None))
+    assert low <= FEED_POLL_MIN_SECONDS <= high
+    low, _ = bounds(feed_state.poll_interval(0))
+    assert low <= FEED_POLL_MAX_SECONDS
+    assert feed_state.poll_interval(0.5) > feed_state.poll_interval(6) * 5
+    assert feed_state.poll_interval(100, errors=3) > FEED_POLL_MIN_SECONDS * 6
+
+
+def test_publishing_rate_blends_entry_times_and_new_entries():
+    now = datetime(2025, 1, 6, 12)
+    published = [now - timedelta(hours=h) for h in (0, 1, 2, 3)]
+    # three gaps over three hours
+    assert feed_state.publishing_rate({}, 0, published, now) == pytest.approx(1.0)
+    # two new entries since a poll an hour ago: (1 + 2) / 2, then smoothed with the old rate
+    state = {"last_fetched": now - timedelta(hours=1), "poll_rate": 1.0}
+    rate = feed_state.publishing_rate(state, 2, published, now)
+    assert rate == pytest.approx(FEED_RATE_SMOOTHING * 1.5 + (1 - FEED_RATE_SMOOTHING) * 1.0)
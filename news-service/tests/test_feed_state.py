@@ -0,0 +1,43 @@
+import asyncio
+
+from bson import ObjectId
+
+from app import feed_state
+from app.config import FEED_MAX_ATTEMPTS
+from app.feed_state import CrawlLedger
+
+
+def _item(guid):
+    return {"_id": ObjectId(), "src": {"feedUrl": "feed"}, "entry": {"guid": guid}}
+
+
+def _crawl(col, stored=(), lost=()):
+    ledger = CrawlLedger()
+    ledger.fetched("feed", "etag-2", "mod-2", ["a", "b", "c"], ["old"])
+    items = {guid: _item(guid) for guid in ("a", "b", "c")}
+    for guid in stored:
+        ledger.written(items[guid])
+    for guid in lost:
+        ledger.written(items[guid])
+    asyncio.run(ledger.save(lost={items[guid]["_id"] for guid in lost}))
+    return col.docs["feed"]
+
+
+def test_only_stored_and_skipped_entries_are_seen(monkeypatch, make_collection):
+    col = make_collection()
+    monkeypatch.setattr(feed_state, "feed_state_col", col)
+    doc = _crawl(col, stored=["a"], lost=["b"])
+    assert sorted(doc["seen_guids"]) == ["a", "old"]
+    # failed entries keep the feed from being answered with a 304
+    assert "etag" not in doc
+    assert len(doc["entry_failures"]) == 2
+
+
+def test_failing_entries_are_given_up_on(monkeypatch, make_collection):
+    col = make_collection()
+    monkeypatch.setattr(feed_state, "feed_state_col", col)
+    for _ in range(FEED_MAX_ATTEMPTS):
+        doc = _crawl(col, stored=["a", "b"])
+    assert "c" in doc["seen_guids"]
+    assert doc["entry_failures"] == {}
+    assert doc["etag"] == "etag-2"
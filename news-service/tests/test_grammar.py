@@ -0,0 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.grammar import CachedGrammarScorer, GrammarScorer, HeuristicGrammarScorer
+
+
+def test_grammar_scorer_is_abstract():
+    with pytest.raises(TypeError):
+        GrammarScorer()
+
+
+def test_cached_scorer_is_safe_across_threads():
+    scorer = CachedGrammarScorer(HeuristicGrammarScorer(), maxsize=8)
+    texts = [f"Sentence number {i} is fine. It has alot of words." for i in range(32)]
+    expected = [HeuristicGrammarScorer().error_rate(t) for t in texts]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(20):
+            assert list(pool.map(scorer.error_rate, texts)) == expected
+    assert len(scorer._cache) <= 8
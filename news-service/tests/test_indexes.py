@@ -0,0 +1,28 @@
+import asyncio
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from app.config import MONGO_URI
+
+
+def _mongo_available() -> bool:
+    try:
+        MongoClient(MONGO_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _mongo_available(), reason="needs a running MongoDB (MONGO_URI)")
+
+
+def test_router_queries_use_indexes():
+    from app.indexes import ensure_indexes, verify_query_plans
+
+    async def run():
+        assert await ensure_indexes() == []
+        return await verify_query_plans()
+
+    assert asyncio.run(run()) == []
@@ -0,0 +1,41 @@
+import asyncio
+from types import SimpleNamespace
+
+from app import llm_gateway
+from app.crawler import _article_json_ok
+from app.llm_gateway import LLMGateway
+
+
+class FakeClient:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        message = SimpleNamespace(content=self.answers.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_only_valid_answers_are_cached(monkeypatch, make_collection):
+    cache = make_collection()
+    monkeypatch.setattr(llm_gateway, "llm_cache_col", cache)
+    valid = '{"content": "Body", "description": "Summary", "topic": "tech"}'
+    gateway = LLMGateway(FakeClient(["Sorry, I cannot help with that.", valid]), cache_enabled=True)
+    messages = [{"role": "user", "content": "clean this"}]
+
+    async def run():
+        first = await gateway.complete(messages, max_tokens=10, validate=_article_json_ok)
+        assert not cache.docs
+        second = await gateway.complete(messages, max_tokens=10, validate=_article_json_ok)
+        third = await gateway.complete(messages, max_tokens=10, validate=_article_json_ok)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first.startswith("Sorry")
+    assert second == third == valid
+    assert gateway.stats["calls"] == 2 and gateway.stats["cache_hits"] == 1
+
+
+def test_gateway_needs_no_key_until_first_call():
+    gateway = LLMGateway(cache_enabled=False)
+    assert gateway._client is None
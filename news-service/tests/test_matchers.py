@@ -0,0 +1,47 @@
+import re
+
+import pytest
+
+from app.config import AD_PATTERNS, CLICKBAIT_PATTERNS
+from app.matchers import PatternMatcher, literal_anchors
+
+TRICKY = [
+    r"colou?r",
+    r"won'?t",
+    r"ab*c",
+    r"ab+c",
+    r"a{0,2}bc",
+    r"(?:buy|get) now",
+    r"\b(buy|get) now\b",
+    r"(?i)FREE trial",
+    r"x|[ab]c",
+    r"gr[ae]y area",
+    r"\bsale\b|\d+% off",
+    r"(?:limited)? offer",
+    r"^(how to|why)\b",
+    r"pre-?order",
+    r"\.com/shop",
+    *CLICKBAIT_PATTERNS,
+    *AD_PATTERNS,
+]
+
+TEXTS = [
+    "", "color", "colour", "wont", "won't", "ac", "abbbc", "abc", "bc",
+    "buy now", "get now", "go now", "free trial", "FREE TRIAL", "x", "bc", "grey area",
+    "gray area", "big sale today", "50% off", "offer", "limited offer", "how to cook",
+    "why not", "a guide on how to", "preorder", "pre-order", "example.com/shop/x",
+    "you won’t believe this", "top 10 reasons", "buy now, special offer", "utm_source=x",
+]
+
+
+@pytest.mark.parametrize("pattern", TRICKY)
+def test_prefilter_agrees_with_regex(pattern):
+    matcher = PatternMatcher({"rule": pattern})
+    for text in TEXTS:
+        assert matcher.search(text) == bool(re.search(pattern, text.lower())), (pattern, text)
+
+
+def test_quantified_and_grouped_text_is_not_required():
+    assert literal_anchors(r"colou?r") == ["colo"]
+    assert literal_anchors(r"(?:buy|get) now") == [" now"]
+    assert literal_anchors(r"[ab]+") is None
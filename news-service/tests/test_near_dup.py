@@ -0,0 +1,72 @@
+import asyncio
+
+from bson import ObjectId
+
+from app import persistence
+from app.near_dup import NearDuplicateIndex
+from app.persistence import ArticleWriter
+
+
+def test_original_is_released_when_its_write_fails(monkeypatch, unreachable):
+    monkeypatch.setattr(persistence, "articles_col", unreachable)
+    index = NearDuplicateIndex(max_distance=3)
+    fp = 0x5A5A5A5A5A5A5A5A
+    doc = {"_id": ObjectId(), "url": "https://example.com/a", "url_key": "https://example.com/a",
+           "thread_id": ObjectId(), "language": "en", "topic": "tech"}
+
+    async def run():
+        index.begin(doc["_id"], fp)
+        writer = ArticleWriter(max_batch=10, max_delay=60)
+        index.finish_when_stored(doc, await writer.add(doc))
+        # a copy arriving while the original sits in the writer waits for the write
+        copy = asyncio.ensure_future(index.output(index.match(fp)))
+        await asyncio.sleep(0)
+        assert not copy.done()
+        await writer.close()
+        return await copy
+
+    assert asyncio.run(run()) is None
+    assert index.match(fp) is None
+
+
+def test_cancelled_crawl_releases_its_originals(monkeypatch):
+    from app import crawler
+
+    index = NearDuplicateIndex(max_distance=3)
+    fp = 0x0F0F0F0F0F0F0F0F
+    monkeypatch.setattr(crawler, "near_dups", index)
+    monkeypatch.setattr(index, "sync", lambda: asyncio.sleep(0))
+
+    async def fetch(src, ledger):
+        return [{"src": src, "entry": {"guid": "g", "link": "https://example.com/a"}}]
+
+    async def dedup(items, ledger):
+        return items
+
+    async def download(item):
+        item["art"] = {"simhash": fp}
+        return item
+
+    async def stuck_in_llm(item):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(crawler, "_fetch_feed", fetch)
+    monkeypatch.setattr(crawler, "_dedup_entries", dedup)
+    monkeypatch.setattr(crawler, "_download_article", download)
+    monkeypatch.setattr(crawler, "_process_article", stuck_in_llm)
+    monkeypatch.setattr(crawler, "NEAR_DUP_ENABLED", True)
+
+    async def run():
+        job = asyncio.create_task(crawler.crawl_and_process([{"feedUrl": "feed", "source": "Example"}]))
+        while not index._pending:
+            await asyncio.sleep(0.01)
+        # a copy seen by another job waits for the original's output
+        copy = asyncio.ensure_future(index.output(index.match(fp)))
+        await asyncio.sleep(0)
+        assert not copy.done()
+        job.cancel()
+        await asyncio.gather(job, return_exceptions=True)
+        return await asyncio.wait_for(copy, 1)
+
+    assert asyncio.run(run()) is None
+    assert index.match(fp) is None
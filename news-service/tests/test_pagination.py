@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.pagination import after, decode_cursor, encode_cursor, offset_of, position
+
+
+def _roundtrip(pos):
+    return decode_cursor(encode_cursor({"articles": pos}))["articles"]
+
+
+def test_after_accepts_its_own_cursors():
+    doc = {"_id": ObjectId(), "published": datetime(2024, 5, 1), "views": 30}
+    assert "$or" in after(_roundtrip(position(doc, "published")), "published")
+    assert "$or" in after(_roundtrip(position(doc, "views")), "views")
+    assert after(_roundtrip(position({"_id": doc["_id"]}, "views")), "views")["views"] is None
+
+
+@pytest.mark.parametrize("value, oid", [
+    ("2024-05-01", ObjectId()),
+    (True, ObjectId()),
+    (datetime(2024, 5, 1), "65f0c0ffee0000000000000a"),
+    ({"$gt": ""}, ObjectId()),
+])
+def test_after_rejects_mistyped_positions(value, oid):
+    with pytest.raises(HTTPException) as e:
+        after(_roundtrip({"field": "published", "value": value, "id": oid}), "published")
+    assert e.value.status_code == 400
+
+
+@pytest.mark.parametrize("offset", [-1, True, "20", 2.5])
+def test_offset_of_rejects_bad_offsets(offset):
+    with pytest.raises(HTTPException):
+        offset_of({"field": "relevance", "offset": offset}, "relevance")
@@ -0,0 +1,97 @@
+import asyncio
+
+from bson import ObjectId
+
+from app import persistence
+from app.persistence import ArticleWriter, thread_updates
+
+
+def _doc(tid):
+    return {"_id": ObjectId(), "url": "https://example.com/a", "url_key": "https://example.com/a",
+            "thread_id": tid, "language": "en"}
+
+
+def test_thread_updates_never_upsert():
+    ops = thread_updates([_doc(ObjectId())])
+    assert not ops[0]._upsert
+    assert "$setOnInsert" not in ops[0]._doc
+
+
+def test_flush_fails_every_waiter_on_connection_errors(monkeypatch, unreachable):
+    monkeypatch.setattr(persistence, "articles_col", unreachable)
+
+    async def run():
+        writer = ArticleWriter(max_batch=10, max_delay=60)
+        written = [await writer.add(_doc(ObjectId())) for _ in range(2)]
+        summary = await writer.close()
+        return writer, written, summary
+
+    writer, written, summary = asyncio.run(run())
+    assert summary["inserted"] == 0 and writer.inserted == 0
+    assert all(w.done() and w.result()["error"].startswith("AutoReconnect") for w in written)
+    assert len(writer.failed) == 2
+
+
+def test_cover_comes_from_the_first_stored_article(monkeypatch, make_collection):
+    tid = ObjectId()
+    opener, follower = _doc(tid), _doc(tid)
+    opener.update(image="opener.jpg", topic="tech")
+    follower.update(image="follower.jpg", topic="tech", url_key="https://example.com/b")
+    threads = make_collection([{"_id": tid, "title": "Storm", "topic": "tech", "image": None,
+                                "articles": [], "article_count": 0}])
+    monkeypatch.setattr(persistence, "articles_col", make_collection(reject={opener["_id"]}))
+    monkeypatch.setattr(persistence, "threads_col", threads)
+    monkeypatch.setattr(persistence.search_index, "add_many", lambda docs: None)
+
+    async def run():
+        writer = ArticleWriter(max_batch=10, max_delay=60)
+        await writer.add(opener)
+        await writer.add(follower)
+        await writer.close()
+        # a later batch does not replace the cover
+        later = _doc(tid)
+        later.update(image="later.jpg", url_key="https://example.com/c")
+        await writer.add(later)
+        await writer.close()
+
+    asyncio.run(run())
+    thread = threads.docs[tid]
+    assert thread["articles"][0] == follower["_id"]
+    assert thread["image"] == "follower.jpg"
+    assert thread["article_count"] == 2
+
+
+def test_thread_languages_are_counted_from_the_new_articles(make_collection):
+    tid = ObjectId()
+    threads = make_collection([{"_id": tid, "articles": [], "article_count": 0,
+                                "languages": ["de"], "language_counts": {"de": 1}}])
+    batches = [[_doc(tid), _doc(tid)], [_doc(tid)]]
+    batches[0][1]["language"] = "fr"
+
+    async def run():
+        for batch in batches:
+            await threads.bulk_write(thread_updates(batch))
+
+    asyncio.run(run())
+    thread = threads.docs[tid]
+    assert sorted(thread["languages"]) == ["de", "en", "fr"]
+    assert thread["language_counts"] == {"de": 1, "en": 2, "fr": 1}
+    assert thread["article_count"] == 3
+
+
+def test_deleting_the_cover_article_moves_the_cover_to_the_next(monkeypatch, make_collection):
+    tid = ObjectId()
+    cover, next_up = _doc(tid), _doc(tid)
+    cover.update(image="cover.jpg", topics=["world"], language="fr")
+    next_up.update(image="next.jpg", topics=["science", "world"])
+    threads = make_collection([{"_id": tid, "articles": [cover["_id"], next_up["_id"]], "article_count": 2,
+                                "languages": ["en", "fr"], "language_counts": {"en": 1, "fr": 1},
+                                "image": "cover.jpg", "topic": "world"}])
+    monkeypatch.setattr(persistence, "threads_col", threads)
+    monkeypatch.setattr(persistence, "articles_col", make_collection([next_up]))
+
+    assert asyncio.run(persistence.detach_article(cover)) == tid
+    thread = threads.docs[tid]
+    assert (thread["image"], thread["topic"]) == ("next.jpg", "science")
+    assert thread["articles"] == [next_up["_id"]] and thread["article_count"] == 1
+    assert thread["languages"] == ["en"] and thread["language_counts"] == {"en": 1}
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from app.pipeline import DONE, DomainThrottle, run_stage
+
+
+async def _drain(queue: asyncio.Queue) -> list:
+    out = []
+    while (item := await queue.get()) is not DONE:
+        out.append(item)
+    return out
+
+
+def test_failed_and_filtered_items_are_dropped():
+    async def handler(n):
+        if n == 1:
+            raise ValueError("broken item")
+        if n == 2:
+            return None
+        return [n, n * 10] if n == 3 else n
+
+    async def run():
+        inbox, outbox, dropped = asyncio.Queue(), asyncio.Queue(), []
+        for n in (0, 1, 2, 3):
+            inbox.put_nowait(n)
+        inbox.put_nowait(DONE)
+        await run_stage("test", handler, inbox, outbox, concurrency=2, on_drop=dropped.append)
+        return sorted(await _drain(outbox)), sorted(dropped)
+
+    assert asyncio.run(run()) == ([0, 3, 30], [1, 2])
+
+
+def test_a_full_queue_holds_back_the_stage_before_it():
+    started = []
+
+    async def fast(n):
+        started.append(n)
+        return n
+
+    async def slow(n):
+        await asyncio.sleep(0.01)
+        return n
+
+    async def run():
+        source, between, sink = asyncio.Queue(), asyncio.Queue(maxsize=2), asyncio.Queue()
+        for n in range(20):
+            source.put_nowait(n)
+        source.put_nowait(DONE)
+        producer = asyncio.create_task(run_stage("fast", fast, source, between, concurrency=1))
+        consumer = asyncio.create_task(run_stage("slow", slow, between, sink, concurrency=1))
+        await asyncio.sleep(0.035)
+        # the slow stage has taken about three items; the fast one may only be
+        # ahead of it by the queue size plus the item it is blocked on
+        assert len(started) <= sink.qsize() + 2 + 1 + 1
+        await asyncio.gather(producer, consumer)
+        return await _drain(sink)
+
+    assert asyncio.run(run()) == list(range(20))
+
+
+def test_throttle_spaces_out_one_domain_only():
+    throttle = DomainThrottle(delay=0.1)
+
+    async def hit(domain):
+        await throttle.wait(domain)
+        return time.monotonic()
+
+    async def run():
+        return await asyncio.gather(hit("a.example"), hit("a.example"), hit("b.example"))
+
+    first, second, other = asyncio.run(run())
+    assert second - first >= 0.09
+    assert abs(other - first) < 0.05
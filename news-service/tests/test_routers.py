@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import routers
+from app.cache import MemoryBackend, ResponseCache
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(routers.router)
+    return TestClient(app)
+
+
+def _thread(minutes_ago, **fields):
+    return {"_id": ObjectId(), "title": "Storm", "topic": "world", "languages": ["en"], "article_count": 2,
+            "articles": [], "last_updated": datetime(2025, 1, 6) - timedelta(minutes=minutes_ago), **fields}
+
+
+def test_feed_threads_page_through_the_denormalized_fields(monkeypatch, make_collection, unreachable, client):
+    listed = [_thread(i) for i in range(5)]
+    hidden = [
+        _thread(10, article_count=1),
+        _thread(11, topic="tech"),
+        _thread(12, languages=["fr"]),
+    ]
+    monkeypatch.setattr(routers, "threads_col", make_collection(listed + hidden))
+    # a thread listing never reads the articles
+    monkeypatch.setattr(routers, "articles_col", unreachable)
+
+    seen, cursor = [], None
+    while True:
+        params = {"feed_type": "threads", "topics": "world", "languages": "en", "size": 2}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/feed", params=params).json()
+        seen.extend(t["_id"] for t in body["threads"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [str(t["_id"]) for t in listed]
+
+
+def test_article_reads_are_served_from_the_cache_until_invalidated(monkeypatch, make_collection, unreachable,
+                                                                   client):
+    tid = ObjectId()
+    article = {"_id": ObjectId(), "title": "Storm floods the coast", "thread_id": tid, "views": 4}
+    threads = make_collection([_thread(0, _id=tid)])
+    monkeypatch.setattr(routers, "response_cache", ResponseCache(MemoryBackend()))
+    monkeypatch.setattr(routers, "articles_col", make_collection([article]))
+    monkeypatch.setattr(routers, "threads_col", threads)
+    first = client.get(f"/articles/{article['_id']}").json()
+    assert first["title"] == "Storm floods the coast"
+
+    # nothing below may reach Mongo
+    monkeypatch.setattr(routers, "articles_col", unreachable)
+    monkeypatch.setattr(routers, "threads_col", unreachable)
+    assert client.get(f"/articles/{article['_id']}").json() == first
+
+    monkeypatch.setattr(routers, "threads_col", threads)
+    assert client.delete(f"/threads/{tid}").status_code == 204
+    # a cached thread would still be served
+    assert client.get(f"/threads/{tid}").status_code == 404
+
+
+def test_thread_cover_is_read_from_the_thread_alone(monkeypatch, make_collection, unreachable, client):
+    thread = _thread(0, image="cover.jpg", articles=[ObjectId()])
+    monkeypatch.setattr(routers, "response_cache", ResponseCache(None))
+    monkeypatch.setattr(routers, "threads_col", make_collection([thread]))
+    monkeypatch.setattr(routers, "articles_col", unreachable)
+    body = client.get(f"/threads/{thread['_id']}").json()
+    assert (body["image"], body["topic"]) == ("cover.jpg", "world")
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+
+from app import search_index as search_index_module
+from app.counters import CounterBuffer
+from app.search_index import SearchIndex, highlight
+
+
+def test_highlight_marks_terms():
+    assert highlight("Storm hits the coast", ["storm"]) == "<mark>Storm</mark> hits the coast"
+
+
+def test_highlight_escapes_feed_markup():
+    out = highlight('<script>alert(1)</script> storm & "rain"', ["storm"])
+    assert "<script>" not in out
+    assert out == '&lt;script&gt;alert(1)&lt;/script&gt; <mark>storm</mark> &amp; &quot;rain&quot;'
+
+
+def _article(title, **fields):
+    return {"_id": ObjectId(), "title": title, "fetched_at": datetime.utcnow(), **fields}
+
+
+def test_load_sync_and_reconcile(monkeypatch, tmp_path, make_collection):
+    storm, chip = _article("Storm floods the coast", topic="world"), _article("Chip maker storm", topic="tech")
+    articles = make_collection([storm, chip])
+    monkeypatch.setattr(search_index_module, "articles_col", articles)
+    # every query goes through the thread
+    monkeypatch.setattr(search_index_module, "SEARCH_OFFLOAD_POSTINGS", 0)
+    index = SearchIndex(str(tmp_path / "index.json.gz"))
+
+    async def run():
+        await index.ensure_loaded()
+        found = await index.search("storm", {"topic": ["world"]})
+        assert [aid for aid, _ in found["hits"]] == [storm["_id"]]
+        assert found["facets"]["topic"] == {"world": 1, "tech": 1}
+
+        # deleted by another worker
+        await articles.delete_one({"_id": chip["_id"]})
+        await index.sync()
+        assert len(index) == 2
+        await index._reconcile()
+        assert len(index) == 1
+
+    asyncio.run(run())
+
+
+def test_views_sort_uses_the_flushed_counts(monkeypatch, tmp_path, make_collection):
+    quiet, popular = _article("Storm floods the coast", views=3), _article("Storm hits the city", views=1)
+    articles = make_collection([quiet, popular])
+    monkeypatch.setattr(search_index_module, "articles_col", articles)
+    index = SearchIndex(str(tmp_path / "index.json.gz"))
+    counters = CounterBuffer(articles, on_written=index.add_counts)
+
+    async def run():
+        await index.ensure_loaded()
+        hits = (await index.search("storm"))["hits"]
+        assert [aid for aid, _ in index.sort_by_views(hits)] == [quiet["_id"], popular["_id"]]
+        counters.incr(popular["_id"], "views", 10)
+        await counters.flush()
+        return index.sort_by_views(hits)
+
+    assert [aid for aid, _ in asyncio.run(run())] == [popular["_id"], quiet["_id"]]
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import orjson
+from bson import ObjectId
+
+from app.models import Article, FeedResponse, Thread
+from app.serializers import ARTICLE_FIELDS, THREAD_FIELDS, article_out, feed_out, json_response, thread_out
+
+THREAD = {"_id": ObjectId(), "title": "Storm", "language": "en", "last_updated": datetime(2025, 1, 6, 9),
+          "image": None, "topic": "world", "articles": [ObjectId(), ObjectId()]}
+ARTICLE = {"_id": ObjectId(), "url": "https://example.com/storm", "source": "Example", "title": "Storm",
+           "description": "Floods", "credibility_score": 80, "credibility_label": "credible",
+           "published": datetime(2025, 1, 6, 8), "author": None, "content": "Floods hit the coast.",
+           "image": "storm.jpg", "topic": "world", "fetched_at": datetime(2025, 1, 6, 8, 30),
+           "views": 3, "thread_id": THREAD["_id"]}
+
+
+def _aliases(model):
+    return {field.alias or name for name, field in model.model_fields.items()}
+
+
+def test_projection_matches_the_response_models():
+    thread = thread_out(THREAD)
+    article = article_out(ARTICLE, thread, {"views": 2, "reports": 1})
+    assert set(thread) == _aliases(Thread)
+    assert set(article) == _aliases(Article)
+    Article.model_validate(article)
+    # legacy single topic, unwritten counter increments and model defaults
+    assert article["topics"] == ["world"]
+    assert (article["views"], article["reports"], article["commentsCount"]) == (5, 1, 0)
+    assert thread["articles"] == [str(a) for a in THREAD["articles"]]
+
+
+def test_only_the_fields_the_projection_reads_are_fetched():
+    assert set(THREAD_FIELDS) | {"_id"} == set(THREAD)
+    read = set(ARTICLE) - {"_id"}
+    assert read <= set(ARTICLE_FIELDS)
+
+
+def test_feed_response_bytes_validate_as_a_feed():
+    response = json_response(feed_out([ARTICLE], [THREAD], next_cursor="abc"))
+    body = orjson.loads(response.body)
+    feed = FeedResponse.model_validate(body)
+    assert feed.threads[0].last_updated == "2025-01-06T09:00:00"
+    assert body["articles"][0]["_id"] == str(ARTICLE["_id"])
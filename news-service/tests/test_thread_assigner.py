@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from app import thread_assigner, vectorizer
+from app.thread_assigner import ThreadAssigner
+
+
+async def _slow_title(examples):
+    await asyncio.sleep(0.2)
+    return "Generated title"
+
+
+def test_title_calls_run_outside_the_assign_lock(monkeypatch, tmp_path, make_collection):
+    threads = make_collection()
+    monkeypatch.setattr(thread_assigner, "threads_col", threads)
+    monkeypatch.setattr(vectorizer, "thread_assigner_state_col", make_collection())
+    monkeypatch.setattr(thread_assigner, "generate_thread_title", _slow_title)
+    assigner = ThreadAssigner(state_dir=str(tmp_path))
+
+    async def run():
+        started = time.perf_counter()
+        tids = await asyncio.gather(
+            assigner.assign("Storm floods the coastal towns overnight", "world"),
+            assigner.assign("Chip maker unveils a faster processor", "tech"),
+            assigner.assign("Storm floods the coastal towns overnight", "world"),
+        )
+        return tids, time.perf_counter() - started
+
+    (storm, chip, storm_copy), elapsed = asyncio.run(run())
+    # one title call at a time would take at least 0.4s
+    assert elapsed < 0.35
+    assert storm == storm_copy and storm != chip
+    assert set(threads.docs) == {storm, chip}
+    assert threads.docs[storm]["title"] == "Generated title"
+
+
+def test_idf_counts_are_flushed_in_one_update(monkeypatch, tmp_path, make_collection):
+    state = make_collection()
+    monkeypatch.setattr(thread_assigner, "threads_col", make_collection())
+    monkeypatch.setattr(vectorizer, "thread_assigner_state_col", state)
+    monkeypatch.setattr(thread_assigner, "generate_thread_title", _slow_title)
+    assigner = ThreadAssigner(state_dir=str(tmp_path))
+
+    async def run():
+        await assigner.assign("Storm floods the coastal towns overnight", "world")
+        await assigner.assign("Chip maker unveils a faster processor", "tech")
+        # assign() only counts in memory
+        assert state.updates == []
+        await assigner.stop()
+
+    asyncio.run(run())
+    assert len(state.updates) == 1
+    assert state.docs["idf"]["n_docs"] == 2
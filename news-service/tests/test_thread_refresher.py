@@ -0,0 +1,88 @@
+import asyncio
+
+import numpy as np
+from bson import Binary, ObjectId
+
+from app import thread_refresher
+from app.thread_assigner import ThreadAssigner
+from app.thread_refresher import RelatedThreadsRefresher, ThreadTitleRefresher, sample_ids
+
+
+def _bytes(vec):
+    return Binary(np.asarray(vec, dtype=np.float32).tobytes())
+
+
+def _padded(values, dim):
+    vec = np.zeros(dim, dtype=np.float32)
+    vec[:len(values)] = values
+    return vec
+
+
+def test_sample_keeps_the_first_and_latest_article():
+    assert sample_ids(list(range(100)), 5) == [0, 25, 50, 74, 99]
+    assert sample_ids([1, 2], 5) == [1, 2]
+
+
+def test_titles_are_regenerated_once_per_window_and_only_on_drift(monkeypatch, make_collection):
+    drifted, steady = ObjectId(), ObjectId()
+    articles = [{"_id": ObjectId(), "title": f"Storm update {i}"} for i in range(3)]
+    centroids = {drifted: np.array([1.0, 0.0]), steady: np.array([0.0, 1.0])}
+    threads = make_collection([
+        {"_id": drifted, "articles": [a["_id"] for a in articles], "title_centroid": _bytes([0.0, 1.0])},
+        {"_id": steady, "articles": [a["_id"] for a in articles], "title_centroid": _bytes([0.0, 1.0])},
+    ])
+    calls = []
+
+    async def title(examples):
+        calls.append(examples)
+        return "Storm batters the coast"
+
+    monkeypatch.setattr(thread_refresher, "threads_col", threads)
+    monkeypatch.setattr(thread_refresher, "articles_col", make_collection(articles))
+    monkeypatch.setattr(thread_refresher, "generate_thread_title", title)
+    refresher = ThreadTitleRefresher(centroids.get, window=60, max_examples=2, min_shift=0.05)
+
+    async def run():
+        for _ in range(5):
+            refresher.mark_dirty(drifted)
+            refresher.mark_dirty(steady)
+        # still inside the window
+        assert await refresher.flush() == 0
+        return await refresher.flush(force=True)
+
+    assert asyncio.run(run()) == 1
+    assert calls == [["Storm update 0", "Storm update 2"]]
+    assert threads.docs[drifted]["title"] == "Storm batters the coast"
+    assert np.frombuffer(threads.docs[drifted]["title_centroid"], dtype=np.float32).tolist() == [1.0, 0.0]
+    assert "title" not in threads.docs[steady]
+
+
+def test_related_lists_follow_a_moved_thread(monkeypatch, tmp_path, make_collection):
+    a, b, c, d = (ObjectId() for _ in range(4))
+    assigner = ThreadAssigner(state_dir=str(tmp_path))
+    vectors = {a: [1.0, 0.1, 0.0], b: [0.9, 0.3, 0.0], c: [0.0, 1.0, 0.2], d: [0.0, 0.2, 1.0]}
+    for tid, vec in vectors.items():
+        assigner._topic_index("tech" if tid in (a, b) else "world").add(tid, _padded(vec, assigner.dim))
+    threads = make_collection([{"_id": tid} for tid in vectors])
+    monkeypatch.setattr(thread_refresher, "threads_col", threads)
+    refresher = RelatedThreadsRefresher(assigner.neighbours, assigner.similarity, k=2)
+
+    def related(tid):
+        return [entry["_id"] for entry in threads.docs[tid]["related"]]
+
+    async def run():
+        await refresher.refresh(list(vectors))
+        # neighbours come from every topic, best first, never the thread itself
+        assert related(a) == [b, c]
+        assert related(d) == [c, b]
+        assert d not in related(a)
+
+        # d moves right next to a: only d is recomputed, a and c are patched
+        assigner._topics["world"].update(d, _padded([1.0, 0.0, 0.0], assigner.dim))
+        refresher.mark_dirty(d)
+        assert await refresher.flush(force=True) == 1
+
+    asyncio.run(run())
+    assert related(d) == [a, b]
+    assert related(a) == [d, b]
+    assert d not in related(c)